@@ -0,0 +1,268 @@
+"""Local stand-in for the OpenAI Realtime API, for load tests.
+
+Speaks enough of the protocol for the examples: it answers ``session.update``,
+detects speech in the appended audio with an energy threshold (like
+``server_vad``), and after each user turn streams a synthetic spoken answer
+(a tone plus transcript deltas) at a configurable pace. Speech during an
+answer, or a ``response.cancel``, cancels it like the real API does.
+
+Run it and point the client at it with ``OPENAI_REALTIME_URL``::
+
+    python benchmarks/fake_realtime.py --port 9100
+    OPENAI_REALTIME_URL=ws://127.0.0.1:9100/v1/realtime python examples/unity_ws_server.py
+"""
+
+import argparse
+import asyncio
+import audioop
+import base64
+import itertools
+import json
+import math
+import struct
+from typing import Any, Dict, Optional
+
+import websockets
+
+_ids = itertools.count(1)
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{next(_ids):012d}"
+
+
+def _tone(ms: int, rate: int = 24000, frequency: float = 220.0, amplitude: int = 6000) -> bytes:
+    samples = rate * ms // 1000
+    return struct.pack(
+        f"<{samples}h",
+        *(int(amplitude * math.sin(2 * math.pi * frequency * i / rate)) for i in range(samples)),
+    )
+
+
+class FakeRealtimeSession:
+    """
+    One stand-in Realtime API session.
+
+    Attributes:
+        audio_format (str): Audio format set by the client's session.update.
+        responses (int): Responses started.
+        cancelled (int): Responses cancelled by speech or response.cancel.
+    """
+    def __init__(
+        self,
+        ws,
+        vad_threshold: int = 500,
+        silence_ms: int = 500,
+        first_audio_ms: int = 300,
+        response_ms: int = 3000,
+        chunk_ms: int = 100,
+        stream_speed: float = 2.0,
+    ):
+        self.ws = ws
+        self.vad_threshold = vad_threshold
+        self.silence_ms = silence_ms
+        self.first_audio_ms = first_audio_ms
+        self.response_ms = response_ms
+        self.chunk_ms = chunk_ms
+        self.stream_speed = stream_speed
+        self.audio_format = "pcm16"
+        self.responses = 0
+        self.cancelled = 0
+
+        self._speaking = False
+        self._silent_ms = 0.0
+        self._buffer_ms = 0.0
+        self._response: Optional[asyncio.Task] = None
+        self._response_id: Optional[str] = None
+
+    async def send(self, event: Dict[str, Any]) -> None:
+        event.setdefault("event_id", _new_id("event"))
+        await self.ws.send(json.dumps(event))
+
+    async def run(self) -> None:
+        await self.send({"type": "session.created", "session": {"id": _new_id("sess")}})
+        try:
+            async for message in self.ws:
+                await self.handle(json.loads(message))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if self._response is not None:
+                self._response.cancel()
+
+    async def handle(self, event: Dict[str, Any]) -> None:
+        event_type = event.get("type")
+        if event_type == "session.update":
+            session = event.get("session", {})
+            self.audio_format = session.get("input_audio_format", self.audio_format)
+            await self.send({"type": "session.updated", "session": session})
+        elif event_type == "input_audio_buffer.append":
+            await self._append(base64.b64decode(event["audio"]))
+        elif event_type == "input_audio_buffer.commit":
+            await self._end_turn()
+        elif event_type == "response.create":
+            self._start_response(0)
+        elif event_type == "response.cancel":
+            if not await self._cancel_response():
+                await self.send({"type": "error", "error": {
+                    "type": "invalid_request_error",
+                    "code": "response_cancel_not_active",
+                    "message": "Cancellation failed: no active response found",
+                }})
+        elif event_type == "conversation.item.truncate":
+            await self.send({
+                "type": "conversation.item.truncated",
+                "item_id": event.get("item_id"),
+                "content_index": event.get("content_index", 0),
+                "audio_end_ms": event.get("audio_end_ms", 0),
+            })
+        elif event_type == "conversation.item.create":
+            item = dict(event.get("item", {}), id=event.get("item", {}).get("id") or _new_id("item"))
+            await self.send({"type": "conversation.item.created", "previous_item_id": None, "item": item})
+
+    def _to_pcm16(self, audio: bytes) -> bytes:
+        if self.audio_format == "g711_ulaw":
+            return audioop.ulaw2lin(audio, 2)
+        if self.audio_format == "g711_alaw":
+            return audioop.alaw2lin(audio, 2)
+        return audio
+
+    def _from_pcm16(self, audio: bytes) -> bytes:
+        if self.audio_format == "g711_ulaw":
+            return audioop.lin2ulaw(audio, 2)
+        if self.audio_format == "g711_alaw":
+            return audioop.lin2alaw(audio, 2)
+        return audio
+
+    @property
+    def _rate(self) -> int:
+        return 24000 if self.audio_format == "pcm16" else 8000
+
+    async def _append(self, audio: bytes) -> None:
+        pcm = self._to_pcm16(audio)
+        ms = len(pcm) / 2 / self._rate * 1000
+        self._buffer_ms += ms
+        if audioop.rms(pcm, 2) >= self.vad_threshold:
+            self._silent_ms = 0.0
+            if not self._speaking:
+                self._speaking = True
+                await self.send({
+                    "type": "input_audio_buffer.speech_started",
+                    "audio_start_ms": int(self._buffer_ms),
+                    "item_id": _new_id("item"),
+                })
+                await self._cancel_response()
+        elif self._speaking:
+            self._silent_ms += ms
+            if self._silent_ms >= self.silence_ms:
+                self._speaking = False
+                await self.send({"type": "input_audio_buffer.speech_stopped", "audio_end_ms": int(self._buffer_ms)})
+                await self._end_turn()
+
+    async def _end_turn(self) -> None:
+        item_id = _new_id("item")
+        await self.send({"type": "input_audio_buffer.committed", "previous_item_id": None, "item_id": item_id})
+        await self.send({
+            "type": "conversation.item.created",
+            "previous_item_id": None,
+            "item": {"id": item_id, "type": "message", "role": "user",
+                     "content": [{"type": "input_audio", "transcript": None}]},
+        })
+        await self.send({
+            "type": "conversation.item.input_audio_transcription.completed",
+            "item_id": item_id,
+            "content_index": 0,
+            "transcript": "Hola, ¿qué hora es?",
+        })
+        self._start_response(self.first_audio_ms)
+
+    def _start_response(self, delay_ms: int) -> None:
+        if self._response is not None and not self._response.done():
+            return
+        self._response_id = _new_id("resp")
+        self.responses += 1
+        self._response = asyncio.create_task(self._stream_response(self._response_id, delay_ms))
+
+    async def _cancel_response(self) -> bool:
+        if self._response is None or self._response.done():
+            return False
+        self._response.cancel()
+        self.cancelled += 1
+        await self.send({"type": "response.done", "response": {
+            "id": self._response_id, "object": "realtime.response", "status": "cancelled",
+            "output": [], "usage": None,
+        }})
+        return True
+
+    async def _stream_response(self, response_id: str, delay_ms: int) -> None:
+        item_id = _new_id("item")
+        await self.send({"type": "response.created", "response": {
+            "id": response_id, "object": "realtime.response", "status": "in_progress", "output": [],
+        }})
+        await self.send({"type": "response.output_item.added", "response_id": response_id, "output_index": 0,
+                         "item": {"id": item_id, "type": "message", "role": "assistant", "content": []}})
+        await asyncio.sleep(delay_ms / 1000)
+
+        chunk = base64.b64encode(self._from_pcm16(_tone(self.chunk_ms, self._rate))).decode()
+        for _ in range(max(1, self.response_ms // self.chunk_ms)):
+            await self.send({"type": "response.audio.delta", "response_id": response_id, "item_id": item_id,
+                             "output_index": 0, "content_index": 0, "delta": chunk})
+            await self.send({"type": "response.audio_transcript.delta", "response_id": response_id,
+                             "item_id": item_id, "output_index": 0, "content_index": 0, "delta": "bla "})
+            await asyncio.sleep(self.chunk_ms / 1000 / self.stream_speed)
+
+        transcript = "bla " * max(1, self.response_ms // self.chunk_ms)
+        await self.send({"type": "response.audio.done", "response_id": response_id, "item_id": item_id,
+                         "output_index": 0, "content_index": 0})
+        await self.send({"type": "response.audio_transcript.done", "response_id": response_id, "item_id": item_id,
+                         "output_index": 0, "content_index": 0, "transcript": transcript})
+        item = {"id": item_id, "type": "message", "role": "assistant", "status": "completed",
+                "content": [{"type": "audio", "transcript": transcript}]}
+        await self.send({"type": "response.output_item.done", "response_id": response_id, "output_index": 0,
+                         "item": item})
+        await self.send({"type": "response.done", "response": {
+            "id": response_id, "object": "realtime.response", "status": "completed", "output": [item],
+            "usage": {
+                "total_tokens": 120, "input_tokens": 80, "output_tokens": 40,
+                "input_token_details": {"text_tokens": 30, "audio_tokens": 50, "cached_tokens": 20,
+                                        "cached_tokens_details": {"text_tokens": 20, "audio_tokens": 0}},
+                "output_token_details": {"text_tokens": 10, "audio_tokens": 30},
+            },
+        }})
+
+
+async def serve(host: str = "127.0.0.1", port: int = 9100, **session_kwargs: Any) -> None:
+    """Serve stand-in sessions until cancelled."""
+    async def handler(ws):
+        await FakeRealtimeSession(ws, **session_kwargs).run()
+
+    async with websockets.serve(handler, host, port, max_size=None):
+        print(f"Fake Realtime API on ws://{host}:{port}/v1/realtime")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--first-audio-ms", type=int, default=300,
+                        help="Delay from the end of user speech to the first audio delta")
+    parser.add_argument("--response-ms", type=int, default=3000, help="Audio length of each answer")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Audio per response.audio.delta")
+    parser.add_argument("--stream-speed", type=float, default=2.0,
+                        help="Answer streaming speed relative to real time")
+    parser.add_argument("--silence-ms", type=int, default=500, help="Silence that ends a user turn")
+    args = parser.parse_args()
+    asyncio.run(serve(
+        args.host,
+        args.port,
+        first_audio_ms=args.first_audio_ms,
+        response_ms=args.response_ms,
+        chunk_ms=args.chunk_ms,
+        stream_speed=args.stream_speed,
+        silence_ms=args.silence_ms,
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Load generator for the /ws endpoints of the FastAPI examples.
+
+Starts the stand-in Realtime API (``fake_realtime.py``) and the example server
+pointed at it, then opens N simulated browser/Unity clients per step. Each
+client streams PCM16 at real-time pace: a spoken turn (a WAV file, or a
+synthetic tone), then silence until the answer arrives, and barges in on the
+answer with its next turn. Per step it reports:
+
+* time to first audio: end of the user's speech to the first audio message
+* interruption latency: start of a barge-in to the ``clear`` event
+* server event-loop lag, measured as the round trip of ``GET /health``
+* the load generator's own scheduling lag, to check it is not the bottleneck
+* server CPU and RSS, in total and per session, from ``/proc`` (Linux)
+
+Example::
+
+    python benchmarks/loadgen.py --app examples/unity_ws_server.py --sessions 1,10,50 --json results.json
+
+``ws_hal9000.py`` builds its RAG index with OpenAI embeddings at startup, so it
+needs real credentials; ``unity_ws_server.py`` runs fully offline. Use
+``--no-spawn`` to test a server that is already running.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import struct
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openai_realtime_client.audio.conversion import to_pcm16  # noqa: E402
+
+RATE = 24000
+BYTES_PER_MS = RATE * 2 // 1000
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 (nearest rank) and max of ``values``."""
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)], 1)
+
+    return {"count": len(ordered), "p50": rank(50), "p95": rank(95), "p99": rank(99), "max": round(ordered[-1], 1)}
+
+
+def load_speech(paths: List[str]) -> List[bytes]:
+    """Utterances as 24kHz mono PCM16: the given WAV files, or a synthetic 1.5 s tone."""
+    if paths:
+        utterances = []
+        for path in paths:
+            with open(path, "rb") as f:
+                utterances.append(bytes(to_pcm16(f.read())))
+        return utterances
+    samples = RATE * 3 // 2
+    return [struct.pack(f"<{samples}h", *(int(8000 * math.sin(2 * math.pi * 440 * i / RATE)) for i in range(samples)))]
+
+
+class ProcessStats:
+    """CPU time and resident memory of a process, read from /proc."""
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.available = pid is not None and os.path.exists(f"/proc/{pid}/stat")
+        self._ticks = os.sysconf("SC_CLK_TCK") if self.available else 100
+
+    def cpu_seconds(self) -> float:
+        if not self.available:
+            return 0.0
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15, i.e. 11 and 12 after the command name
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def rss_mb(self) -> float:
+        if not self.available:
+            return 0.0
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+
+class SimulatedClient:
+    """
+    One browser/Unity client: streams turns at real-time pace and times the answers.
+
+    Attributes:
+        ttfa_ms (List[float]): Time to first audio of each answer.
+        interrupt_ms (List[float]): Time from each barge-in to the clear event.
+        lag_ms (List[float]): How late each audio chunk was sent.
+        timeouts (int): Turns without an answer within the timeout.
+        error (str): Why the session ended early, if it did.
+    """
+    def __init__(self, url: str, speech: bytes, turns: int, chunk_ms: int = 40,
+                 listen_ms: int = 1000, answer_timeout: float = 10.0, interrupt: bool = True):
+        self.url = url
+        self.speech = speech
+        self.turns = turns
+        self.chunk_ms = chunk_ms
+        self.listen_ms = listen_ms
+        self.answer_timeout = answer_timeout
+        self.interrupt = interrupt
+        self.ttfa_ms: List[float] = []
+        self.interrupt_ms: List[float] = []
+        self.lag_ms: List[float] = []
+        self.timeouts = 0
+        self.error: Optional[str] = None
+
+        self._speech_ended_at: Optional[float] = None
+        self._barge_in_at: Optional[float] = None
+        self._first_audio = asyncio.Event()
+        self._last_audio_at = 0.0
+
+    async def run(self) -> None:
+        try:
+            async with websockets.connect(self.url, max_size=None) as ws:
+                receiver = asyncio.create_task(self._receive(ws))
+                try:
+                    await self._speak(ws)
+                finally:
+                    receiver.cancel()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _receive(self, ws) -> None:
+        async for message in ws:
+            data = json.loads(message)
+            now = time.monotonic()
+            if "audio" in data:
+                self._last_audio_at = now
+                if self._speech_ended_at is not None:
+                    self.ttfa_ms.append((now - self._speech_ended_at) * 1000)
+                    self._speech_ended_at = None
+                    self._first_audio.set()
+            elif data.get("event") == "clear" and self._barge_in_at is not None:
+                self.interrupt_ms.append((now - self._barge_in_at) * 1000)
+                self._barge_in_at = None
+
+    async def _stream(self, ws, audio: bytes, until=None) -> None:
+        """Send ``audio`` (or silence until ``until()`` is true) in real-time chunks."""
+        chunk_bytes = self.chunk_ms * BYTES_PER_MS
+        silence = bytes(chunk_bytes)
+        start = time.monotonic()
+        offset = 0
+        sent = 0
+        while (offset < len(audio)) if until is None else not until():
+            due = start + sent * self.chunk_ms / 1000
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.lag_ms.append(max(0.0, time.monotonic() - due) * 1000)
+            if until is None:
+                await ws.send(audio[offset:offset + chunk_bytes])
+                offset += chunk_bytes
+            else:
+                await ws.send(silence)
+            sent += 1
+
+    async def _speak(self, ws) -> None:
+        for turn in range(self.turns):
+            answering = time.monotonic() - self._last_audio_at < 0.2
+            if turn and not self.interrupt:
+                # Let the answer finish before speaking again
+                await self._stream(ws, b"", until=lambda: time.monotonic() - self._last_audio_at > 0.5)
+            elif turn and answering:
+                self._barge_in_at = time.monotonic()
+
+            await self._stream(ws, self.speech)
+            self._first_audio.clear()
+            self._speech_ended_at = time.monotonic()
+
+            deadline = self._speech_ended_at + self.answer_timeout
+            await self._stream(ws, b"", until=lambda: self._first_audio.is_set() or time.monotonic() > deadline)
+            if not self._first_audio.is_set():
+                self.timeouts += 1
+                self._speech_ended_at = None
+                continue
+            if turn < self.turns - 1:
+                listen_until = time.monotonic() + self.listen_ms / 1000
+                await self._stream(ws, b"", until=lambda: time.monotonic() > listen_until)
+
+
+async def probe_health(host: str, port: int, samples: List[float], stop: asyncio.Event,
+                       stats: ProcessStats, peak_rss: List[float], interval: float = 0.2) -> None:
+    """Time ``GET /health`` every ``interval`` seconds and track the peak RSS."""
+    request = f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+    while not stop.is_set():
+        start = time.monotonic()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            await writer.drain()
+            await reader.read()
+            writer.close()
+            samples.append((time.monotonic() - start) * 1000)
+        except OSError:
+            pass
+        peak_rss[0] = max(peak_rss[0], stats.rss_mb())
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_step(args, sessions: int, speech: List[bytes], stats: ProcessStats, base_rss: float) -> Dict[str, Any]:
+    clients = [
+        SimulatedClient(
+            args.url, speech[i % len(speech)], args.turns, chunk_ms=args.chunk_ms,
+            listen_ms=args.listen_ms, answer_timeout=args.answer_timeout, interrupt=not args.no_interrupt,
+        )
+        for i in range(sessions)
+    ]
+    health: List[float] = []
+    peak_rss = [stats.rss_mb()]
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_health(args.host, args.port, health, stop, stats, peak_rss))
+
+    async def start(i: int, client: SimulatedClient) -> None:
+        # Spread the connections over the ramp-up time
+        await asyncio.sleep(args.ramp * i / sessions)
+        await client.run()
+
+    cpu_start = stats.cpu_seconds()
+    wall_start = time.monotonic()
+    await asyncio.gather(*(start(i, c) for i, c in enumerate(clients)))
+    wall = time.monotonic() - wall_start
+    cpu = stats.cpu_seconds() - cpu_start
+    stop.set()
+    await prober
+
+    cpu_percent = cpu / wall * 100 if wall else 0.0
+    rss_growth = max(0.0, peak_rss[0] - base_rss)
+    return {
+        "sessions": sessions,
+        "seconds": round(wall, 1),
+        "ttfa_ms": percentiles([v for c in clients for v in c.ttfa_ms]),
+        "interrupt_ms": percentiles([v for c in clients for v in c.interrupt_ms]),
+        "health_rtt_ms": percentiles(health),
+        "loadgen_lag_ms": percentiles([v for c in clients for v in c.lag_ms]),
+        "cpu_percent": round(cpu_percent, 1),
+        "cpu_percent_per_session": round(cpu_percent / sessions, 2),
+        "rss_mb": round(peak_rss[0], 1),
+        "rss_mb_per_session": round(rss_growth / sessions, 2),
+        "timeouts": sum(c.timeouts for c in clients),
+        "errors": [c.error for c in clients if c.error],
+    }
+
+
+async def wait_for_server(host: str, port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} did not start within {timeout:.0f} s")
+
+
+def print_row(result: Dict[str, Any]) -> None:
+    def fmt(stats):
+        if not stats["count"]:
+            return "-"
+        return f"{stats['p50']:.0f}/{stats['p95']:.0f}/{stats['p99']:.0f}"
+
+    print(
+        f"{result['sessions']:>8} {fmt(result['ttfa_ms']):>16} {fmt(result['interrupt_ms']):>16} "
+        f"{fmt(result['health_rtt_ms']):>16} {fmt(result['loadgen_lag_ms']):>14} "
+        f"{result['cpu_percent']:>6.1f} {result['cpu_percent_per_session']:>8.2f} "
+        f"{result['rss_mb']:>7.1f} {result['rss_mb_per_session']:>8.2f} "
+        f"{result['timeouts']:>5} {len(result['errors']):>5}",
+        flush=True,
+    )
+
+
+async def main_async(args) -> List[Dict[str, Any]]:
+    processes = []
+    server_pid = args.server_pid
+    if not args.no_spawn:
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.join(ROOT, "benchmarks", "fake_realtime.py"),
+            "--port", str(args.upstream_port),
+            "--first-audio-ms", str(args.first_audio_ms),
+            "--response-ms", str(args.response_ms),
+        ]))
+        env = dict(
+            os.environ,
+            OPENAI_REALTIME_URL=f"ws://127.0.0.1:{args.upstream_port}/v1/realtime",
+            OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "loadgen"),
+            OPENAI_MODEL=os.environ.get("OPENAI_MODEL", "gpt-4o-mini-realtime-preview-2024-12-17"),
+            PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+        )
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, args.app)], env=env, cwd=ROOT,
+                                  stdout=subprocess.DEVNULL if not args.server_output else None)
+        processes.append(server)
+        server_pid = server.pid
+
+    results = []
+    try:
+        await wait_for_server(args.host, args.port)
+        stats = ProcessStats(server_pid)
+        if not stats.available:
+            print("Server process not found, CPU and RSS are not reported")
+        speech = load_speech(args.wav)
+        base_rss = stats.rss_mb()
+        print(f"{'sessions':>8} {'ttfa p50/95/99':>16} {'barge-in ms':>16} {'health rtt ms':>16} "
+              f"{'loadgen lag':>14} {'cpu%':>6} {'cpu%/s':>8} {'rss MB':>7} {'MB/sess':>8} {'tmout':>5} {'err':>5}")
+        for sessions in args.sessions:
+            result = await run_step(args, sessions, speech, stats, base_rss)
+            results.append(result)
+            print_row(result)
+            await asyncio.sleep(args.pause)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="examples/unity_ws_server.py", help="Server script, relative to the repo")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="Port of the example server")
+    parser.add_argument("--upstream-port", type=int, default=9100, help="Port of the stand-in Realtime API")
+    parser.add_argument("--no-spawn", action="store_true", help="Use servers that are already running")
+    parser.add_argument("--server-pid", type=int, help="Server process for CPU/RSS with --no-spawn")
+    parser.add_argument("--server-output", action="store_true", help="Show the example server's output")
+    parser.add_argument("--sessions", default="1,5,10,25,50",
+                        type=lambda s: [int(n) for n in s.split(",")], help="Concurrent sessions per step")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session")
+    parser.add_argument("--wav", nargs="*", default=[], help="Utterances to stream (WAV)")
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Audio per WebSocket message")
+    parser.add_argument("--listen-ms", type=int, default=1000, help="Answer audio heard before barging in")
+    parser.add_argument("--no-interrupt", action="store_true", help="Wait for each answer to end instead")
+    parser.add_argument("--answer-timeout", type=float, default=10.0)
+    parser.add_argument("--ramp", type=float, default=1.0, help="Seconds over which sessions connect")
+    parser.add_argument("--pause", type=float, default=1.0, help="Seconds between steps")
+    parser.add_argument("--first-audio-ms", type=int, default=300, help="Stand-in API response delay")
+    parser.add_argument("--response-ms", type=int, default=3000, help="Stand-in API answer length")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+    args.url = f"ws://{args.host}:{args.port}/ws"
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"app": args.app, "turns": args.turns, "steps": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""Microbenchmarks for the hot paths of the client, the WebSocket bridge and the RAG tool.
+
+Each case runs a fixed, deterministic input until a run takes about
+``--min-time`` seconds, repeats that ``--repeat`` times, and reports the
+median and best time per operation. Results are written as JSON; with
+``--baseline`` they are compared to an earlier run and the script exits with
+status 1 when a case got slower than ``--threshold``::
+
+    python benchmarks/microbench.py --output baseline.json
+    # ... change something ...
+    python benchmarks/microbench.py --baseline baseline.json
+
+The RAG cases need the RAG dependencies and build the index from
+``RAG_DOCS_DIR`` with a deterministic local embedding, so they run offline.
+Cases whose dependencies are missing are reported as skipped.
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import inspect
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import struct
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RATE = 24000
+CHUNK_MS = 40
+
+
+def _speech(ms: int) -> bytes:
+    samples = RATE * ms // 1000
+    return struct.pack(f"<{samples}h", *(int(8000 * math.sin(2 * math.pi * 440 * i / RATE)) for i in range(samples)))
+
+
+def _wav(pcm: bytes, rate: int = 16000, channels: int = 2) -> bytes:
+    """A WAV file at another rate and layout than the API's, so that it has to be converted."""
+    import audioop
+    data, _ = audioop.ratecv(pcm, 2, 1, RATE, rate, None)
+    data = audioop.tostereo(data, 2, 1, 1) if channels == 2 else data
+    header = struct.pack(
+        "<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(data), b"WAVE", b"fmt ", 16, 1, channels,
+        rate, rate * channels * 2, channels * 2, 16, b"data", len(data),
+    )
+    return header + data
+
+
+class Benchmark:
+    """Times cases and collects their results."""
+    def __init__(self, min_time: float = 0.2, repeat: int = 5, pattern: Optional[str] = None):
+        self.min_time = min_time
+        self.repeat = repeat
+        self.pattern = re.compile(pattern) if pattern else None
+        self.results: Dict[str, Dict[str, Any]] = {}
+        # The code under test may print; the report goes to the original stdout
+        self.out = sys.stdout
+
+    def selected(self, name: str) -> bool:
+        return self.pattern is None or bool(self.pattern.search(name))
+
+    def skip(self, name: str, reason: str) -> None:
+        if self.selected(name):
+            self.results[name] = {"skipped": reason}
+            print(f"{name:<60} skipped: {reason}", file=self.out, flush=True)
+
+    def _record(self, name: str, number: int, timings: List[float], units: Optional[float], unit: str) -> None:
+        per_op = [t / number for t in timings]
+        result = {
+            "median_us": round(statistics.median(per_op) * 1e6, 3),
+            "min_us": round(min(per_op) * 1e6, 3),
+            "ops_per_sec": round(1 / statistics.median(per_op), 1),
+            "number": number,
+            "repeat": len(timings),
+        }
+        if units:
+            result[f"{unit}_per_sec"] = round(units / statistics.median(per_op), 1)
+        self.results[name] = result
+        print(f"{name:<60} {result['median_us']:>12.2f} us  (min {result['min_us']:.2f}, x{number})", file=self.out, flush=True)
+
+    def run(self, name: str, fn: Callable[[], Any], units: Optional[float] = None, unit: str = "bytes") -> None:
+        if not self.selected(name):
+            return
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.min_time or number >= 1 << 24:
+                break
+            number *= 2 if elapsed > self.min_time / 10 else 10
+        timings = [elapsed]
+        for _ in range(self.repeat - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            timings.append(time.perf_counter() - start)
+        self._record(name, number, timings, units, unit)
+
+    def run_async(self, name: str, fn: Callable[[], Awaitable[Any]], units: Optional[float] = None,
+                  unit: str = "bytes", reset: Optional[Callable[[], Any]] = None) -> None:
+        """Like run for a coroutine function; ``reset`` (may be async) runs untimed after each timed run."""
+        if not self.selected(name):
+            return
+
+        async def timed(number: int) -> float:
+            start = time.perf_counter()
+            for _ in range(number):
+                await fn()
+            elapsed = time.perf_counter() - start
+            if reset is not None:
+                result = reset()
+                if inspect.isawaitable(result):
+                    await result
+            return elapsed
+
+        async def main():
+            number = 1
+            while True:
+                elapsed = await timed(number)
+                if elapsed >= self.min_time or number >= 1 << 24:
+                    break
+                number *= 2 if elapsed > self.min_time / 10 else 10
+            timings = [elapsed]
+            for _ in range(self.repeat - 1):
+                timings.append(await timed(number))
+            return number, timings
+
+        number, timings = asyncio.run(main())
+        self._record(name, number, timings, units, unit)
+
+
+class _FakeUpstream:
+    """Realtime API socket that accepts everything."""
+    close_code = None
+
+    async def send(self, message: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+def bench_client(bench: Benchmark) -> None:
+    from openai_realtime_client.client.realtime_client import RealtimeClient, _convert_audio_bytes
+
+    chunk = _speech(CHUNK_MS)
+
+    for audio_format in ("pcm16", "g711_ulaw"):
+        client = RealtimeClient(api_key="bench", audio_format=audio_format)
+        client.ws = _FakeUpstream()
+        bench.run_async(
+            f"stream_audio[{audio_format}]",
+            lambda client=client: client.stream_audio(chunk),
+            units=len(chunk),
+            reset=client.send_queue.clear,
+        )
+
+    wav = _wav(_speech(1000))
+    bench.run("convert_audio_bytes[wav16k_stereo]", lambda: _convert_audio_bytes(wav), units=len(wav))
+    bench.run("convert_audio_bytes[pcm16]", lambda: _convert_audio_bytes(chunk, sample_rate=RATE), units=len(chunk))
+    bench.run(
+        "convert_audio_bytes[pcm16_to_g711_ulaw]",
+        lambda: _convert_audio_bytes(chunk, sample_rate=RATE, audio_format="g711_ulaw"),
+        units=len(chunk),
+    )
+
+    delta = base64.b64encode(_speech(100)).decode()
+    events = {
+        "response.audio.delta": {"type": "response.audio.delta", "event_id": "event_1", "response_id": "resp_1",
+                                 "item_id": "item_1", "output_index": 0, "content_index": 0, "delta": delta},
+        "response.audio_transcript.delta": {"type": "response.audio_transcript.delta", "event_id": "event_2",
+                                            "response_id": "resp_1", "item_id": "item_1", "output_index": 0,
+                                            "content_index": 0, "delta": "Hola, "},
+        "response.created": {"type": "response.created", "event_id": "event_3",
+                             "response": {"id": "resp_1", "status": "in_progress", "output": []}},
+        "response.done": {"type": "response.done", "event_id": "event_4", "response": {
+            "id": "resp_1", "status": "completed",
+            "output": [{"id": "item_1", "type": "message", "role": "assistant",
+                        "content": [{"type": "audio", "transcript": "Hola, son las diez."}]}],
+            "usage": {"total_tokens": 120, "input_tokens": 80, "output_tokens": 40}}},
+        "conversation.item.input_audio_transcription.completed": {
+            "type": "conversation.item.input_audio_transcription.completed", "event_id": "event_5",
+            "item_id": "item_0", "content_index": 0, "transcript": "¿Qué hora es?"},
+        "rate_limits.updated": {"type": "rate_limits.updated", "event_id": "event_6", "rate_limits": [
+            {"name": "requests", "limit": 1000, "remaining": 999, "reset_seconds": 60},
+            {"name": "tokens", "limit": 50000, "remaining": 49000, "reset_seconds": 60}]},
+    }
+
+    async def noop(*args):
+        pass
+
+    for event_type, event in events.items():
+        client = RealtimeClient(
+            api_key="bench",
+            on_audio_delta=noop,
+            on_input_transcript=noop,
+            on_output_transcript=noop,
+        )
+        message = json.dumps(event)
+        bench.run_async(
+            f"handle_message[{event_type}]",
+            lambda client=client, message=message: client._handle_message(message),
+            reset=client._history.clear,
+        )
+
+
+class _FakeClientSocket:
+    """Starlette WebSocket to a browser that reads each message as it is written."""
+    def __init__(self):
+        from starlette.websockets import WebSocketState
+        self.application_state = WebSocketState.CONNECTED
+
+    async def send_text(self, message: str) -> None:
+        # A real socket write yields to the event loop
+        await asyncio.sleep(0)
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        from starlette.websockets import WebSocketState
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+def bench_ws_handler(bench: Benchmark) -> None:
+    from openai_realtime_client.handlers.ws_handler import WsHandler
+
+    chunk = _speech(100)
+    handler = None
+
+    async def send():
+        nonlocal handler
+        if handler is None:
+            handler = WsHandler(_FakeClientSocket())
+        await handler.send_audio(chunk)
+        # Time the write too: wait until the sender task sent it
+        while handler.backlog_bytes:
+            await asyncio.sleep(0)
+
+    async def reset():
+        # A fresh handler per timed run, so no run times a disconnected client
+        nonlocal handler
+        assert not handler.slow_consumer, "benchmark client was disconnected as a slow consumer"
+        sender = handler._sender
+        if sender is not None:
+            sender.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sender
+        handler = None
+
+    bench.run_async("ws_handler.send_audio", send, units=len(chunk), reset=reset)
+
+
+def _rag_env() -> None:
+    os.environ.setdefault("RAG_AUTOLOAD", "false")
+    os.environ.setdefault("RAG_TRACING", "off")
+    os.environ.setdefault("RAG_DOCS_DIR", "rag_docs")
+    os.environ.setdefault("RAG_COLLECTION", "microbench")
+    os.environ.setdefault("OPENAI_EMBEDDING_SIZE", "256")
+    os.environ.setdefault("RAG_MODEL", "gpt-4o-mini")
+    os.environ.setdefault("OPENAI_API_KEY", "microbench")
+
+
+def bench_rag(bench: Benchmark) -> None:
+    _rag_env()
+    try:
+        from llama_index.core import Document
+        from llama_index.core.embeddings import BaseEmbedding
+        import rag
+        from rag.ParagraphSplitter import ParagraphSplitter
+        from rag import rag_tool
+    except ImportError as e:
+        bench.skip("paragraph_splitter.parse_nodes[1MB]", str(e))
+        bench.skip("rag.query_rag", str(e))
+        return
+
+    paragraph = (
+        "El horario de atención al público es de lunes a viernes de 9:00 a 14:00 horas. "
+        "Para solicitar una cita previa puede llamar por teléfono o usar la sede electrónica.\n\n"
+    )
+    text = paragraph * (1_000_000 // len(paragraph))
+    documents = [Document(text=text, id_="microbench")]
+    splitter = ParagraphSplitter()
+    bench.run(
+        "paragraph_splitter.parse_nodes[1MB]",
+        lambda: splitter._parse_nodes(documents),
+        units=len(text.encode()),
+    )
+
+    if not bench.selected("rag.query_rag"):
+        return
+
+    dimensions = int(os.environ["OPENAI_EMBEDDING_SIZE"])
+
+    class HashEmbedding(BaseEmbedding):
+        """Deterministic bag-of-words embedding: each word hashed to a dimension."""
+
+        def _embed(self, text: str) -> List[float]:
+            vector = [0.0] * dimensions
+            for word in re.findall(r"\w+", text.lower()):
+                digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+                vector[int.from_bytes(digest, "little") % dimensions] += 1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            return [v / norm for v in vector]
+
+        def _get_query_embedding(self, query: str) -> List[float]:
+            return self._embed(query)
+
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return self._embed(text)
+
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            return self._embed(query)
+
+    rag.get_index(embed_model=HashEmbedding(model_name="microbench-hash"))
+    # As the tool calls it: builds the query engine, then retrieves and synthesizes
+    bench.run("rag.query_rag", lambda: rag_tool.query_rag("¿Cuál es el horario de atención?"))
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Print the change of each case against the baseline and return the regressed cases."""
+    regressions = []
+    print(f"\n{'case':<60} {'baseline us':>12} {'now us':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name, {})
+        if "median_us" not in result or "median_us" not in before:
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<60} {before['median_us']:>12.2f} {result['median_us']:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown of the median that counts as a regression (0.10 = 10%%)")
+    parser.add_argument("--filter", help="Only run cases matching this regular expression")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timed run")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    args = parser.parse_args()
+
+    bench = Benchmark(min_time=args.min_time, repeat=args.repeat, pattern=args.filter)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for suite in (bench_client, bench_ws_handler, bench_rag):
+            suite(bench)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": bench.results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(bench.results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ tools = [FunctionTool.from_defaults(fn=get_current_time)]
 
 async def main():
     load_dotenv()
+    # Stream audio to the API while recording instead of uploading it when recording stops
+    stream_recording = os.getenv("MANUAL_STREAM_RECORDING", "true").lower() == "true"
     try:
         from pynput import keyboard  # type: ignore
     except ImportError as e:
@@ -29,6 +31,7 @@ async def main():
         model=os.environ.get("OPENAI_MODEL"),
         on_text_delta=lambda text: print(f"\nAssistant: {text}", end="", flush=True),
         on_audio_delta=lambda audio: audio_handler.play_audio(audio),
+        playback_position=audio_handler.playback_position_ms,
         on_input_transcript=lambda transcript: print(f"\nYou said: {transcript}\nAssistant: ", end="", flush=True),
         on_output_transcript=lambda transcript: print(f"{transcript}", end="", flush=True),
         tools=tools,
@@ -61,14 +64,18 @@ async def main():
                 break
             elif command == 'r':
                 # Start recording
-                audio_handler.start_recording()
+                audio_handler.start_recording(client if stream_recording else None)
             elif command == 'space':
                 print("[About to stop recording]")
                 if audio_handler.recording:
                     # Stop recording and get audio data
                     audio_data = audio_handler.stop_recording()
                     print("[Recording stopped]")
-                    if audio_data:
+                    if stream_recording:
+                        await audio_handler.flush_recording()
+                        await client.commit_audio()
+                        print("[Audio committed]")
+                    elif audio_data:
                         await client.send_audio(audio_data)
                         print("[Audio sent]")
             elif command == 'enter' and data:
@@ -0,0 +1,64 @@
+"""Production entry point for the FastAPI examples.
+
+Runs an example app under uvicorn with several worker processes sharing the
+port, so sessions spread over the CPU cores:
+
+    python examples/serve.py ws_hal9000:app --workers 4
+
+Each worker limits its sessions (``MAX_SESSIONS``) and drains them on
+SIGTERM (``DRAIN_TIMEOUT``), see ``openai_realtime_client.admission``. uvloop
+is used when it is installed (``pip install uvloop``), unless ``--loop asyncio``.
+With more than one worker, Prometheus metrics are aggregated over the workers
+through ``PROMETHEUS_MULTIPROC_DIR``.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run an example app with several uvicorn workers.")
+    parser.add_argument("app", nargs="?", default=os.getenv("APP", "ws_hal9000:app"),
+                        help="App import string, relative to examples/")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes, e.g. one per core")
+    parser.add_argument("--loop", default=os.getenv("UVICORN_LOOP", "auto"), choices=["auto", "asyncio", "uvloop"],
+                        help="Event loop; auto uses uvloop when it is installed")
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT", "10")),
+                        help="Seconds to wait for connections to close after the drain")
+    args = parser.parse_args()
+
+    metrics_dir = None
+    if args.workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Must be set before the workers import prometheus_client
+        metrics_dir = tempfile.mkdtemp(prefix="prometheus-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    print(f"Starting {args.app} with {args.workers} worker(s) on {args.host}:{args.port}...")
+    try:
+        uvicorn.run(
+            args.app,
+            app_dir=BASE_DIR,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            loop=args.loop,
+            timeout_graceful_shutdown=args.graceful_timeout,
+        )
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ let pulseTimeout;
 let nextPlaybackTime = 0;
 let activeSources = [];
 let isMuted = false;
+// Audio format announced by the server: pcm16 (24 kHz) or g711_ulaw/g711_alaw (8 kHz)
+let audioFormat = 'pcm16';
+let decimationRemainder = new Int16Array(0);
 
 const startBtn = document.getElementById('startBtn');
 const stopBtn = document.getElementById('stopBtn');
@@ -47,6 +50,11 @@ muteBtn.addEventListener('click', () => {
 
 function handleMessage(event) {
     const data = JSON.parse(event.data);
+    if (data.event === 'config') {
+        audioFormat = data.audio_format || 'pcm16';
+        decimationRemainder = new Int16Array(0);
+        return;
+    }
     if (data.event === 'clear') {
         clearAudio();
         return;
@@ -58,9 +66,11 @@ function handleMessage(event) {
         for (let i = 0; i < binary.length; i++) {
             view[i] = binary.charCodeAt(i);
         }
-        const int16 = new Int16Array(buf);
-        const pcm = int16ToPCM(int16);
-        playAudio(pcm);
+        if (audioFormat === 'pcm16') {
+            playAudio(int16ToPCM(new Int16Array(buf)), 24000);
+        } else {
+            playAudio(g711ToPCM(view, audioFormat), 8000);
+        }
     }
 }
 
@@ -75,7 +85,7 @@ async function startAudio() {
         processor.port.onmessage = e => {
             const pcm16 = e.data;
             if (!isMuted && ws.readyState === WebSocket.OPEN) {
-                ws.send(pcm16.buffer);
+                ws.send(encodeInput(pcm16));
             }
         };
     } else {
@@ -84,7 +94,7 @@ async function startAudio() {
             const input = e.inputBuffer.getChannelData(0);
             const pcm16 = floatTo16BitPCM(input);
             if (!isMuted && ws.readyState === WebSocket.OPEN) {
-                ws.send(pcm16.buffer);
+                ws.send(encodeInput(pcm16));
             }
         };
     }
@@ -142,8 +152,107 @@ function int16ToPCM(int16) {
     return pcm;
 }
 
-function playAudio(pcm) {
-    const buffer = audioContext.createBuffer(1, pcm.length, 24000);
+// Encode captured 24 kHz PCM16 in the format expected by the server
+function encodeInput(pcm16) {
+    if (audioFormat === 'pcm16') {
+        return pcm16.buffer;
+    }
+    // Downsample 24 kHz -> 8 kHz by averaging groups of 3 samples
+    let samples = pcm16;
+    if (decimationRemainder.length) {
+        samples = new Int16Array(decimationRemainder.length + pcm16.length);
+        samples.set(decimationRemainder);
+        samples.set(pcm16, decimationRemainder.length);
+    }
+    const n = Math.floor(samples.length / 3);
+    decimationRemainder = samples.slice(n * 3);
+    const encode = audioFormat === 'g711_alaw' ? linearToAlaw : linearToUlaw;
+    const out = new Uint8Array(n);
+    for (let i = 0; i < n; i++) {
+        const j = i * 3;
+        out[i] = encode(Math.round((samples[j] + samples[j + 1] + samples[j + 2]) / 3));
+    }
+    return out.buffer;
+}
+
+// G.711 encoders/decoders (ITU-T reference algorithm)
+const ULAW_SEG_END = [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF];
+const ALAW_SEG_END = [0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF];
+
+function segment(value, table) {
+    for (let i = 0; i < table.length; i++) {
+        if (value <= table[i]) return i;
+    }
+    return table.length;
+}
+
+function linearToUlaw(sample) {
+    let mask = 0xFF;
+    let value = sample >> 2;
+    if (value < 0) {
+        value = -value;
+        mask = 0x7F;
+    }
+    value = Math.min(value, 8159) + (0x84 >> 2);
+    const seg = segment(value, ULAW_SEG_END);
+    if (seg >= 8) return 0x7F ^ mask;
+    return ((seg << 4) | ((value >> (seg + 1)) & 0x0F)) ^ mask;
+}
+
+function linearToAlaw(sample) {
+    let mask = 0xD5;
+    let value = sample >> 3;
+    if (value < 0) {
+        value = -value - 1;
+        mask = 0x55;
+    }
+    const seg = segment(value, ALAW_SEG_END);
+    if (seg >= 8) return 0x7F ^ mask;
+    const quant = seg < 2 ? (value >> 1) & 0x0F : (value >> seg) & 0x0F;
+    return ((seg << 4) | quant) ^ mask;
+}
+
+function ulawToLinear(u) {
+    u = ~u & 0xFF;
+    let t = ((u & 0x0F) << 3) + 0x84;
+    t <<= (u & 0x70) >> 4;
+    return (u & 0x80) ? (0x84 - t) : (t - 0x84);
+}
+
+function alawToLinear(a) {
+    a ^= 0x55;
+    let t = (a & 0x0F) << 4;
+    const seg = (a & 0x70) >> 4;
+    if (seg === 0) {
+        t += 8;
+    } else {
+        t = (t + 0x108) << (seg - 1);
+    }
+    return (a & 0x80) ? t : -t;
+}
+
+function buildDecodeTable(decode) {
+    const table = new Float32Array(256);
+    for (let i = 0; i < 256; i++) {
+        table[i] = decode(i) / 32768;
+    }
+    return table;
+}
+
+const ULAW_TABLE = buildDecodeTable(ulawToLinear);
+const ALAW_TABLE = buildDecodeTable(alawToLinear);
+
+function g711ToPCM(bytes, format) {
+    const table = format === 'g711_alaw' ? ALAW_TABLE : ULAW_TABLE;
+    const pcm = new Float32Array(bytes.length);
+    for (let i = 0; i < bytes.length; i++) {
+        pcm[i] = table[bytes[i]];
+    }
+    return pcm;
+}
+
+function playAudio(pcm, sampleRate) {
+    const buffer = audioContext.createBuffer(1, pcm.length, sampleRate);
     buffer.copyToChannel(pcm, 0);
     const src = audioContext.createBufferSource();
     src.buffer = buffer;
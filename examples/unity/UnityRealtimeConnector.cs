@@ -1,16 +1,21 @@
 using UnityEngine;
 using WebSocketSharp;
 using System;
+using System.Collections.Generic;
 
 public class UnityRealtimeConnector : MonoBehaviour
 {
     [Header("WebSocket settings")]
     public string serverUrl = "ws://localhost:8000/ws";
     public AudioSource audioSource;
+    [Tooltip("pcm16, g711_ulaw or g711_alaw. Updated from the server's config event.")]
+    public string audioFormat = "pcm16";
 
     private WebSocket ws;
     private AudioClip micClip;
     private int lastSample = 0;
+    private volatile bool pendingMicRestart = false;
+    private readonly Queue<byte[]> pendingAudio = new Queue<byte[]>();
 
     void Start()
     {
@@ -20,12 +25,21 @@ public class UnityRealtimeConnector : MonoBehaviour
         ws.Connect();
 
         // Begin recording from the default microphone
-        micClip = Microphone.Start(null, true, 1, 16000);
+        StartMicrophone();
 
         // Send audio chunks every 100ms
         InvokeRepeating(nameof(SendMicData), 0.1f, 0.1f);
     }
 
+    bool IsG711 => audioFormat == "g711_ulaw" || audioFormat == "g711_alaw";
+
+    void StartMicrophone()
+    {
+        // G.711 is 8 kHz; PCM16 is sent at the Realtime API's 24 kHz
+        micClip = Microphone.Start(null, true, 1, IsG711 ? 8000 : 24000);
+        lastSample = 0;
+    }
+
     void SendMicData()
     {
         if (micClip == null || ws == null || ws.ReadyState != WebSocketState.Open)
@@ -38,7 +52,7 @@ public class UnityRealtimeConnector : MonoBehaviour
 
         float[] samples = new float[diff * micClip.channels];
         micClip.GetData(samples, lastSample);
-        byte[] bytes = FloatArrayToPCM16(samples);
+        byte[] bytes = IsG711 ? FloatArrayToG711(samples) : FloatArrayToPCM16(samples);
 
         ws.Send(bytes);
         lastSample = pos;
@@ -57,30 +71,148 @@ public class UnityRealtimeConnector : MonoBehaviour
         return bytes;
     }
 
+    byte[] FloatArrayToG711(float[] samples)
+    {
+        bool alaw = audioFormat == "g711_alaw";
+        byte[] bytes = new byte[samples.Length];
+        for (int i = 0; i < samples.Length; i++)
+        {
+            int val = (int)(Mathf.Clamp(samples[i], -1f, 1f) * short.MaxValue);
+            bytes[i] = alaw ? LinearToAlaw(val) : LinearToUlaw(val);
+        }
+        return bytes;
+    }
+
+    // G.711 encoders/decoders (ITU-T reference algorithm)
+    static readonly int[] UlawSegEnd = { 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF };
+    static readonly int[] AlawSegEnd = { 0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF };
+
+    static int Segment(int value, int[] table)
+    {
+        for (int i = 0; i < table.Length; i++)
+        {
+            if (value <= table[i])
+                return i;
+        }
+        return table.Length;
+    }
+
+    static byte LinearToUlaw(int sample)
+    {
+        int mask = 0xFF;
+        int value = sample >> 2;
+        if (value < 0)
+        {
+            value = -value;
+            mask = 0x7F;
+        }
+        value = Math.Min(value, 8159) + (0x84 >> 2);
+        int seg = Segment(value, UlawSegEnd);
+        if (seg >= 8)
+            return (byte)(0x7F ^ mask);
+        return (byte)(((seg << 4) | ((value >> (seg + 1)) & 0x0F)) ^ mask);
+    }
+
+    static byte LinearToAlaw(int sample)
+    {
+        int mask = 0xD5;
+        int value = sample >> 3;
+        if (value < 0)
+        {
+            value = -value - 1;
+            mask = 0x55;
+        }
+        int seg = Segment(value, AlawSegEnd);
+        if (seg >= 8)
+            return (byte)(0x7F ^ mask);
+        int quant = seg < 2 ? (value >> 1) & 0x0F : (value >> seg) & 0x0F;
+        return (byte)(((seg << 4) | quant) ^ mask);
+    }
+
+    static int UlawToLinear(byte b)
+    {
+        int u = ~b & 0xFF;
+        int t = ((u & 0x0F) << 3) + 0x84;
+        t <<= (u & 0x70) >> 4;
+        return (u & 0x80) != 0 ? 0x84 - t : t - 0x84;
+    }
+
+    static int AlawToLinear(byte b)
+    {
+        int a = b ^ 0x55;
+        int t = (a & 0x0F) << 4;
+        int seg = (a & 0x70) >> 4;
+        if (seg == 0)
+            t += 8;
+        else
+            t = (t + 0x108) << (seg - 1);
+        return (a & 0x80) != 0 ? t : -t;
+    }
+
     void OnMessage(object sender, MessageEventArgs e)
     {
         if (!e.IsText)
             return;
 
         Payload payload = JsonUtility.FromJson<Payload>(e.Data);
+        if (payload.@event == "config" && !string.IsNullOrEmpty(payload.audio_format))
+        {
+            if (payload.audio_format != audioFormat)
+            {
+                audioFormat = payload.audio_format;
+                pendingMicRestart = true;
+            }
+            return;
+        }
         if (!string.IsNullOrEmpty(payload.audio))
         {
             byte[] audioBytes = Convert.FromBase64String(payload.audio);
+            lock (pendingAudio)
+            {
+                pendingAudio.Enqueue(audioBytes);
+            }
+        }
+    }
+
+    void Update()
+    {
+        // websocket-sharp raises events on a background thread; Unity APIs must be used here
+        if (pendingMicRestart)
+        {
+            pendingMicRestart = false;
+            Microphone.End(null);
+            StartMicrophone();
+        }
+        while (true)
+        {
+            byte[] audioBytes;
+            lock (pendingAudio)
+            {
+                if (pendingAudio.Count == 0)
+                    break;
+                audioBytes = pendingAudio.Dequeue();
+            }
             PlayAudio(audioBytes);
         }
     }
 
     void PlayAudio(byte[] audioBytes)
     {
-        int sampleCount = audioBytes.Length / 2;
+        bool g711 = IsG711;
+        bool alaw = audioFormat == "g711_alaw";
+        int sampleCount = g711 ? audioBytes.Length : audioBytes.Length / 2;
         float[] samples = new float[sampleCount];
         for (int i = 0; i < sampleCount; i++)
         {
-            short sample = BitConverter.ToInt16(audioBytes, i * 2);
+            int sample;
+            if (g711)
+                sample = alaw ? AlawToLinear(audioBytes[i]) : UlawToLinear(audioBytes[i]);
+            else
+                sample = BitConverter.ToInt16(audioBytes, i * 2);
             samples[i] = sample / 32768f;
         }
 
-        AudioClip clip = AudioClip.Create("assistant", sampleCount, 1, 24000, false);
+        AudioClip clip = AudioClip.Create("assistant", sampleCount, 1, g711 ? 8000 : 24000, false);
         clip.SetData(samples, 0);
         audioSource.clip = clip;
         audioSource.Play();
@@ -90,6 +222,8 @@ public class UnityRealtimeConnector : MonoBehaviour
     public class Payload
     {
         public string audio;
+        public string @event;
+        public string audio_format;
     }
 
     void OnDestroy()
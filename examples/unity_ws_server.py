@@ -1,39 +1,142 @@
 import os
 import asyncio
+import secrets
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
-from openai_realtime_client import RealtimeClient, TurnDetectionMode, WsHandler
+from openai_realtime_client import (
+    RateLimitTracker,
+    RealtimeClient,
+    SessionUsage,
+    TurnDetectionMode,
+    UsageSink,
+    WsHandler,
+)
+from openai_realtime_client.admission import TRY_AGAIN_LATER_CLOSE_CODE, SessionLimiter, drain_on_signal
+from openai_realtime_client.client.usage import jsonl_writer, process_usage
+from openai_realtime_client.diagnostics import LoopMonitor, profile_event_loop
+from openai_realtime_client.metrics import mark_worker_stopped, render_metrics
 
 # Load environment variables from .env if present
 load_dotenv()
 
-app = FastAPI()
+# Audio format between Unity and the Realtime API:
+# pcm16, g711_ulaw or g711_alaw. G.711 is passed through without transcoding.
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "pcm16")
+
+# Log event-loop stalls longer than this with stack samples (0 disables)
+LOOP_STALL_MS = float(os.getenv("LOOP_STALL_MS", "100"))
+# Time event handlers and callbacks, logging those slower than this (0 disables)
+SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", "0"))
+# Token for the /admin endpoints (empty disables them)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Concurrent /ws sessions per worker process (0 for no limit). Sessions over
+# the limit wait in a queue of SESSION_QUEUE_SIZE for SESSION_QUEUE_TIMEOUT
+# seconds, or are closed right away with code 1013 (try again later).
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "50"))
+SESSION_QUEUE_SIZE = int(os.getenv("SESSION_QUEUE_SIZE", "0"))
+SESSION_QUEUE_TIMEOUT = float(os.getenv("SESSION_QUEUE_TIMEOUT", "5"))
+# Seconds running sessions get to finish on shutdown
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "120"))
+
+# Realtime API budgets (from rate_limits.updated) shared by the sessions of
+# the worker: below RATE_LIMIT_MIN_TOKENS responses are deferred and tool
+# outputs trimmed, below RATE_LIMIT_SESSION_MIN_TOKENS new sessions are
+# rejected (0 disables either)
+rate_limits = RateLimitTracker(
+    min_tokens=int(os.getenv("RATE_LIMIT_MIN_TOKENS", "4000")),
+    session_min_tokens=int(os.getenv("RATE_LIMIT_SESSION_MIN_TOKENS", "20000")),
+)
+
+# Token cap per session (0 for no cap); the session ends once it is exceeded
+SESSION_MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "0"))
+# JSON Lines file receiving per-turn and per-session usage records (empty disables)
+USAGE_LOG = os.getenv("USAGE_LOG", "")
+
+usage_sink = UsageSink(jsonl_writer(USAGE_LOG)) if USAGE_LOG else None
+
+session_limiter = SessionLimiter(MAX_SESSIONS, SESSION_QUEUE_SIZE, SESSION_QUEUE_TIMEOUT, rate_limits)
+
+loop_monitor = LoopMonitor(stall_threshold=LOOP_STALL_MS / 1000) if LOOP_STALL_MS > 0 else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if loop_monitor is not None:
+        loop_monitor.start()
+    drain_on_signal(session_limiter, DRAIN_TIMEOUT)
+    yield
+    if loop_monitor is not None:
+        loop_monitor.stop()
+    if usage_sink is not None:
+        await usage_sink.close()
+    mark_worker_stopped()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/health", response_class=JSONResponse)
 async def health_check():
     """Simple health check endpoint."""
+    if session_limiter.draining:
+        return JSONResponse({"message": "Shutting down"}, status_code=503)
     return {"message": "Unity Realtime server running"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, x_admin_token: str = Header(default="")):
+    """Sample the event loop for a few seconds; returns folded stacks for a flame graph."""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=404)
+    return await profile_event_loop(min(seconds, 60.0))
+
+
+@app.get("/admin/usage", response_class=JSONResponse)
+async def usage(x_admin_token: str = Header(default="")):
+    """Token usage and estimated cost of all sessions of this worker."""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=404)
+    return process_usage.to_dict()
+
+
 @app.websocket("/ws")
 async def unity_realtime_endpoint(websocket: WebSocket):
     """Handle audio streaming between Unity and the Realtime API."""
     await websocket.accept()
+    if not await session_limiter.acquire():
+        reason = "Server shutting down" if session_limiter.draining else "Server busy"
+        await websocket.close(code=TRY_AGAIN_LATER_CLOSE_CODE, reason=reason)
+        return
 
-    ws_handler = WsHandler(websocket)
+    ws_handler = WsHandler(websocket, audio_format=AUDIO_FORMAT)
     client = RealtimeClient(
         api_key=os.getenv("OPENAI_API_KEY"),
         model=os.getenv("OPENAI_MODEL"),
-        on_audio_delta=lambda audio: asyncio.create_task(ws_handler.send_audio(audio)),
+        on_audio_delta=ws_handler.send_audio,
         on_text_delta=lambda text: print(f"\nAssistant: {text}", end="", flush=True),
         on_input_transcript=lambda t: print(f"\nUser: {t}\nAssistant: ", end="", flush=True),
         # Opcional: limpiar output si hay interrupciones/cortes
-        on_interrupt=lambda: asyncio.create_task(ws_handler.send_clear_event()),
+        on_interrupt=ws_handler.send_clear_event,
         language="es",
         turn_detection_mode=TurnDetectionMode.SEMANTIC_VAD,
+        audio_format=AUDIO_FORMAT,
+        transcode_audio=False,
+        slow_callback_ms=SLOW_CALLBACK_MS or None,
+        rate_limits=rate_limits,
+        usage=SessionUsage(
+            os.getenv("OPENAI_MODEL"), max_tokens=SESSION_MAX_TOKENS or None, sink=usage_sink
+        ),
     )
 
     tasks = []
@@ -45,9 +148,10 @@ async def unity_realtime_endpoint(websocket: WebSocket):
         tasks.append(asyncio.create_task(client.handle_messages()))
         tasks.append(asyncio.create_task(ws_handler.start_streaming(client)))
 
-        # Mantiene vivo el endpoint hasta que alguna falle o el cliente cierre
+        # Mantiene vivo el endpoint hasta que alguna falle o termine
+        # (cliente desconectado, demasiado lento o conexión con OpenAI cerrada)
         done, pending = await asyncio.wait(
-            tasks, return_when=asyncio.FIRST_EXCEPTION
+            tasks, return_when=asyncio.FIRST_COMPLETED
         )
 
         # Propaga la primera excepción (si la hubo)
@@ -65,6 +169,7 @@ async def unity_realtime_endpoint(websocket: WebSocket):
             t.cancel()
         await ws_handler.stop_streaming()
         await client.close()
+        session_limiter.release()
 
 
 if __name__ == "__main__":
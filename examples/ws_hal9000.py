@@ -1,19 +1,41 @@
 import os
 import asyncio
+import secrets
+import time
+import uuid
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Header, HTTPException, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from starlette.staticfiles import StaticFiles
 from starlette.websockets import WebSocketDisconnect
 
-from openai_realtime_client import RealtimeClient, TurnDetectionMode, WsHandler
+from openai_realtime_client import (
+    BargeInDetector,
+    ConversationWindow,
+    RateLimitTracker,
+    RealtimeClient,
+    RealtimeSessionPool,
+    SessionRecorder,
+    SessionUsage,
+    TurnDetectionMode,
+    UsageSink,
+    WsHandler,
+)
+from openai_realtime_client.admission import TRY_AGAIN_LATER_CLOSE_CODE, SessionLimiter, drain_on_signal
+from openai_realtime_client.client.usage import jsonl_writer, process_usage
+from openai_realtime_client.diagnostics import LoopMonitor, profile_event_loop
+from openai_realtime_client.metrics import mark_worker_stopped, render_metrics
 from llama_index.core.tools import FunctionTool, ToolMetadata
 from tools import get_current_time, get_current_date, query_rag
 
 # Load environment variables
 load_dotenv()
 
+# Interrupt the assistant as soon as the browser's audio contains speech
+LOCAL_BARGE_IN = os.getenv("LOCAL_BARGE_IN", "false").lower() == "true"
+
 # Initialize tools
 class NoArgsSchema(BaseModel):
     pass
@@ -49,42 +71,185 @@ tools = [
     ),
 ]
 
-app = FastAPI()
+# Audio format between the browser and the Realtime API:
+# pcm16, g711_ulaw or g711_alaw. G.711 is passed through without transcoding.
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "pcm16")
 
-@app.get("/health", response_class=JSONResponse)
-async def health_check():
-    return {"message": "Realtime Assistant server is running!"}
+# Pre-connected Realtime sessions handed to new callers (0 disables the pool)
+POOL_MIN_SIZE = int(os.getenv("REALTIME_POOL_MIN_SIZE", "0"))
+POOL_MAX_SIZE = int(os.getenv("REALTIME_POOL_MAX_SIZE", "10"))
+POOL_IDLE_TTL = float(os.getenv("REALTIME_POOL_IDLE_TTL", "600"))
 
-@app.websocket("/ws")
-async def handle_media_stream(websocket: WebSocket):
-    await websocket.accept()
-    ws_handler = WsHandler(websocket)
+# Survive upstream network blips without restarting the dialog
+AUTO_RECONNECT = os.getenv("REALTIME_AUTO_RECONNECT", "true").lower() == "true"
+
+# Prune old conversation items once a response reads more input tokens (0 disables)
+MAX_INPUT_TOKENS = int(os.getenv("REALTIME_MAX_INPUT_TOKENS", "0"))
+
+# One OpenTelemetry trace per voice turn, exported with the RAG traces (RAG_TRACING)
+TRACE_TURNS = os.getenv("REALTIME_TRACE_TURNS", "false").lower() == "true"
+
+# Record every session's events to this directory for replay (empty disables)
+RECORD_DIR = os.getenv("REALTIME_RECORD_DIR", "")
+
+# Log event-loop stalls longer than this with stack samples (0 disables)
+LOOP_STALL_MS = float(os.getenv("LOOP_STALL_MS", "100"))
+# Time event handlers and callbacks, logging those slower than this (0 disables)
+SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", "0"))
+# Token for the /admin endpoints (empty disables them)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
-    client = RealtimeClient(
+# Concurrent /ws sessions per worker process (0 for no limit). Sessions over
+# the limit wait in a queue of SESSION_QUEUE_SIZE for SESSION_QUEUE_TIMEOUT
+# seconds, or are closed right away with code 1013 (try again later).
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "50"))
+SESSION_QUEUE_SIZE = int(os.getenv("SESSION_QUEUE_SIZE", "0"))
+SESSION_QUEUE_TIMEOUT = float(os.getenv("SESSION_QUEUE_TIMEOUT", "5"))
+# Seconds running sessions get to finish on shutdown
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "120"))
+
+# Realtime API budgets (from rate_limits.updated) shared by the sessions of
+# the worker: below RATE_LIMIT_MIN_TOKENS responses are deferred and tool
+# outputs trimmed, below RATE_LIMIT_SESSION_MIN_TOKENS new sessions are
+# rejected (0 disables either)
+rate_limits = RateLimitTracker(
+    min_tokens=int(os.getenv("RATE_LIMIT_MIN_TOKENS", "4000")),
+    session_min_tokens=int(os.getenv("RATE_LIMIT_SESSION_MIN_TOKENS", "20000")),
+)
+
+# Token cap per session (0 for no cap); the session ends once it is exceeded
+SESSION_MAX_TOKENS = int(os.getenv("SESSION_MAX_TOKENS", "0"))
+# JSON Lines file receiving per-turn and per-session usage records (empty disables)
+USAGE_LOG = os.getenv("USAGE_LOG", "")
+
+usage_sink = UsageSink(jsonl_writer(USAGE_LOG)) if USAGE_LOG else None
+
+session_limiter = SessionLimiter(MAX_SESSIONS, SESSION_QUEUE_SIZE, SESSION_QUEUE_TIMEOUT, rate_limits)
+
+
+def create_recorder():
+    if not RECORD_DIR:
+        return None
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.rtrec"
+    return SessionRecorder(os.path.join(RECORD_DIR, name))
+
+
+def create_client(**callbacks) -> RealtimeClient:
+    return RealtimeClient(
         api_key=os.getenv("OPENAI_API_KEY"),
         model=os.getenv("OPENAI_MODEL"),
         on_text_delta=lambda text: print(f"\nAssistant: {text}", end="", flush=True),
-        on_audio_delta=lambda audio: asyncio.create_task(ws_handler.send_audio(audio)),
         on_input_transcript=lambda t: print(f"\nYou said: {t}\nAssistant: ", end="", flush=True),
         on_output_transcript=lambda t: print(f"{t}", end="", flush=True),
-        on_interrupt=lambda: asyncio.create_task(ws_handler.send_clear_event()),
         turn_detection_mode=TurnDetectionMode.SEMANTIC_VAD,
+        audio_format=AUDIO_FORMAT,
+        transcode_audio=False,
         language="es",
         tools=tools,
+        barge_in=BargeInDetector() if LOCAL_BARGE_IN else None,
+        auto_reconnect=AUTO_RECONNECT,
+        conversation_window=ConversationWindow(MAX_INPUT_TOKENS) if MAX_INPUT_TOKENS > 0 else None,
+        trace_turns=TRACE_TURNS,
+        recorder=create_recorder(),
+        slow_callback_ms=SLOW_CALLBACK_MS or None,
+        rate_limits=rate_limits,
+        usage=SessionUsage(
+            os.getenv("OPENAI_MODEL"), max_tokens=SESSION_MAX_TOKENS or None, sink=usage_sink
+        ),
+        **callbacks,
     )
 
+
+session_pool = None
+if POOL_MIN_SIZE > 0:
+    session_pool = RealtimeSessionPool(
+        create_client,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        idle_ttl=POOL_IDLE_TTL,
+    )
+
+
+loop_monitor = LoopMonitor(stall_threshold=LOOP_STALL_MS / 1000) if LOOP_STALL_MS > 0 else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if loop_monitor is not None:
+        loop_monitor.start()
+    drain_on_signal(session_limiter, DRAIN_TIMEOUT)
+    if session_pool is not None:
+        await session_pool.start()
+    yield
+    if session_pool is not None:
+        await session_pool.close()
+    if loop_monitor is not None:
+        loop_monitor.stop()
+    if usage_sink is not None:
+        await usage_sink.close()
+    mark_worker_stopped()
+
+
+app = FastAPI(lifespan=lifespan)
+
+@app.get("/health", response_class=JSONResponse)
+async def health_check():
+    if session_limiter.draining:
+        return JSONResponse({"message": "Shutting down"}, status_code=503)
+    return {"message": "Realtime Assistant server is running!"}
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, x_admin_token: str = Header(default="")):
+    """Sample the event loop for a few seconds; returns folded stacks for a flame graph."""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=404)
+    return await profile_event_loop(min(seconds, 60.0))
+
+@app.get("/admin/usage", response_class=JSONResponse)
+async def usage(x_admin_token: str = Header(default="")):
+    """Token usage and estimated cost of all sessions of this worker."""
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=404)
+    return process_usage.to_dict()
+
+@app.websocket("/ws")
+async def handle_media_stream(websocket: WebSocket):
+    await websocket.accept()
+    if not await session_limiter.acquire():
+        reason = "Server shutting down" if session_limiter.draining else "Server busy"
+        await websocket.close(code=TRY_AGAIN_LATER_CLOSE_CODE, reason=reason)
+        return
+
+    ws_handler = WsHandler(websocket, audio_format=AUDIO_FORMAT)
+    callbacks = {
+        "on_audio_delta": ws_handler.send_audio,
+        "on_interrupt": ws_handler.send_clear_event,
+    }
+
+    client = None
     tasks = []
     try:
-        await client.connect()
+        if session_pool is not None:
+            client = await session_pool.acquire(**callbacks)
+        else:
+            client = create_client(**callbacks)
+            await client.connect()
         print("Connected to OpenAI Realtime API!\n")
 
         # Lanza tareas concurrentes
         tasks.append(asyncio.create_task(client.handle_messages()))
         tasks.append(asyncio.create_task(ws_handler.start_streaming(client)))
 
-        # Mantiene vivo el endpoint hasta que alguna falle o el cliente cierre
+        # Mantiene vivo el endpoint hasta que alguna falle o termine
+        # (cliente desconectado, demasiado lento o conexión con OpenAI cerrada)
         done, pending = await asyncio.wait(
-            tasks, return_when=asyncio.FIRST_EXCEPTION
+            tasks, return_when=asyncio.FIRST_COMPLETED
         )
 
         # Propaga la primera excepción (si la hubo)
@@ -101,7 +266,9 @@ async def handle_media_stream(websocket: WebSocket):
         for t in tasks:
             t.cancel()
         await ws_handler.stop_streaming()
-        await client.close()
+        if client is not None:
+            await client.close()
+        session_limiter.release()
 
 # Serve static files
 from pathlib import Path
@@ -1,4 +1,10 @@
+from .audio.vad import BargeInDetector, EnergyVad
+from .client.conversation_window import ConversationWindow
+from .client.rate_limits import RateLimitTracker
 from .client.realtime_client import RealtimeClient, TurnDetectionMode
+from .client.recorder import SessionRecorder, replay_session
+from .client.session_pool import RealtimeSessionPool
+from .client.usage import SessionUsage, UsageSink
 from .handlers.audio_handler import AudioHandler
 from .handlers.input_handler import InputHandler
 from .handlers.ws_handler import WsHandler
@@ -6,6 +12,15 @@ from .handlers.ws_handler import WsHandler
 __all__ = [
     "RealtimeClient",
     "TurnDetectionMode",
+    "RealtimeSessionPool",
+    "ConversationWindow",
+    "RateLimitTracker",
+    "SessionRecorder",
+    "replay_session",
+    "SessionUsage",
+    "UsageSink",
+    "EnergyVad",
+    "BargeInDetector",
     "AudioHandler",
     "InputHandler",
     "WsHandler",
@@ -0,0 +1,186 @@
+"""Admission control and connection draining for the WebSocket servers.
+
+Every session holds an upstream Realtime socket, handler tasks and audio
+buffers on the worker's single event loop, so past some number of sessions
+all calls on the worker degrade together. :class:`SessionLimiter` caps the
+sessions of a worker and rejects (or briefly queues) the ones over the cap,
+and :func:`drain_on_signal` lets running sessions finish before the server
+shuts down.
+"""
+
+import asyncio
+import logging
+import signal
+from collections import deque
+from typing import Optional
+
+from .client.rate_limits import RateLimitTracker
+from .metrics import ADMITTED_SESSIONS, QUEUED_SESSIONS, REJECTED_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code for sessions rejected by admission control (Try Again Later)
+TRY_AGAIN_LATER_CLOSE_CODE = 1013
+
+
+class SessionLimiter:
+    """
+    Limits the concurrent sessions of a worker process.
+
+    ``acquire`` admits a session while fewer than ``max_sessions`` are
+    active. Otherwise the session waits in a FIFO queue of at most
+    ``max_queue`` sessions for up to ``queue_timeout`` seconds, and is
+    rejected when the queue is full or the wait times out. With the default
+    ``max_queue=0``, sessions over the limit are rejected right away, so that
+    a load balancer or the caller can retry elsewhere. ``drain`` stops
+    admitting sessions and waits for the active ones to end.
+
+    With ``rate_limits``, the tracker shared by the process's clients, new
+    sessions are also rejected while the Realtime API budgets are too low
+    to serve them (``RateLimitTracker.admits_session``).
+
+    Attributes:
+        max_sessions (int): Maximum concurrent sessions; 0 means no limit.
+        max_queue (int): Maximum sessions waiting for a slot.
+        queue_timeout (float): Seconds a session may wait for a slot.
+        active (int): Sessions admitted and not released yet.
+        draining (bool): Whether new sessions are rejected because the worker is shutting down.
+        rate_limits (RateLimitTracker): Optional rate-limit tracker consulted before admitting a session.
+    """
+    def __init__(
+        self,
+        max_sessions: int = 50,
+        max_queue: int = 0,
+        queue_timeout: float = 5.0,
+        rate_limits: Optional[RateLimitTracker] = None,
+    ):
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_limits = rate_limits
+        self.active = 0
+        self.draining = False
+
+        self._waiters = deque()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def queued(self) -> int:
+        """Sessions waiting for a slot."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _reject(self, reason: str) -> bool:
+        REJECTED_SESSIONS.labels(reason).inc()
+        logger.warning("Session rejected (%s): %d active, %d queued", reason, self.active, self.queued)
+        return False
+
+    def _admit(self) -> bool:
+        self.active += 1
+        self._idle.clear()
+        ADMITTED_SESSIONS.inc()
+        return True
+
+    async def acquire(self) -> bool:
+        """Admit a session, waiting for a slot if the queue allows it.
+
+        Returns:
+            bool: True if the session may start; it must then call release() when it ends.
+        """
+        if self.draining:
+            return self._reject("draining")
+        if self.rate_limits is not None and not self.rate_limits.admits_session():
+            return self._reject("rate_limited")
+        if not self.max_sessions or (self.active < self.max_sessions and not self.queued):
+            return self._admit()
+        if self.queued >= self.max_queue:
+            return self._reject("full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        QUEUED_SESSIONS.inc()
+        try:
+            admitted = await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._return_handed_slot(waiter)
+            return self._reject("timeout")
+        except asyncio.CancelledError:
+            # e.g. the client disconnected while queued
+            self._return_handed_slot(waiter)
+            raise
+        finally:
+            QUEUED_SESSIONS.dec()
+        # The slot was handed over by release(), active already counts it
+        return admitted or self._reject("draining")
+
+    def _return_handed_slot(self, waiter: asyncio.Future) -> None:
+        # release() may have handed the slot over just as the wait ended; the
+        # caller never gets it, so pass it on
+        if waiter.done() and not waiter.cancelled() and waiter.result():
+            self.release()
+
+    def release(self) -> None:
+        """End an admitted session, handing its slot to the next queued session."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+        ADMITTED_SESSIONS.dec()
+        if not self.active:
+            self._idle.set()
+
+    def start_draining(self) -> None:
+        """Reject new and queued sessions."""
+        self.draining = True
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(False)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Stop admitting sessions and wait for the active ones to end.
+
+        Returns:
+            bool: True if all sessions ended within ``timeout``.
+        """
+        self.start_draining()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def drain_on_signal(limiter: SessionLimiter, timeout: float = 120.0) -> None:
+    """Drain ``limiter`` before the server handles SIGTERM or SIGINT.
+
+    Call it from the application's startup (e.g. the FastAPI lifespan), after
+    the server installed its signal handlers. On the first signal, new
+    sessions are rejected and the server's handler only runs once the active
+    sessions ended or ``timeout`` seconds passed; a second signal skips the
+    wait. The server then closes the remaining connections as usual.
+    """
+    loop = asyncio.get_running_loop()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            if limiter.draining:
+                previous(signum, frame)
+                return
+
+            async def drain_then_exit():
+                logger.info("Draining %d sessions (up to %.0f s)", limiter.active, timeout)
+                if not await limiter.drain(timeout):
+                    logger.warning("Drain timed out with %d sessions active", limiter.active)
+                previous(signum, frame)
+
+            limiter.draining = True
+            loop.call_soon_threadsafe(lambda: loop.create_task(drain_then_exit()))
+
+        signal.signal(sig, handler)
@@ -0,0 +1,15 @@
+from .conversion import sniff_format, to_pcm16
+from .g711 import AUDIO_FORMATS, G711Decoder, G711Encoder
+from .jitter_buffer import JitterBuffer
+from .vad import BargeInDetector, EnergyVad
+
+__all__ = [
+    "sniff_format",
+    "to_pcm16",
+    "AUDIO_FORMATS",
+    "G711Decoder",
+    "G711Encoder",
+    "JitterBuffer",
+    "EnergyVad",
+    "BargeInDetector",
+]
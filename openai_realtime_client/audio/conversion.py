@@ -0,0 +1,137 @@
+"""Conversion of input audio to the 24kHz mono PCM16 format used by the Realtime API."""
+
+import audioop
+import io
+import struct
+from typing import Optional, Tuple, Union
+
+TARGET_RATE = 24000
+TARGET_CHANNELS = 1
+TARGET_SAMPLE_WIDTH = 2
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def sniff_format(audio_bytes: BytesLike) -> str:
+    """Return a short name for the container format of ``audio_bytes``.
+
+    Only WAV is decoded in-process; anything else is reported as ``"unknown"``
+    and handed to ffmpeg.
+    """
+    header = bytes(audio_bytes[:12])
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    return "unknown"
+
+
+def parse_wav(audio_bytes: BytesLike) -> Optional[Tuple[int, int, int, memoryview]]:
+    """Parse an uncompressed PCM WAV file without copying its samples.
+
+    Returns:
+        ``(channels, sample_width, sample_rate, frames)`` where ``frames`` is a
+        memoryview over the ``data`` chunk, or ``None`` if the file is not PCM.
+    """
+    view = memoryview(audio_bytes)
+    if sniff_format(view) != "wav":
+        return None
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            format_tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The sub-format GUID starts with the actual format tag.
+                (format_tag,) = struct.unpack_from("<H", view, body + 24)
+            fmt = (format_tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            format_tag, channels, rate, bits = fmt
+            if format_tag != _WAVE_FORMAT_PCM or bits % 8 or not channels:
+                return None
+            # Streamed WAVs may leave the size unset; clamp to what we have.
+            width = bits // 8
+            end = min(body + chunk_size, len(view))
+            end -= (end - body) % (width * channels)
+            return channels, width, rate, view[body:end]
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def convert_pcm(
+    frames: BytesLike,
+    channels: int,
+    sample_width: int,
+    sample_rate: int,
+) -> Optional[BytesLike]:
+    """Convert linear PCM to 24kHz mono PCM16.
+
+    Already conformant input is returned as-is. Returns ``None`` for layouts
+    that cannot be converted in-process (more than two channels).
+    """
+    if channels > 2:
+        return None
+
+    pcm = frames
+    if sample_width == 1:
+        # 8-bit WAV samples are unsigned.
+        pcm = audioop.bias(pcm, 1, -128)
+    if sample_width != TARGET_SAMPLE_WIDTH:
+        pcm = audioop.lin2lin(pcm, sample_width, TARGET_SAMPLE_WIDTH)
+    if channels == 2:
+        pcm = audioop.tomono(pcm, TARGET_SAMPLE_WIDTH, 0.5, 0.5)
+    if sample_rate != TARGET_RATE:
+        pcm, _ = audioop.ratecv(
+            pcm, TARGET_SAMPLE_WIDTH, TARGET_CHANNELS, sample_rate, TARGET_RATE, None
+        )
+    return pcm
+
+
+def _convert_with_ffmpeg(audio_bytes: BytesLike) -> bytes:
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(bytes(audio_bytes)))
+    audio = audio.set_frame_rate(TARGET_RATE).set_channels(TARGET_CHANNELS)
+    audio = audio.set_sample_width(TARGET_SAMPLE_WIDTH)
+    return audio.raw_data
+
+
+def to_pcm16(
+    audio_bytes: BytesLike,
+    sample_rate: Optional[int] = None,
+    channels: int = 1,
+) -> BytesLike:
+    """Convert audio to 24kHz mono PCM16.
+
+    Args:
+        audio_bytes: A WAV file, any format ffmpeg can decode, or raw PCM16
+            when ``sample_rate`` is given.
+        sample_rate: Sample rate of raw little-endian PCM16 input. Leave unset
+            for containerised audio.
+        channels: Number of interleaved channels of raw PCM16 input.
+
+    Conformant WAV and PCM input is returned as a memoryview without copying.
+    Other PCM rates and layouts are converted in-process; ffmpeg (via pydub)
+    is only used for compressed formats.
+    """
+    if sample_rate is not None:
+        pcm = convert_pcm(memoryview(audio_bytes), channels, TARGET_SAMPLE_WIDTH, sample_rate)
+        if pcm is None:
+            raise ValueError(f"Unsupported number of channels for raw PCM: {channels}")
+        return pcm
+
+    wav = parse_wav(audio_bytes)
+    if wav is not None:
+        wav_channels, width, rate, frames = wav
+        pcm = convert_pcm(frames, wav_channels, width, rate)
+        if pcm is not None:
+            return pcm
+
+    return _convert_with_ffmpeg(audio_bytes)
@@ -0,0 +1,58 @@
+"""G.711 (μ-law / A-law) support for the Realtime API's ``g711_ulaw`` and ``g711_alaw`` formats.
+
+G.711 audio is 8kHz mono with one byte per sample, a sixth of the bandwidth of
+24kHz PCM16. Resampling and companding are done with ``audioop`` in C.
+"""
+
+import audioop
+from typing import Optional
+
+PCM16_RATE = 24000
+G711_RATE = 8000
+
+AUDIO_FORMATS = ("pcm16", "g711_ulaw", "g711_alaw")
+
+
+def is_g711(audio_format: str) -> bool:
+    return audio_format in ("g711_ulaw", "g711_alaw")
+
+
+def bytes_per_ms(audio_format: str) -> int:
+    """Number of bytes per millisecond of audio in a Realtime API audio format."""
+    if is_g711(audio_format):
+        return G711_RATE // 1000
+    return PCM16_RATE * 2 // 1000
+
+
+class G711Encoder:
+    """Encode 24kHz PCM16 to G.711, keeping resampler state between chunks."""
+
+    def __init__(self, audio_format: str = "g711_ulaw"):
+        if not is_g711(audio_format):
+            raise ValueError(f"Invalid G.711 format: {audio_format}")
+        self.audio_format = audio_format
+        self._state: Optional[tuple] = None
+
+    def encode(self, pcm16: bytes) -> bytes:
+        pcm, self._state = audioop.ratecv(pcm16, 2, 1, PCM16_RATE, G711_RATE, self._state)
+        if self.audio_format == "g711_ulaw":
+            return audioop.lin2ulaw(pcm, 2)
+        return audioop.lin2alaw(pcm, 2)
+
+
+class G711Decoder:
+    """Decode G.711 to 24kHz PCM16, keeping resampler state between chunks."""
+
+    def __init__(self, audio_format: str = "g711_ulaw"):
+        if not is_g711(audio_format):
+            raise ValueError(f"Invalid G.711 format: {audio_format}")
+        self.audio_format = audio_format
+        self._state: Optional[tuple] = None
+
+    def decode(self, data: bytes) -> bytes:
+        if self.audio_format == "g711_ulaw":
+            pcm = audioop.ulaw2lin(data, 2)
+        else:
+            pcm = audioop.alaw2lin(data, 2)
+        pcm, self._state = audioop.ratecv(pcm, 2, 1, G711_RATE, PCM16_RATE, self._state)
+        return pcm
@@ -0,0 +1,143 @@
+import threading
+import time
+
+
+class JitterBuffer:
+    """
+    Byte-accounted ring buffer between incoming audio deltas and a playback device.
+
+    Playback only starts once ``target_latency_ms`` of audio is buffered (or no
+    more audio arrives within a read timeout), which absorbs network jitter. When the
+    buffer holds more than ``max_latency_ms`` the oldest audio is dropped.
+
+    Attributes:
+        frame_bytes (int): Size of one sample frame; reads and drops are aligned to it.
+        target_bytes (int): Bytes buffered before playback (re)starts.
+        capacity (int): Maximum number of buffered bytes.
+        underruns (int): Times the buffer ran dry while audio was still arriving.
+        overruns (int): Times audio had to be dropped because the buffer was full.
+        dropped_bytes (int): Bytes discarded by overruns and ``clear``.
+        written_bytes (int): Total bytes written to the buffer.
+        read_bytes (int): Total bytes read from the buffer.
+    """
+    def __init__(
+        self,
+        bytes_per_second: int = 48000,
+        target_latency_ms: int = 100,
+        max_latency_ms: int = 10000,
+        frame_bytes: int = 2,
+    ):
+        self.bytes_per_second = bytes_per_second
+        self.frame_bytes = frame_bytes
+        self.target_latency_ms = target_latency_ms
+        self.target_bytes = self._ms_to_bytes(target_latency_ms)
+        self.capacity = max(self._ms_to_bytes(max_latency_ms), self.target_bytes, frame_bytes)
+
+        self._ring = bytearray(self.capacity)
+        self._head = 0
+        self._size = 0
+        self._primed = False
+        self._dry_since = None
+        self._cond = threading.Condition()
+
+        self.underruns = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.written_bytes = 0
+        self.read_bytes = 0
+
+    def _ms_to_bytes(self, ms: float) -> int:
+        n = int(self.bytes_per_second * ms / 1000)
+        return n - n % self.frame_bytes
+
+    @property
+    def level_bytes(self) -> int:
+        """Number of buffered bytes."""
+        return self._size
+
+    @property
+    def level_ms(self) -> float:
+        """Duration of the buffered audio in milliseconds."""
+        return self._size * 1000 / self.bytes_per_second
+
+    def write(self, data: bytes) -> None:
+        """Append audio, dropping the oldest audio if the buffer overflows."""
+        n = len(data) - len(data) % self.frame_bytes
+        if not n:
+            return
+        with self._cond:
+            if self._dry_since is not None:
+                # The buffer ran dry in the middle of a stream, not at its end
+                if time.monotonic() - self._dry_since < 0.5:
+                    self.underruns += 1
+                self._dry_since = None
+
+            self.written_bytes += n
+            view = memoryview(data)[:n]
+            if n > self.capacity:
+                self.overruns += 1
+                self._drop(self._size)
+                self.dropped_bytes += n - self.capacity
+                view = view[n - self.capacity:]
+                n = self.capacity
+            overflow = self._size + n - self.capacity
+            if overflow > 0:
+                self.overruns += 1
+                self._drop(overflow)
+
+            tail = (self._head + self._size) % self.capacity
+            first = min(n, self.capacity - tail)
+            self._ring[tail:tail + first] = view[:first]
+            if first < n:
+                self._ring[:n - first] = view[first:]
+            self._size += n
+
+            if not self._primed and self._size >= self.target_bytes:
+                self._primed = True
+            self._cond.notify_all()
+
+    def _drop(self, n: int) -> None:
+        self._head = (self._head + n) % self.capacity
+        self._size -= n
+        self.dropped_bytes += n
+
+    def read(self, max_bytes: int, timeout: float = 0.1) -> bytes:
+        """Read up to ``max_bytes`` of audio, waiting at most ``timeout`` seconds.
+
+        Returns ``b''`` if no audio is ready to be played.
+        """
+        max_bytes -= max_bytes % self.frame_bytes
+        with self._cond:
+            if not self._primed:
+                # Wait for the target latency to fill; flush a short tail
+                # anyway once no more audio arrives.
+                before = self.written_bytes
+                self._cond.wait_for(lambda: self._primed, timeout)
+                if not self._primed and self._size and self.written_bytes == before:
+                    self._primed = True
+            if not self._primed or not self._size:
+                return b''
+
+            n = min(max_bytes, self._size)
+            first = min(n, self.capacity - self._head)
+            out = bytes(self._ring[self._head:self._head + first])
+            if first < n:
+                out += bytes(self._ring[:n - first])
+            self._head = (self._head + n) % self.capacity
+            self._size -= n
+            self.read_bytes += n
+
+            if not self._size:
+                self._primed = False
+                self._dry_since = time.monotonic()
+            return out
+
+    def clear(self) -> int:
+        """Discard all buffered audio and return the number of bytes dropped."""
+        with self._cond:
+            dropped = self._size
+            self._drop(dropped)
+            self._primed = False
+            self._dry_since = None
+            self._cond.notify_all()
+            return dropped
@@ -0,0 +1,167 @@
+import audioop
+from collections import deque
+from typing import List, Optional
+
+
+class EnergyVad:
+    """
+    Lightweight voice activity detector for PCM16 mono audio.
+
+    Audio is split into fixed frames; a frame counts as speech when its RMS
+    energy exceeds both ``energy_threshold`` and a multiple of the adaptive
+    noise floor, and its zero-crossing rate is below ``max_zero_crossing_rate``
+    (which rejects hiss and other broadband noise). Energy and zero crossings
+    are computed with ``audioop`` in C.
+
+    Used as a gate with :meth:`process`, it passes speech plus
+    ``preroll_ms`` of audio before it and ``hangover_ms`` after it, and
+    suppresses everything else. Under server-side turn detection,
+    RealtimeClient sends silence in place of the suppressed audio until the
+    server has seen the end of speech.
+
+    Attributes:
+        sample_rate (int): Sample rate of the audio.
+        frame_ms (int): Duration of the analysis frames.
+        energy_threshold (float): Minimum RMS for speech.
+        noise_ratio (float): Speech must be this many times louder than the noise floor.
+        max_zero_crossing_rate (float): Maximum zero crossings per sample for speech.
+        hangover_ms (int): Audio passed after the last speech frame.
+        preroll_ms (int): Audio passed before the first speech frame.
+        speaking (bool): Whether the gate is currently open.
+        noise_floor (float): Running estimate of the background RMS.
+        passed_bytes (int): Bytes let through the gate.
+        suppressed_bytes (int): Bytes suppressed by the gate.
+    """
+    def __init__(
+        self,
+        sample_rate: int = 24000,
+        frame_ms: int = 20,
+        energy_threshold: float = 300.0,
+        noise_ratio: float = 3.0,
+        max_zero_crossing_rate: float = 0.35,
+        hangover_ms: int = 500,
+        preroll_ms: int = 300,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self.energy_threshold = energy_threshold
+        self.noise_ratio = noise_ratio
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.hangover_ms = hangover_ms
+        self.preroll_ms = preroll_ms
+
+        self.speaking = False
+        self.noise_floor = energy_threshold / noise_ratio
+        self.passed_bytes = 0
+        self.suppressed_bytes = 0
+        self._hangover_left = 0
+        self._preroll = deque(maxlen=max(1, preroll_ms // frame_ms))
+        self._remainder = b''
+
+    def is_speech(self, frame: bytes) -> bool:
+        """Classify a single frame and update the noise floor."""
+        rms = audioop.rms(frame, 2)
+        crossings = audioop.cross(frame, 2) / max(1, len(frame) // 2)
+        speech = (
+            rms >= self.energy_threshold
+            and rms >= self.noise_floor * self.noise_ratio
+            and crossings <= self.max_zero_crossing_rate
+        )
+        # Track the background level; adapt much more slowly during speech so
+        # the floor still catches up with a constant loud background.
+        alpha = 0.001 if speech else 0.05
+        self.noise_floor += alpha * (rms - self.noise_floor)
+        return speech
+
+    def frames(self, chunk: bytes) -> List[bytes]:
+        """Split audio into whole frames, holding any remainder for the next call."""
+        data = self._remainder + chunk if self._remainder else chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = data[usable:]
+        view = memoryview(data)
+        return [
+            bytes(view[offset:offset + self.frame_bytes])
+            for offset in range(0, usable, self.frame_bytes)
+        ]
+
+    def process(self, chunk: bytes) -> bytes:
+        """Feed captured audio and return the audio that should be sent upstream.
+
+        Returns ``b''`` while the gate is closed. Audio that does not fill a
+        whole frame is held until the next call, so ``b''`` is also returned
+        while the gate is open; check ``speaking`` for the state of the gate.
+        """
+        out = []
+        for frame in self.frames(chunk):
+            if self.is_speech(frame):
+                if not self.speaking:
+                    self.speaking = True
+                    out.extend(self._preroll)
+                    self._preroll.clear()
+                self._hangover_left = self.hangover_ms
+                out.append(frame)
+            elif self.speaking:
+                out.append(frame)
+                self._hangover_left -= self.frame_ms
+                if self._hangover_left <= 0:
+                    self.speaking = False
+            else:
+                if len(self._preroll) == self._preroll.maxlen:
+                    self.suppressed_bytes += self.frame_bytes
+                self._preroll.append(frame)
+
+        passed = b''.join(out)
+        self.passed_bytes += len(passed)
+        return passed
+
+    def reset(self) -> None:
+        """Close the gate and forget buffered audio."""
+        self.suppressed_bytes += len(self._preroll) * self.frame_bytes
+        self.speaking = False
+        self._hangover_left = 0
+        self._preroll.clear()
+        self._remainder = b''
+
+
+class BargeInDetector:
+    """
+    Detects the user starting to speak over the assistant's audio.
+
+    Fires once ``min_speech_ms`` of consecutive speech frames are seen, then
+    stays latched until :meth:`reset`. Without echo cancellation (headphones
+    or the browser's built-in AEC) the assistant's own voice coming out of the
+    speakers can trigger it, so the thresholds are stricter than for gating.
+
+    Attributes:
+        vad (EnergyVad): Frame classifier.
+        min_speech_ms (int): Consecutive speech needed to trigger.
+        triggered (bool): Whether a barge-in was detected since the last reset.
+        detections (int): Number of barge-ins detected.
+    """
+    def __init__(self, vad: Optional[EnergyVad] = None, min_speech_ms: int = 100):
+        self.vad = vad or EnergyVad(energy_threshold=800.0, noise_ratio=4.0)
+        self.min_speech_ms = min_speech_ms
+        self.triggered = False
+        self.detections = 0
+        self._speech_ms = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        """Feed captured audio; returns True when a barge-in is detected."""
+        if self.triggered:
+            return False
+        for frame in self.vad.frames(chunk):
+            if self.vad.is_speech(frame):
+                self._speech_ms += self.vad.frame_ms
+                if self._speech_ms >= self.min_speech_ms:
+                    self.triggered = True
+                    self.detections += 1
+                    return True
+            else:
+                self._speech_ms = 0
+        return False
+
+    def reset(self) -> None:
+        """Re-arm the detector."""
+        self.triggered = False
+        self._speech_ms = 0
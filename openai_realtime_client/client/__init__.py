@@ -1,3 +1,9 @@
+from .conversation_window import ConversationWindow
+from .rate_limits import RateLimitTracker
 from .realtime_client import RealtimeClient
+from .recorder import SessionRecorder, replay_session
+from .send_queue import SendPriority, SendQueue
+from .session_pool import RealtimeSessionPool
+from .usage import SessionUsage, UsageSink
 
-__all__ = ["RealtimeClient"]
+__all__ = ["RealtimeClient", "RealtimeSessionPool", "ConversationWindow", "RateLimitTracker", "SendQueue", "SendPriority", "SessionRecorder", "replay_session", "SessionUsage", "UsageSink"]
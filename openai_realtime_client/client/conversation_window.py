@@ -0,0 +1,184 @@
+import math
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+class ConversationWindow:
+    """
+    Keeps the server-side conversation of a Realtime session within a token budget.
+
+    The Realtime API keeps every conversation item, so each response of a long
+    session reads a longer context and gets slower and more expensive. The
+    window tracks the items of the conversation and the input tokens reported
+    in ``response.done``; once a response used more than ``max_input_tokens``,
+    the oldest items are selected for ``conversation.item.delete`` until the
+    conversation is estimated at ``target_ratio`` of the budget.
+
+    With ``summarize``, the deleted messages are replaced by a single system
+    message at the start of the conversation holding their text (the
+    transcripts, not the audio), trimmed to ``max_summary_chars``.
+
+    Attributes:
+        max_input_tokens (int): Input tokens per response that trigger pruning.
+        target_ratio (float): Fraction of the budget to prune down to.
+        min_items (int): Number of most recent items that are never pruned.
+        summarize (bool): Whether to keep the text of pruned messages in a summary item.
+        max_summary_chars (int): Maximum length of the summary text.
+        last_input_tokens (int): Input tokens of the last response.
+        pruned_items (int): Number of items pruned so far.
+    """
+    def __init__(
+        self,
+        max_input_tokens: int = 8000,
+        target_ratio: float = 0.6,
+        min_items: int = 6,
+        summarize: bool = True,
+        max_summary_chars: int = 2000,
+    ):
+        self.max_input_tokens = max_input_tokens
+        self.target_ratio = target_ratio
+        self.min_items = min_items
+        self.summarize = summarize
+        self.max_summary_chars = max_summary_chars
+        self.last_input_tokens = 0
+        self.pruned_items = 0
+
+        self._items: List[Dict[str, Any]] = []
+        self._summary_id: Optional[str] = None
+        self._summary_text = ""
+
+    @property
+    def item_count(self) -> int:
+        """Number of items in the server-side conversation."""
+        return len(self._items)
+
+    def reset(self) -> None:
+        """Forget all items, e.g. after connecting a new session.
+
+        The summary is kept: RealtimeClient replays the summary item after a
+        reconnect, and it is tracked again once it is created.
+        """
+        self._items.clear()
+        self.last_input_tokens = 0
+
+    def _find(self, item_id: str) -> Optional[Dict[str, Any]]:
+        for entry in self._items:
+            if entry["id"] == item_id:
+                return entry
+        return None
+
+    def item_created(self, item: Dict[str, Any], previous_item_id: Optional[str] = None) -> None:
+        """Track an item from a ``conversation.item.created`` event."""
+        entry = {
+            "id": item.get("id"),
+            "type": item.get("type"),
+            "role": item.get("role"),
+            "call_id": item.get("call_id"),
+            "text": "".join(
+                part.get("text") or part.get("transcript") or ""
+                for part in item.get("content", [])
+            ),
+        }
+        if previous_item_id is None:
+            index = 0
+        else:
+            index = len(self._items)
+            for i, other in enumerate(self._items):
+                if other["id"] == previous_item_id:
+                    index = i + 1
+                    break
+        self._items.insert(index, entry)
+
+    def item_deleted(self, item_id: str) -> None:
+        """Forget an item from a ``conversation.item.deleted`` event."""
+        self._items = [entry for entry in self._items if entry["id"] != item_id]
+
+    def set_text(self, item_id: str, text: str) -> None:
+        """Record the transcript of an item, used for the summary."""
+        entry = self._find(item_id)
+        if entry is not None:
+            entry["text"] = text
+
+    def response_done(self, response: Dict[str, Any]) -> List[str]:
+        """Record a finished response and return the ids of items to prune.
+
+        The returned items are forgotten right away, before the server
+        confirms their deletion.
+        """
+        for item in response.get("output", []):
+            if item.get("type") == "message":
+                text = "".join(
+                    part.get("transcript") or part.get("text") or ""
+                    for part in item.get("content", [])
+                )
+                if text:
+                    self.set_text(item.get("id"), text)
+
+        usage = response.get("usage") or {}
+        self.last_input_tokens = usage.get("input_tokens", 0)
+        if self.last_input_tokens <= self.max_input_tokens or not self._items:
+            return []
+
+        # Items are not billed individually; assume they cost the same
+        tokens_per_item = self.last_input_tokens / len(self._items)
+        excess = self.last_input_tokens - self.max_input_tokens * self.target_ratio
+        count = math.ceil(excess / tokens_per_item)
+
+        candidates = [
+            entry for entry in self._items[:max(0, len(self._items) - self.min_items)]
+            if entry["id"] != self._summary_id
+        ]
+        # Never separate a function call from its output: a call whose output
+        # is among the protected recent items is kept as well
+        candidate_ids = {entry["id"] for entry in candidates}
+        protected_calls = {
+            entry["call_id"] for entry in self._items
+            if entry["type"] == "function_call_output" and entry["id"] not in candidate_ids
+        }
+        pruned = [
+            entry for entry in candidates[:count]
+            if not (entry["type"] == "function_call" and entry["call_id"] in protected_calls)
+        ]
+        call_ids = {entry["call_id"] for entry in pruned if entry["type"] == "function_call"}
+        for entry in candidates[count:]:
+            if entry["type"] == "function_call_output" and entry["call_id"] in call_ids:
+                pruned.append(entry)
+        if not pruned:
+            return []
+
+        ids = [entry["id"] for entry in pruned]
+        self.pruned_items += len(ids)
+        if self.summarize:
+            self._extend_summary(pruned)
+            # The previous summary is replaced by one that also covers these items
+            if self._summary_text and self._find(self._summary_id) is not None:
+                ids.append(self._summary_id)
+        self._items = [entry for entry in self._items if entry["id"] not in ids]
+        return ids
+
+    def _extend_summary(self, pruned: List[Dict[str, Any]]) -> None:
+        lines = [self._summary_text] if self._summary_text else []
+        for entry in pruned:
+            if entry["type"] == "message" and entry["text"] and entry["role"] in ("user", "assistant"):
+                lines.append(f"{entry['role'].capitalize()}: {entry['text']}")
+        text = "\n".join(lines)
+        if len(text) > self.max_summary_chars:
+            # Keep the most recent part, starting at a line boundary
+            text = text[-self.max_summary_chars:]
+            text = text[text.find("\n") + 1:] if "\n" in text else text
+        self._summary_text = text
+
+    def summary_item(self) -> Optional[Dict[str, Any]]:
+        """Build the summary item to create after pruning, or None if there is nothing to summarize."""
+        if not self._summary_text:
+            return None
+        self._summary_id = f"summary_{uuid.uuid4().hex[:12]}"
+        return {
+            "id": self._summary_id,
+            "type": "message",
+            "role": "system",
+            "content": [{
+                "type": "input_text",
+                "text": f"Summary of the earlier conversation:\n{self._summary_text}",
+            }],
+        }
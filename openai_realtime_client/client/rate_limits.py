@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from ..metrics import DEFERRED_RESPONSES, RATE_LIMIT_REMAINING, TRIMMED_TOOL_OUTPUTS
+
+logger = logging.getLogger(__name__)
+
+_RETRY_AFTER_RE = re.compile(r"try again in ([\d.]+)\s*(ms|s)", re.IGNORECASE)
+
+
+class RateLimitTracker:
+    """
+    Tracks the remaining request and token budgets of the Realtime API.
+
+    The server sends ``rate_limits.updated`` after each response with the
+    budgets of the API key, which all sessions of the process share, so a
+    single tracker is meant to be passed to every ``RealtimeClient`` of the
+    process. Each update replaces the previous one; once its
+    ``reset_seconds`` passed, a budget is assumed full again.
+
+    When a budget runs low, the clients holding the tracker act before the
+    server starts failing responses: ``response.create`` is deferred until the
+    budget resets (for up to ``max_defer`` seconds), tool outputs are trimmed
+    to ``low_tool_output_chars``, and ``admits_session`` tells an admission
+    controller (see ``openai_realtime_client.admission``) to turn new sessions
+    away. A ``rate_limit_exceeded`` error counts as an empty budget until the
+    retry delay it states.
+
+    Attributes:
+        min_tokens (int): Remaining tokens below which responses are deferred and tool outputs trimmed.
+        min_requests (int): Remaining requests below which responses are deferred.
+        session_min_tokens (int): Remaining tokens below which new sessions are not admitted.
+        session_min_requests (int): Remaining requests below which new sessions are not admitted.
+        max_defer (float): Maximum seconds a response.create is held back.
+        low_tool_output_chars (int): Characters of tool output kept while tokens are low.
+    """
+    def __init__(
+        self,
+        min_tokens: int = 4000,
+        min_requests: int = 2,
+        session_min_tokens: int = 20000,
+        session_min_requests: int = 10,
+        max_defer: float = 5.0,
+        low_tool_output_chars: int = 2000,
+    ):
+        self.min_tokens = min_tokens
+        self.min_requests = min_requests
+        self.session_min_tokens = session_min_tokens
+        self.session_min_requests = session_min_requests
+        self.max_defer = max_defer
+        self.low_tool_output_chars = low_tool_output_chars
+
+        # name -> {"limit", "remaining", "reset_at"}
+        self._limits: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, rate_limits: List[Dict[str, Any]]) -> None:
+        """Record the budgets of a ``rate_limits.updated`` event."""
+        now = time.monotonic()
+        for rate_limit in rate_limits:
+            name = rate_limit.get("name")
+            if not name:
+                continue
+            self._limits[name] = {
+                "limit": rate_limit.get("limit"),
+                "remaining": rate_limit.get("remaining", 0),
+                "reset_at": now + float(rate_limit.get("reset_seconds") or 0),
+            }
+            RATE_LIMIT_REMAINING.labels(name).set(rate_limit.get("remaining", 0))
+        if self.is_low():
+            logger.warning("Realtime API rate limits low: %s", self.snapshot())
+
+    def exceeded(self, message: str = "") -> None:
+        """Record a ``rate_limit_exceeded`` error, using the retry delay in its message."""
+        retry_after = 1.0
+        match = _RETRY_AFTER_RE.search(message or "")
+        if match:
+            retry_after = float(match.group(1)) / (1000 if match.group(2).lower() == "ms" else 1)
+        reset_at = time.monotonic() + retry_after
+        for name in ("requests", "tokens"):
+            entry = self._limits.setdefault(name, {"limit": None, "remaining": 0, "reset_at": reset_at})
+            entry["remaining"] = 0
+            entry["reset_at"] = max(entry["reset_at"], reset_at)
+
+    def remaining(self, name: str) -> Optional[int]:
+        """Remaining budget of ``name`` ("requests" or "tokens"), or None if unknown or reset since."""
+        entry = self._limits.get(name)
+        if entry is None or time.monotonic() >= entry["reset_at"]:
+            return None
+        return entry["remaining"]
+
+    def reset_in(self) -> float:
+        """Seconds until the last low budget resets."""
+        now = time.monotonic()
+        return max(
+            [entry["reset_at"] - now for name, entry in self._limits.items() if self._below(name, self._min(name))]
+            or [0.0]
+        )
+
+    def _min(self, name: str, session: bool = False) -> int:
+        if name == "tokens":
+            return self.session_min_tokens if session else self.min_tokens
+        if name == "requests":
+            return self.session_min_requests if session else self.min_requests
+        return 0
+
+    def _below(self, name: str, minimum: int) -> bool:
+        remaining = self.remaining(name)
+        return remaining is not None and remaining < minimum
+
+    def is_low(self, name: Optional[str] = None) -> bool:
+        """Whether a budget (or the given one) is below its minimum for responses."""
+        names = [name] if name else list(self._limits)
+        return any(self._below(n, self._min(n)) for n in names)
+
+    def admits_session(self) -> bool:
+        """Whether the budgets leave room for a new session."""
+        return not any(self._below(name, self._min(name, session=True)) for name in self._limits)
+
+    async def wait_for_budget(self) -> float:
+        """Wait, for up to ``max_defer`` seconds, until no budget is low.
+
+        Returns:
+            float: Seconds waited.
+        """
+        if not self.is_low():
+            return 0.0
+        DEFERRED_RESPONSES.inc()
+        start = time.monotonic()
+        deadline = start + self.max_defer
+        while self.is_low() and time.monotonic() < deadline:
+            await asyncio.sleep(min(self.reset_in(), deadline - time.monotonic(), 0.5))
+        waited = time.monotonic() - start
+        logger.info("Deferred response.create by %.2f s for rate limits", waited)
+        return waited
+
+    def trim_tool_output(self, output: Any) -> Any:
+        """Shorten a string tool output while tokens are low."""
+        if not isinstance(output, str) or len(output) <= self.low_tool_output_chars or not self.is_low("tokens"):
+            return output
+        TRIMMED_TOOL_OUTPUTS.inc()
+        return output[:self.low_tool_output_chars] + " [truncated]"
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current budgets by name, with the seconds until they reset."""
+        now = time.monotonic()
+        return {
+            name: {
+                "limit": entry["limit"],
+                "remaining": self.remaining(name),
+                "reset_seconds": max(0.0, round(entry["reset_at"] - now, 3)),
+            }
+            for name, entry in self._limits.items()
+        }
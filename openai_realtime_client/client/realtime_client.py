@@ -3,23 +3,144 @@ import asyncio
 import websockets
 import json
 import base64
-import io
+import inspect
 import logging
+import random
+import re
+import time
+import uuid
 
+from collections import deque
 from typing import Optional, Callable, List, Dict, Any
 from enum import Enum
-from pydub import AudioSegment
 
 from llama_index.core.tools import BaseTool, AsyncBaseTool, ToolSelection, adapt_to_async_tool, call_tool_with_selection
 
+from ..audio.conversion import to_pcm16
+from ..audio.g711 import AUDIO_FORMATS, G711Decoder, G711Encoder, bytes_per_ms, is_g711
+from ..audio.vad import BargeInDetector, EnergyVad
+from ..metrics import (
+    ACTIVE_SESSIONS,
+    CALLBACK_DURATION,
+    EVENTS,
+    FIRST_AUDIO_LATENCY,
+    HANDLER_DURATION,
+    TOOL_CALL_DURATION,
+    WS_BYTES,
+)
+from .conversation_window import ConversationWindow
+from .rate_limits import RateLimitTracker
+from .recorder import INBOUND, OUTBOUND, SessionRecorder
+from .send_queue import SendPriority, SendQueue
+from .turn_tracer import TurnTracer
+from .usage import SessionUsage
+
 logger = logging.getLogger(__name__)
 
 
-def _convert_audio_bytes(audio_bytes: bytes) -> str:
-    """Convert audio bytes to 24kHz mono PCM16 and return base64 string."""
-    audio = AudioSegment.from_file(io.BytesIO(audio_bytes))
-    audio = audio.set_frame_rate(24000).set_channels(1).set_sample_width(2)
-    return base64.b64encode(audio.raw_data).decode()
+
+def _convert_audio_bytes(
+    audio_bytes: bytes,
+    sample_rate: Optional[int] = None,
+    channels: int = 1,
+    audio_format: str = "pcm16",
+) -> str:
+    """Convert audio bytes to 24kHz mono PCM16 (or G.711) and return base64 string."""
+    pcm = to_pcm16(audio_bytes, sample_rate, channels)
+    if is_g711(audio_format):
+        pcm = G711Encoder(audio_format).encode(pcm)
+    return base64.b64encode(pcm).decode()
+
+
+# Events handled by RealtimeClient; other events are not parsed unless
+# they have an extra event handler.
+_HANDLED_EVENT_TYPES = frozenset({
+    "error",
+    "response.created",
+    "response.output_item.added",
+    "response.done",
+    "input_audio_buffer.speech_started",
+    "input_audio_buffer.speech_stopped",
+    "response.text.delta",
+    "response.audio.delta",
+    "response.function_call_arguments.done",
+    "conversation.item.input_audio_transcription.completed",
+    "response.audio_transcript.delta",
+    "response.audio_transcript.done",
+    "rate_limits.updated",
+})
+_WINDOW_EVENT_TYPES = frozenset({"conversation.item.created", "conversation.item.deleted"})
+
+# Silence sent after the input gate closes, at most, until the server's VAD
+# ends the turn (semantic VAD with low eagerness waits up to 8 s)
+_GATE_TRAILING_SILENCE_MS = 8000
+
+# Seconds close() waits for queued control and tool messages to be sent
+_CLOSE_FLUSH_TIMEOUT = 1.0
+
+_TYPE_RE = re.compile(r'"type"\s*:\s*"([^"\\]*)"')
+_RESPONSE_ID_RE = re.compile(r'"response_id"\s*:\s*"([^"\\]*)"')
+_CONTENT_INDEX_RE = re.compile(r'"content_index"\s*:\s*(\d+)')
+_DELTA_RE = re.compile(r'"delta"\s*:\s*"')
+
+_RECEIVED_BYTES = WS_BYTES.labels("openai", "received")
+_EVENT_COUNTERS = {}
+
+
+def _count_event(event_type: Optional[str]) -> None:
+    counter = _EVENT_COUNTERS.get(event_type)
+    if counter is None:
+        counter = _EVENT_COUNTERS[event_type] = EVENTS.labels(event_type or "unknown")
+    counter.inc()
+
+
+def _new_item_id() -> str:
+    """Id for an item the client creates, so it can be matched to the server's events."""
+    return f"item_{uuid.uuid4().hex[:24]}"
+
+
+def _peek_event_type(message: str) -> Optional[str]:
+    """Return the top-level ``type`` of a serialized event without parsing it.
+
+    Returns None when it cannot be read safely, e.g. when a nested object
+    comes before it.
+    """
+    match = _TYPE_RE.search(message)
+    if match is None:
+        return None
+    prefix = message[1:match.start()]
+    if "{" in prefix or "[" in prefix:
+        return None
+    return match.group(1)
+
+
+def _peek_audio_delta(message: str) -> Optional[tuple]:
+    """Return ``(response_id, content_index, delta)`` of a ``response.audio.delta`` event.
+
+    The base64 ``delta`` is sliced out of the message instead of parsing the
+    whole event. Returns None if the message is not in the expected shape.
+    """
+    match = _DELTA_RE.search(message)
+    if match is None:
+        return None
+    end = message.find('"', match.end())
+    if end < 0:
+        return None
+    delta = message[match.end():end]
+    if "\\" in delta:
+        return None
+    # Look for the other fields around the payload, not in it
+    response_id = (
+        _RESPONSE_ID_RE.search(message, 0, match.start()) or _RESPONSE_ID_RE.search(message, end)
+    )
+    content_index = (
+        _CONTENT_INDEX_RE.search(message, 0, match.start()) or _CONTENT_INDEX_RE.search(message, end)
+    )
+    return (
+        response_id.group(1) if response_id else None,
+        int(content_index.group(1)) if content_index else 0,
+        delta,
+    )
 
 
 class TurnDetectionMode(Enum):
@@ -66,6 +187,74 @@ class RealtimeClient:
         extra_event_handlers (Dict[str, Callable[[Dict[str, Any]], None]]): 
             Additional event handlers. 
             Is a mapping of event names to functions that process the event payload.
+
+            All callbacks and event handlers may be coroutine functions; they are awaited in
+            event order. Plain functions run inline on the event loop and should return quickly.
+        transcript_flush_ms (int):
+            Output transcript deltas are batched and passed to on_output_transcript at most
+            this often, or when transcript_batch_chars are pending, or when the transcript is done.
+            A batch is flushed after this long even if no further delta arrives.
+        transcript_batch_chars (int):
+            Pending output transcript characters that trigger a batch.
+        trace_turns (bool):
+            Emit one OpenTelemetry trace per turn (see TurnTracer) to the global tracer provider.
+        recorder (SessionRecorder):
+            Optional recorder of every event received and sent, with timestamps,
+            e.g. to replay a production session with replay_session. Closed by close().
+        base_url (str):
+            WebSocket URL of the Realtime API. Defaults to OPENAI_REALTIME_URL or the OpenAI endpoint;
+            point it at a stand-in server (see benchmarks/) for load tests.
+        slow_callback_ms (float):
+            When set, time the handling of each event and each callback (realtime_handler_duration_seconds,
+            realtime_callback_duration_seconds) and log those slower than this. Run a LoopMonitor
+            (openai_realtime_client.diagnostics) to also get the stacks of callbacks that block the loop.
+        rate_limits (RateLimitTracker):
+            Optional tracker of the remaining request and token budgets, fed by rate_limits.updated
+            events; share one across the sessions of the process. While a budget is low,
+            response.create is deferred (in a background task) and tool outputs are trimmed.
+            Under server-side turn detection, the server is told not to create responses
+            (turn_detection.create_response) and the client requests them, deferred, instead.
+        usage (SessionUsage):
+            Token and cost accounting of the session, fed by response.done events. Pass one to set
+            prices, a per-session token cap (the session is closed once it is exceeded), a sink for
+            the records or labels; by default one is created for the model. Closed by close().
+        playback_position (Callable[[], float]):
+            Returns how many milliseconds of the audio passed to on_audio_delta have been played,
+            e.g. AudioHandler.playback_position_ms. Used to truncate interrupted responses
+            at the point the user actually heard. Without it, all delivered audio is assumed played.
+        input_vad (EnergyVad):
+            Optional local voice activity gate applied in stream_audio in SERVER_VAD and
+            SEMANTIC_VAD modes, so that only speech (plus pre-roll and hangover) is sent upstream.
+            Since the server's VAD measures the end of a turn from the audio it receives, audio
+            suppressed after speech is replaced by digital silence of the same length until the
+            server reports speech_stopped (for up to 8 s); only then is audio left out.
+        audio_format (str):
+            Audio format on the wire: "pcm16" (24kHz), "g711_ulaw" or "g711_alaw" (8kHz, 1 byte per sample).
+        transcode_audio (bool):
+            With a G.711 audio_format, convert between G.711 and 24kHz PCM16 so that stream_audio
+            takes and on_audio_delta receives PCM16. Set to False to pass G.711 through unchanged,
+            e.g. to a client that encodes and decodes it itself (input_vad and barge_in are then skipped).
+        barge_in (BargeInDetector):
+            Optional local barge-in detector run on audio passed to stream_audio. When it fires
+            while the assistant is speaking, the response is cancelled and truncated and
+            on_interrupt is called right away instead of waiting for the server's speech_started.
+        auto_reconnect (bool):
+            Reconnect with exponential backoff when the connection drops, then replay the session
+            configuration and the conversation history. Audio streamed in the meantime is buffered.
+        max_reconnect_attempts (int):
+            Connection attempts per reconnect before handle_messages gives up.
+        reconnect_backoff (float):
+            Delay in seconds before the second attempt; doubled after each failed attempt.
+        max_history_items (int):
+            Number of conversation items kept for replay after a reconnect.
+        max_gap_audio_ms (int):
+            Milliseconds of audio queued for sending, e.g. while reconnecting; older audio is dropped.
+        send_queue (SendQueue):
+            Outgoing messages, written by a single task per connection with control events
+            ahead of tool results ahead of audio. Exposes queue depth and dropped audio counters.
+        conversation_window (ConversationWindow):
+            Optional token budget for the server-side conversation. When a response exceeds it,
+            the oldest items are deleted (and optionally summarized) to keep per-turn latency flat.
     """
     def __init__(
         self, 
@@ -84,7 +273,26 @@ class RealtimeClient:
         on_interrupt: Optional[Callable[[], None]] = None,
         on_input_transcript: Optional[Callable[[str], None]] = None,  
         on_output_transcript: Optional[Callable[[str], None]] = None,  
-        extra_event_handlers: Optional[Dict[str, Callable[[Dict[str, Any]], None]]] = None
+        extra_event_handlers: Optional[Dict[str, Callable[[Dict[str, Any]], None]]] = None,
+        playback_position: Optional[Callable[[], float]] = None,
+        input_vad: Optional[EnergyVad] = None,
+        barge_in: Optional[BargeInDetector] = None,
+        audio_format: str = "pcm16",
+        transcode_audio: bool = True,
+        auto_reconnect: bool = False,
+        max_reconnect_attempts: int = 5,
+        reconnect_backoff: float = 0.5,
+        max_history_items: int = 100,
+        max_gap_audio_ms: int = 5000,
+        conversation_window: Optional[ConversationWindow] = None,
+        transcript_flush_ms: int = 100,
+        transcript_batch_chars: int = 80,
+        trace_turns: bool = False,
+        recorder: Optional[SessionRecorder] = None,
+        base_url: Optional[str] = None,
+        slow_callback_ms: Optional[float] = None,
+        rate_limits: Optional[RateLimitTracker] = None,
+        usage: Optional[SessionUsage] = None,
     ):
         self.api_key = api_key
         self.model = model
@@ -98,9 +306,34 @@ class RealtimeClient:
         self.instructions = instructions
         self.temperature = temperature
         self.language = language
-        self.base_url = "wss://api.openai.com/v1/realtime"
+        self.base_url = base_url or os.getenv("OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime")
         self.extra_event_handlers = extra_event_handlers or {}
         self.turn_detection_mode = turn_detection_mode
+        self.playback_position = playback_position
+        self.input_vad = input_vad
+        self.barge_in = barge_in
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Invalid audio format: {audio_format}")
+        self.audio_format = audio_format
+        self.transcode_audio = transcode_audio
+        self._bytes_per_ms = bytes_per_ms(audio_format)
+        self._audio_encoder = None
+        self._audio_decoder = None
+        if is_g711(audio_format) and transcode_audio:
+            self._audio_encoder = G711Encoder(audio_format)
+            self._audio_decoder = G711Decoder(audio_format)
+        self.auto_reconnect = auto_reconnect
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.reconnects = 0
+        self.conversation_window = conversation_window
+        self.transcript_flush_ms = transcript_flush_ms
+        self.transcript_batch_chars = transcript_batch_chars
+        self.turn_tracer = TurnTracer(enabled=trace_turns)
+        self.recorder = recorder
+        self.slow_callback_ms = slow_callback_ms
+        self.rate_limits = rate_limits
+        self.usage = usage if usage is not None else SessionUsage(model)
 
         tools = tools or []
         for i, tool in enumerate(tools):
@@ -110,18 +343,53 @@ class RealtimeClient:
         # Track current response state
         self._current_response_id = None
         self._current_item_id = None
+        self._current_content_index = 0
+        self._cancelled_response_id = None
         self._is_responding = False
+        # Milliseconds of output audio delivered in total and before the current item
+        self._output_audio_ms = 0.0
+        self._item_audio_start_ms = 0.0
         # Track printing state for input and output transcripts
         self._print_input_transcript = False
         self._output_transcript_buffer = ""
-        
+        self._output_transcript_flushed_at = 0.0
+        # Flushes a pending batch once transcript_flush_ms passed without a new delta
+        self._transcript_timer: Optional[asyncio.TimerHandle] = None
+        self._transcript_flush_task: Optional[asyncio.Task] = None
+        # Keeps batches from the timer and the receive loop in order
+        self._transcript_lock = asyncio.Lock()
+        # When the user's turn ended, until the first audio delta of the answer
+        self._turn_ended_at = None
+        self._session_counted = False
+        # Milliseconds of silence still to send in place of gated audio
+        self._gate_silence_ms = 0.0
+
+        # Conversation items (without audio) replayed after a reconnect
+        self._history = deque(maxlen=max_history_items)
+        # Latest summary of the items pruned by the conversation window, replayed first
+        self._summary_item: Optional[Dict[str, Any]] = None
+        self.send_queue = SendQueue(max_audio_bytes=int(max_gap_audio_ms * self._bytes_per_ms))
+        if recorder is not None:
+            # Recorded once written, so dropped or cleared audio is not in the recording
+            self.send_queue.on_sent = lambda message: recorder.record(OUTBOUND, message)
+        self._writer_task = None
+        self._reconnect_failed = False
+        self._closing = False
+        self._tool_tasks = set()
+        # Whether server-side turn detection was told not to create responses
+        self._responses_paused = False
+        self._deferred_tasks = set()
         
 
         
 
-    async def connect(self) -> None:
+    async def connect(self, active: bool = True) -> None:
         """Establish WebSocket connection with the Realtime API.
 
+        Args:
+            active: Count the session in ``realtime_active_sessions``. RealtimeSessionPool
+                connects idle sessions with False and counts them once they are acquired.
+
         Raises:
             RuntimeError: If the WebSocket connection fails.
         """
@@ -148,11 +416,11 @@ class RealtimeClient:
                 "modalities": ["text", "audio"],
                 "instructions": self.instructions,
                 "voice": self.voice,
-                "input_audio_format": "pcm16",
+                "input_audio_format": self.audio_format,
                 "input_audio_noise_reduction": {
                     "type": "far_field"
                 },
-                "output_audio_format": "pcm16",
+                "output_audio_format": self.audio_format,
                 "input_audio_transcription": {
                     "model": "gpt-4o-mini-transcribe",
                     "language": self.language,
@@ -166,23 +434,16 @@ class RealtimeClient:
                 "modalities": ["text", "audio"],
                 "instructions": self.instructions,
                 "voice": self.voice,
-                "input_audio_format": "pcm16",
+                "input_audio_format": self.audio_format,
                 "input_audio_noise_reduction": {
                     "type": "far_field"
                 },
-                "output_audio_format": "pcm16",
+                "output_audio_format": self.audio_format,
                 "input_audio_transcription": {
                     "model": "gpt-4o-mini-transcribe",
                     "language": self.language,
                 },
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 500,
-                    "silence_duration_ms": 200,
-                    "create_response": True,
-                    "interrupt_response": True,
-                },
+                "turn_detection": self._turn_detection_config(),
                 "tools": tools,
                 "tool_choice": "auto",
                 "temperature": self.temperature,
@@ -192,21 +453,16 @@ class RealtimeClient:
                 "modalities": ["text", "audio"],
                 "instructions": self.instructions,
                 "voice": self.voice,
-                "input_audio_format": "pcm16",
+                "input_audio_format": self.audio_format,
                 "input_audio_noise_reduction": {
                     "type": "far_field"
                 },
-                "output_audio_format": "pcm16",
+                "output_audio_format": self.audio_format,
                 "input_audio_transcription": {
                     "model": "gpt-4o-mini-transcribe",
                     "language": self.language,
                 },
-                "turn_detection": {
-                    "type": "semantic_vad",
-                    "eagerness": "auto",
-                    "create_response": True,
-                    "interrupt_response": True,
-                },
+                "turn_detection": self._turn_detection_config(),
                 "tools": tools,
                 "tool_choice": "auto",
                 "temperature": self.temperature,
@@ -214,19 +470,65 @@ class RealtimeClient:
         else:
             raise ValueError(f"Invalid turn detection mode: {self.turn_detection_mode}")
 
+        if active:
+            self._mark_active()
+
+        # Single writer for this connection; session.update is already queued first
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+        self._writer_task = asyncio.create_task(self.send_queue.run(self.ws))
+
+    def _mark_active(self) -> None:
+        if not self._session_counted:
+            self._session_counted = True
+            ACTIVE_SESSIONS.inc()
+
+    def _turn_detection_config(self) -> Dict[str, Any]:
+        # The server creates responses itself unless the rate limits paused it
+        if self.turn_detection_mode == TurnDetectionMode.SERVER_VAD:
+            return {
+                "type": "server_vad",
+                "threshold": 0.5,
+                "prefix_padding_ms": 500,
+                "silence_duration_ms": 200,
+                "create_response": not self._responses_paused,
+                "interrupt_response": True,
+            }
+        return {
+            "type": "semantic_vad",
+            "eagerness": "auto",
+            "create_response": not self._responses_paused,
+            "interrupt_response": True,
+        }
+
+    def _sync_response_throttle(self) -> None:
+        """Under server-side turn detection, keep the server from creating responses while a rate limit is low.
+
+        Paused turns get their response.create from the client instead, deferred until the budget resets.
+        """
+        if self.rate_limits is None or self.turn_detection_mode == TurnDetectionMode.MANUAL:
+            return
+        low = self.rate_limits.is_low()
+        if low == self._responses_paused:
+            return
+        self._responses_paused = low
+        logger.info("%s server-created responses for rate limits", "Pausing" if low else "Resuming")
+        self._send({"type": "session.update", "session": {"turn_detection": self._turn_detection_config()}})
+
     async def update_session(self, config: Dict[str, Any]) -> None:
         """Update session configuration."""
         event = {
             "type": "session.update",
             "session": config
         }
-        await self.ws.send(json.dumps(event))
+        self._send(event)
 
     async def send_text(self, text: str) -> None:
         """Send text message to the API."""
         event = {
             "type": "conversation.item.create",
             "item": {
+                "id": _new_item_id(),
                 "type": "message",
                 "role": "user",
                 "content": [{
@@ -235,43 +537,107 @@ class RealtimeClient:
                 }]
             }
         }
-        await self.ws.send(json.dumps(event))
+        self._send(event)
+        self._history.append(event["item"])
+        self.turn_tracer.start_turn("text")
         await self.create_response()
 
-    async def send_audio(self, audio_bytes: bytes) -> None:
-        """Send audio data to the API."""
-        # Convert audio to required format (24kHz, mono, PCM16)
-        pcm_data = await asyncio.to_thread(_convert_audio_bytes, audio_bytes)
+    async def send_audio(
+        self,
+        audio_bytes: bytes,
+        sample_rate: Optional[int] = None,
+        channels: int = 1,
+    ) -> None:
+        """Send audio data to the API.
+
+        ``audio_bytes`` may be a WAV file, any format ffmpeg can decode, or raw
+        PCM16 when ``sample_rate`` (and ``channels``) are given.
+        """
+        # Convert audio to required format (24kHz, mono, PCM16 or G.711)
+        pcm_data = await asyncio.to_thread(
+            _convert_audio_bytes, audio_bytes, sample_rate, channels, self.audio_format
+        )
         
         # Append audio to buffer
         append_event = {
             "type": "input_audio_buffer.append",
             "audio": pcm_data
         }
-        await self.ws.send(json.dumps(append_event))
+        self._send(append_event, SendPriority.AUDIO, len(pcm_data) * 3 // 4)
         
-        # Commit the buffer
+        await self.commit_audio()
+
+    async def commit_audio(self) -> None:
+        """Commit the input audio buffer, e.g. after streaming a recording with stream_audio."""
         commit_event = {
             "type": "input_audio_buffer.commit"
         }
-        await self.ws.send(json.dumps(commit_event))
+        # Queued with the audio so neither overtakes the appends before it
+        self._send(commit_event, SendPriority.AUDIO)
+        self._turn_ended_at = time.monotonic()
+        self.turn_tracer.start_turn("commit")
         
         # In manual mode, we need to explicitly request a response
         if self.turn_detection_mode == TurnDetectionMode.MANUAL:
-            await self.create_response()
+            await self._request_response(SendPriority.AUDIO)
 
     async def stream_audio(self, audio_chunk: bytes) -> None:
-        """Stream raw audio data to the API."""
+        """Stream raw audio data to the API.
+
+        Expects 24kHz mono PCM16, or audio already in ``audio_format`` when
+        ``transcode_audio`` is False.
+        """
+        if is_g711(self.audio_format) and not self.transcode_audio:
+            # Passthrough G.711: the VAD stages need PCM16 and are skipped
+            await self._append_audio(audio_chunk)
+            return
+
+        if self.barge_in is not None:
+            if self._is_responding or self._is_playing():
+                if self.barge_in.feed(audio_chunk):
+                    await self._handle_local_barge_in()
+            else:
+                self.barge_in.reset()
+
+        if self.input_vad is not None and self.turn_detection_mode != TurnDetectionMode.MANUAL:
+            gated = self.input_vad.process(audio_chunk)
+            if self.input_vad.speaking or gated:
+                # Open, or closed within this chunk after its hangover
+                self._gate_silence_ms = _GATE_TRAILING_SILENCE_MS
+                if not gated:
+                    # The chunk did not complete a frame
+                    return
+                audio_chunk = gated
+            elif self._gate_silence_ms > 0:
+                # Let the server's VAD hear the pause that ends the turn
+                self._gate_silence_ms -= len(audio_chunk) / bytes_per_ms("pcm16")
+                audio_chunk = bytes(len(audio_chunk))
+            else:
+                return
+
+        if self._audio_encoder is not None:
+            audio_chunk = self._audio_encoder.encode(audio_chunk)
+        await self._append_audio(audio_chunk)
+
+    async def _append_audio(self, audio_chunk: bytes) -> None:
         audio_b64 = base64.b64encode(audio_chunk).decode()
         
         append_event = {
             "type": "input_audio_buffer.append",
             "audio": audio_b64
         }
-        await self.ws.send(json.dumps(append_event))
+        self._send(append_event, SendPriority.AUDIO, len(audio_chunk))
 
-    async def create_response(self, functions: Optional[List[Dict[str, Any]]] = None) -> None:
-        """Request a response from the API. Needed when using manual mode."""
+    def _send(self, event: Dict[str, Any], priority: SendPriority = SendPriority.CONTROL, size: int = 0) -> None:
+        """Queue an event for the writer task; ``size`` is the audio it carries in bytes."""
+        if self.ws is not None and self.ws.close_code is not None:
+            # While a reconnect is pending, events wait in the queue
+            if not self.auto_reconnect or self._closing or self._reconnect_failed:
+                raise websockets.exceptions.ConnectionClosed(None, None)
+        message = json.dumps(event)
+        self.send_queue.put(message, priority, size)
+
+    def _response_create_event(self, functions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         event = {
             "type": "response.create",
             "response": {
@@ -280,41 +646,90 @@ class RealtimeClient:
         }
         if functions:
             event["response"]["tools"] = functions # type: ignore
-            
-        await self.ws.send(json.dumps(event))
+        return event
+
+    async def _request_response(
+        self, priority: SendPriority = SendPriority.CONTROL, functions: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """Queue a response.create, deferred while the rate limits are low."""
+        if self.rate_limits is not None and self.rate_limits.is_low():
+            # Waits in a task, so neither the caller nor the receive loop is held up
+            task = asyncio.create_task(self._deferred_response(priority, functions))
+            self._deferred_tasks.add(task)
+            task.add_done_callback(self._deferred_tasks.discard)
+            return
+        self._send(self._response_create_event(functions), priority)
+
+    async def _deferred_response(self, priority: SendPriority, functions: Optional[List[Dict[str, Any]]]) -> None:
+        await self.rate_limits.wait_for_budget()
+        try:
+            self._send(self._response_create_event(functions), priority)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    async def create_response(self, functions: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Request a response from the API. Needed when using manual mode."""
+        await self._request_response(functions=functions)
 
-    async def send_function_result(self, call_id: str, result: Any) -> None:
-        """Send function call result back to the API."""
+    async def send_function_result(self, call_id: str, result: Any, create_response: bool = True) -> None:
+        """Send function call result back to the API.
+
+        Pass ``create_response=False`` when sending several results, and request
+        a single response after the last one.
+        """
+        if self.rate_limits is not None:
+            result = self.rate_limits.trim_tool_output(result)
         event = {
             "type": "conversation.item.create",
             "item": {
+                "id": _new_item_id(),
                 "type": "function_call_output",
                 "call_id": call_id,
                 "output": result
             }
         }
-        await self.ws.send(json.dumps(event))
+        # Queued results are dropped on reconnect; the history replay sends them instead
+        self._history.append(event["item"])
+        self._send(event, SendPriority.TOOL)
 
-        # functions need a manual response
-        await self.create_response()
+        # functions need a manual response, queued behind the results
+        if create_response:
+            await self._request_response(SendPriority.TOOL)
 
     async def cancel_response(self) -> None:
         """Cancel the current response."""
         event = {
             "type": "response.cancel"
         }
-        await self.ws.send(json.dumps(event))
+        self._send(event)
     
+    def _played_item_audio_ms(self) -> int:
+        """Milliseconds of the current item's audio that were played."""
+        delivered = self._output_audio_ms - self._item_audio_start_ms
+        if self.playback_position is None:
+            return int(delivered)
+        played = self.playback_position() - self._item_audio_start_ms
+        return int(max(0.0, min(delivered, played)))
+
     async def truncate_response(self):
         """Truncate the conversation item to match what was actually played."""
         if self._current_item_id:
             event = {
                 "type": "conversation.item.truncate",
-                "item_id": self._current_item_id
+                "item_id": self._current_item_id,
+                "content_index": self._current_content_index,
+                "audio_end_ms": self._played_item_audio_ms(),
             }
-            await self.ws.send(json.dumps(event))
+            self._send(event)
 
     async def call_tool(self, call_id: str,tool_name: str, tool_arguments: Dict[str, Any]) -> None:
+        tool_result = await self._run_tool(tool_name, tool_arguments, call_id)
+        await self.send_function_result(call_id, tool_result)
+
+    async def _run_tool(
+        self, tool_name: str, tool_arguments: Dict[str, Any], call_id: Optional[str] = None
+    ) -> str:
+        start = time.monotonic()
         tool_selection = ToolSelection(
             tool_id="tool_id",
             tool_name=tool_name,
@@ -322,25 +737,73 @@ class RealtimeClient:
         )
 
         # avoid blocking the event loop with sync tools
-        # by using asyncio.to_thread
-        tool_result = await asyncio.to_thread(
-            call_tool_with_selection,
-            tool_selection, 
-            self.tools, 
-            verbose=True
-        )
-        await self.send_function_result(call_id, str(tool_result))
+        # by using asyncio.to_thread (which carries the tool span into the thread)
+        with self.turn_tracer.tool_call(tool_name, call_id):
+            tool_result = await asyncio.to_thread(
+                call_tool_with_selection,
+                tool_selection, 
+                self.tools, 
+                verbose=True
+            )
+        TOOL_CALL_DURATION.labels(tool_name).observe(time.monotonic() - start)
+        tool_result = str(tool_result)
+        self.usage.tool_called(tool_name, len(tool_result))
+        return tool_result
+
+    async def call_tools(self, function_calls: List[Dict[str, Any]]) -> None:
+        """Run the function calls of a response concurrently and request one follow-up response.
+
+        Args:
+            function_calls: ``function_call`` output items of a ``response.done`` event.
+        """
+        async def run(call: Dict[str, Any]) -> str:
+            try:
+                arguments = json.loads(call.get("arguments") or "{}")
+            except json.JSONDecodeError as e:
+                return f"Invalid arguments for {call['name']}: {e}"
+            try:
+                return await self._run_tool(call["name"], arguments, call["call_id"])
+            except Exception as e:
+                # The model still gets an output for this call and its follow-up response
+                logger.exception("Tool %s failed", call["name"])
+                return f"Error calling {call['name']}: {e!r}"
+
+        results = await asyncio.gather(*(run(call) for call in function_calls))
+        for call, result in zip(function_calls, results):
+            await self.send_function_result(call["call_id"], result, create_response=False)
+        await self._request_response(SendPriority.TOOL)
+
+    def _start_tool_calls(self, response: Dict[str, Any]) -> None:
+        function_calls = [
+            item for item in response.get("output", [])
+            if item.get("type") == "function_call" and item.get("status", "completed") == "completed"
+        ]
+        if not function_calls:
+            return
+        # Run in the background so audio and interruptions keep being handled
+        task = asyncio.create_task(self.call_tools(function_calls))
+        self._tool_tasks.add(task)
+        task.add_done_callback(self._tool_tasks.discard)
+
+    def _is_playing(self) -> bool:
+        """Whether delivered assistant audio is still being played."""
+        if self.playback_position is None:
+            return False
+        return self.playback_position() < self._output_audio_ms - 1
 
     async def handle_interruption(self):
         """Handle user interruption of the current response."""
-        if not self._is_responding:
+        playing = self._current_item_id is not None and self._is_playing()
+        if not self._is_responding and not playing:
             return
             
         print("\n[Handling interruption]")
         
         # 1. Cancel the current response
-        if self._current_response_id:
+        if self._is_responding and self._current_response_id:
             await self.cancel_response()
+            # Late audio deltas of the cancelled response are not delivered
+            self._cancelled_response_id = self._current_response_id
         
         # 2. Truncate the conversation item to what was actually played
         if self._current_item_id:
@@ -350,88 +813,401 @@ class RealtimeClient:
         self._current_response_id = None
         self._current_item_id = None
 
-    async def handle_messages(self) -> None:
+    async def _handle_local_barge_in(self):
+        """Interrupt the assistant as soon as speech is detected locally."""
+        print("\n[Local barge-in]")
+        await self.handle_interruption()
+        if self.on_interrupt:
+            await self._invoke(self.on_interrupt)
+
+    async def _handle_event(self, event: Dict[str, Any]) -> None:
+        event_type = event.get("type")
+
+        if self.conversation_window is not None:
+            await self._update_conversation_window(event)
+
+        if event_type == "error":
+            if event["error"].get("code") == "response_cancel_not_active":
+                # The response already ended or was cancelled by the server,
+                # e.g. after a local barge-in.
+                return
+            if event["error"].get("code") == "rate_limit_exceeded" and self.rate_limits is not None:
+                self.rate_limits.exceeded(event["error"].get("message", ""))
+                self._sync_response_throttle()
+            print(f"Error: {event['error']}")
+            return
+
+        elif event_type == "rate_limits.updated":
+            if self.rate_limits is not None:
+                self.rate_limits.update(event.get("rate_limits", []))
+                self._sync_response_throttle()
+
+        # Track response state
+        elif event_type == "response.created":
+            self._current_response_id = event.get("response", {}).get("id")
+            self._is_responding = True
+            self.turn_tracer.response_created(self._current_response_id)
+
+        elif event_type == "response.output_item.added":
+            item = event.get("item", {})
+            if item.get("type", "message") == "message":
+                self._current_item_id = item.get("id")
+                self._current_content_index = 0
+                self._item_audio_start_ms = self._output_audio_ms
+
+        elif event_type == "response.done":
+            # Keep the item id: its audio may still be playing and can
+            # be truncated if the user interrupts it.
+            self._is_responding = False
+            self._current_response_id = None
+            self._log_response(event.get("response", {}))
+            self.turn_tracer.response_done(event.get("response", {}))
+            self.usage.response_done(event.get("response", {}))
+            if self.usage.exceeded:
+                # Token cap reached: no tool follow-ups, end the session
+                await self.close()
+                return
+            self._start_tool_calls(event.get("response", {}))
+
+        # Handle interruptions
+        elif event_type == "input_audio_buffer.speech_started":
+            print("\n[Speech detected]")
+            self.turn_tracer.speech_started()
+            # No-op if a local barge-in already handled it
+            await self.handle_interruption()
+
+            # Also clears any late audio delivered after a local barge-in
+            if self.on_interrupt:
+                await self._invoke(self.on_interrupt)
+
+
+        elif event_type == "input_audio_buffer.speech_stopped":
+            print("\n[Speech ended]")
+            self._gate_silence_ms = 0.0
+            self._turn_ended_at = time.monotonic()
+            self.turn_tracer.start_turn("speech", event.get("item_id"))
+            if self._responses_paused:
+                # The server did not create this turn's response. If the budget
+                # reset, resume server responses for the next turns
+                self._sync_response_throttle()
+                await self._request_response()
+
+        # Handle normal response events
+        elif event_type == "response.text.delta":
+            if self.on_text_delta:
+                await self._invoke(self.on_text_delta, event["delta"])
+
+        elif event_type == "response.audio.delta":
+            await self._handle_audio_delta(
+                event.get("response_id"), event.get("content_index", 0), event["delta"]
+            )
+
+        elif event_type == "response.function_call_arguments.done":
+            self._history.append({
+                "id": event.get("item_id"),
+                "type": "function_call",
+                "call_id": event["call_id"],
+                "name": event["name"],
+                "arguments": event["arguments"],
+            })
+            # The call runs once the response is done, together with its other calls
+
+        # Handle input audio transcription
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            transcript = event.get("transcript", "")
+            if transcript:
+                self._history.append({
+                    "id": event.get("item_id"),
+                    "type": "message",
+                    "role": "user",
+                    "content": [{"type": "input_text", "text": transcript}],
+                })
+
+            self.turn_tracer.transcription_completed(event.get("item_id"), transcript)
+
+            if self.on_input_transcript:
+                await self._invoke(self.on_input_transcript, transcript)
+                self._print_input_transcript = True
+                if self._output_transcript_buffer:
+                    # Output transcript held back until now
+                    self._schedule_transcript_flush()
+
+        # Handle output audio transcription
+        elif event_type == "response.audio_transcript.delta":
+            if self.on_output_transcript:
+                self._output_transcript_buffer += event.get("delta", "")
+                # Held back until the input transcript was delivered, then batched
+                if self._print_input_transcript and (
+                    len(self._output_transcript_buffer) >= self.transcript_batch_chars
+                    or (time.monotonic() - self._output_transcript_flushed_at) * 1000
+                    >= self.transcript_flush_ms
+                ):
+                    await self._flush_output_transcript()
+                elif self._print_input_transcript:
+                    self._schedule_transcript_flush()
+
+        elif event_type == "response.audio_transcript.done":
+            if self._print_input_transcript:
+                await self._flush_output_transcript()
+            self._print_input_transcript = False
+
+        elif event_type in self.extra_event_handlers:
+            await self._invoke(self.extra_event_handlers[event_type], event)
+
+    async def _invoke(self, callback: Callable[..., Any], *args: Any) -> None:
+        """Call a callback, awaiting it if it is a coroutine function."""
+        if self.slow_callback_ms is None:
+            result = callback(*args)
+            if inspect.isawaitable(result):
+                await result
+            return
+
+        start = time.perf_counter()
+        result = callback(*args)
+        blocking = time.perf_counter() - start
+        if inspect.isawaitable(result):
+            await result
+        elapsed = time.perf_counter() - start
+        name = getattr(callback, "__qualname__", type(callback).__name__)
+        CALLBACK_DURATION.labels(name).observe(elapsed)
+        if elapsed * 1000 > self.slow_callback_ms:
+            logger.warning(
+                "Slow callback %s: %.1f ms (%.1f ms blocking the event loop)", name, elapsed * 1000, blocking * 1000
+            )
+
+    def _schedule_transcript_flush(self) -> None:
+        if self._transcript_timer is not None:
+            return
+        elapsed_ms = (time.monotonic() - self._output_transcript_flushed_at) * 1000
+        delay = max(0.0, self.transcript_flush_ms - elapsed_ms) / 1000
+        self._transcript_timer = asyncio.get_running_loop().call_later(delay, self._on_transcript_timer)
+
+    def _on_transcript_timer(self) -> None:
+        self._transcript_timer = None
+        self._transcript_flush_task = asyncio.create_task(self._timed_transcript_flush())
+
+    async def _timed_transcript_flush(self) -> None:
         try:
-            async for message in self.ws:
-                event = json.loads(message)
-                event_type = event.get("type")
-                
-                if event_type == "error":
-                    print(f"Error: {event['error']}")
-                    continue
-                
-                # Track response state
-                elif event_type == "response.created":
-                    self._current_response_id = event.get("response", {}).get("id")
-                    self._is_responding = True
-                
-                elif event_type == "response.output_item.added":
-                    self._current_item_id = event.get("item", {}).get("id")
-                
-                elif event_type == "response.done":
-                    self._is_responding = False
-                    self._current_response_id = None
-                    self._current_item_id = None
-                
-                # Handle interruptions
-                elif event_type == "input_audio_buffer.speech_started":
-                    print("\n[Speech detected]")
-                    if self._is_responding:
-                        await self.handle_interruption()
-
-                    if self.on_interrupt:
-                        self.on_interrupt()
-
-                
-                elif event_type == "input_audio_buffer.speech_stopped":
-                    print("\n[Speech ended]")
-                
-                # Handle normal response events
-                elif event_type == "response.text.delta":
-                    if self.on_text_delta:
-                        self.on_text_delta(event["delta"])
-                        
-                elif event_type == "response.audio.delta":
-                    if self.on_audio_delta:
-                        audio_bytes = base64.b64decode(event["delta"])
-                        self.on_audio_delta(audio_bytes)
-                        
-                elif event_type == "response.function_call_arguments.done":
-                    await self.call_tool(event["call_id"], event['name'], json.loads(event['arguments']))
-
-                # Handle input audio transcription
-                elif event_type == "conversation.item.input_audio_transcription.completed":
-                    transcript = event.get("transcript", "")
-                    
-                    if self.on_input_transcript:
-                        await asyncio.to_thread(self.on_input_transcript,transcript)
-                        self._print_input_transcript = True
-
-                # Handle output audio transcription
-                elif event_type == "response.audio_transcript.delta":
-                    if self.on_output_transcript:
-                        delta = event.get("delta", "")
-                        if not self._print_input_transcript:
-                            self._output_transcript_buffer += delta
-                        else:
-                            if self._output_transcript_buffer:
-                                await asyncio.to_thread(self.on_output_transcript,self._output_transcript_buffer)
-                                self._output_transcript_buffer = ""
-                            await asyncio.to_thread(self.on_output_transcript,delta)
-
-
-                elif event_type == "response.audio_transcript.done":
-                    self._print_input_transcript = False
-
-                elif event_type in self.extra_event_handlers:
-                    self.extra_event_handlers[event_type](event)
+            await self._flush_output_transcript()
+        except Exception:
+            logger.exception("Failed to deliver the output transcript")
 
-        except websockets.exceptions.ConnectionClosed:
-            print("Connection closed")
-        except Exception as e:
-            print(f"Error in message handling: {str(e)}")
+    def _cancel_transcript_timer(self) -> None:
+        if self._transcript_timer is not None:
+            self._transcript_timer.cancel()
+            self._transcript_timer = None
+
+    async def _flush_output_transcript(self) -> None:
+        self._cancel_transcript_timer()
+        async with self._transcript_lock:
+            self._output_transcript_flushed_at = time.monotonic()
+            if self._output_transcript_buffer and self.on_output_transcript:
+                text, self._output_transcript_buffer = self._output_transcript_buffer, ""
+                await self._invoke(self.on_output_transcript, text)
+
+    async def _handle_audio_delta(self, response_id: Optional[str], content_index: int, delta: str) -> None:
+        if response_id == self._cancelled_response_id:
+            return
+        if self._turn_ended_at is not None:
+            FIRST_AUDIO_LATENCY.observe(time.monotonic() - self._turn_ended_at)
+            self._turn_ended_at = None
+        self.turn_tracer.first_audio(response_id)
+        audio_bytes = base64.b64decode(delta)
+        self._current_content_index = content_index
+        self._output_audio_ms += len(audio_bytes) / self._bytes_per_ms
+        if self._audio_decoder is not None:
+            audio_bytes = self._audio_decoder.decode(audio_bytes)
+        if self.on_audio_delta:
+            await self._invoke(self.on_audio_delta, audio_bytes)
+
+    async def _handle_message(self, message: str) -> None:
+        """Dispatch a raw event, timing it if slow_callback_ms is set."""
+        if self.slow_callback_ms is None:
+            await self._dispatch_message(message)
+            return
+
+        start = time.perf_counter()
+        await self._dispatch_message(message)
+        elapsed = time.perf_counter() - start
+        event_type = _peek_event_type(message) or "unknown"
+        HANDLER_DURATION.labels(event_type).observe(elapsed)
+        if elapsed * 1000 > self.slow_callback_ms:
+            logger.warning("Slow %s handler: %.1f ms", event_type, elapsed * 1000)
+
+    async def _dispatch_message(self, message: str) -> None:
+        """Dispatch a raw event, parsing it only if something handles it."""
+        _RECEIVED_BYTES.inc(len(message))
+        if self.recorder is not None:
+            self.recorder.record(INBOUND, message)
+        event_type = _peek_event_type(message)
+        _count_event(event_type)
+        if event_type is not None:
+            if event_type == "response.audio.delta" and event_type not in self.extra_event_handlers:
+                # The bulk of the traffic: skip building a dict around the base64 payload
+                fields = _peek_audio_delta(message)
+                if fields is not None:
+                    await self._handle_audio_delta(*fields)
+                    return
+            elif not (
+                event_type in _HANDLED_EVENT_TYPES
+                or event_type in self.extra_event_handlers
+                or (self.conversation_window is not None and event_type in _WINDOW_EVENT_TYPES)
+            ):
+                return
+        await self._handle_event(json.loads(message))
+
+    def _log_response(self, response: Dict[str, Any]) -> None:
+        """Log the assistant messages of a finished response as text."""
+        for item in response.get("output", []):
+            if item.get("type") != "message":
+                # Function calls are logged as soon as their arguments are done
+                continue
+            text = "".join(
+                part.get("transcript") or part.get("text") or ""
+                for part in item.get("content", [])
+            )
+            if text:
+                self._history.append({
+                    "id": item.get("id"),
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [{"type": "text", "text": text}],
+                })
+
+    async def _update_conversation_window(self, event: Dict[str, Any]) -> None:
+        window = self.conversation_window
+        event_type = event.get("type")
+        if event_type == "conversation.item.created":
+            window.item_created(event["item"], event.get("previous_item_id"))
+        elif event_type == "conversation.item.deleted":
+            window.item_deleted(event["item_id"])
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            window.set_text(event["item_id"], event.get("transcript", ""))
+        elif event_type == "response.done":
+            pruned = window.response_done(event.get("response", {}))
+            if not pruned:
+                return
+            # Pruned items are not replayed after a reconnect either, only the summary
+            self._history = deque(
+                (item for item in self._history if item.get("id") not in pruned), maxlen=self._history.maxlen
+            )
+            summary = window.summary_item() if window.summarize else None
+            if summary is not None:
+                self._summary_item = summary
+                self._send({
+                    "type": "conversation.item.create",
+                    "previous_item_id": "root",
+                    "item": summary,
+                })
+            for item_id in pruned:
+                self._send({"type": "conversation.item.delete", "item_id": item_id})
+            logger.info(
+                "Pruned %d conversation items (%d input tokens)", len(pruned), window.last_input_tokens
+            )
+
+    async def reconnect(self) -> bool:
+        """Reconnect after the connection dropped and restore the conversation.
+
+        The session configuration is sent again by connect(), then the logged
+        conversation items are replayed. Audio queued during the gap is sent
+        after them.
+
+        Returns:
+            bool: Whether the session was restored.
+        """
+        # Whatever was in flight on the old session is gone
+        self.send_queue.clear(keep_audio=True)
+        self.turn_tracer.end_turn("disconnected")
+        self._is_responding = False
+        self._current_response_id = None
+        self._current_item_id = None
+        self._cancelled_response_id = None
+        self._print_input_transcript = False
+        self._output_transcript_buffer = ""
+        self._cancel_transcript_timer()
+        if self.conversation_window is not None:
+            # The new session starts empty; replayed items are tracked as they are created
+            self.conversation_window.reset()
+
+        delay = self.reconnect_backoff
+        for attempt in range(1, self.max_reconnect_attempts + 1):
+            print(f"\n[Reconnecting ({attempt}/{self.max_reconnect_attempts})]")
+            try:
+                await self.connect()
+                break
+            except RuntimeError:
+                if attempt == self.max_reconnect_attempts or self._closing:
+                    self._reconnect_failed = True
+                    return False
+                # Jitter keeps many sessions from reconnecting in lockstep
+                await asyncio.sleep(delay * random.uniform(1.0, 1.2))
+                delay = min(delay * 2, 30.0)
+
+        # Queued as control events, ahead of the audio backlog
+        await self._replay_history()
+        self.reconnects += 1
+        logger.info("Reconnected to the Realtime API (%d items replayed)", len(self._history))
+        return True
+
+    async def _replay_history(self) -> None:
+        if self._summary_item is not None:
+            self._send({"type": "conversation.item.create", "previous_item_id": "root", "item": self._summary_item})
+        call_ids = set()
+        for item in self._history:
+            if item["type"] == "function_call":
+                call_ids.add(item["call_id"])
+            elif item["type"] == "function_call_output" and item["call_id"] not in call_ids:
+                # Its function call was trimmed from the log
+                continue
+            self._send({"type": "conversation.item.create", "item": item})
+
+        # A tool result sent while the connection was down still needs its response
+        if self._history and self._history[-1]["type"] == "function_call_output":
+            await self.create_response()
+
+    async def handle_messages(self) -> None:
+        while True:
+            try:
+                async for message in self.ws:
+                    await self._handle_message(message)
+            except websockets.exceptions.ConnectionClosed:
+                print("Connection closed")
+            except Exception as e:
+                print(f"Error in message handling: {str(e)}")
+                return
+
+            if self._closing or not self.auto_reconnect:
+                return
+            if not await self.reconnect():
+                return
 
     async def close(self) -> None:
-        """Close the WebSocket connection."""
+        """Close the WebSocket connection.
+
+        Queued control and tool messages are sent first (for up to a second); queued audio is dropped.
+        """
+        self._closing = True
+        self.turn_tracer.end_turn("closed")
+        for task in self._tool_tasks:
+            task.cancel()
+        # Deliver the last transcript batch, after one the timer may be delivering
+        await self._timed_transcript_flush()
+        for task in self._deferred_tasks:
+            task.cancel()
+        if self._writer_task is not None:
+            # Send what is still queued for the session, e.g. a last function
+            # result or a response.cancel; only the audio is dropped
+            self.send_queue.clear_audio()
+            if not self._writer_task.done() and self.ws is not None and self.ws.close_code is None:
+                if not await self.send_queue.flush(_CLOSE_FLUSH_TIMEOUT):
+                    logger.warning("Closing with %d messages unsent", len(self.send_queue))
+            self._writer_task.cancel()
+        self.send_queue.clear()
+        if self._session_counted:
+            self._session_counted = False
+            ACTIVE_SESSIONS.dec()
+        if self.recorder is not None:
+            await self.recorder.close()
+        self.usage.close()
         if self.ws:
             await self.ws.close()
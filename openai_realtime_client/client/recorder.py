@@ -0,0 +1,247 @@
+"""Record Realtime API sessions and replay them for debugging and benchmarks.
+
+A recording is an append-only binary file: a magic header followed by one
+record per event::
+
+    <float64 t> <uint8 direction> <uint32 json length> <uint32 audio length> <json> <audio>
+
+``t`` is the monotonic time in seconds since the recording started and
+``direction`` is :data:`INBOUND` (from the API) or :data:`OUTBOUND` (to it).
+Audio carried by ``response.audio.delta`` and ``input_audio_buffer.append``
+events is stored as raw bytes after the JSON, whose ``delta``/``audio``
+field is left empty, so a recording is about 25% smaller than the traffic
+and the JSON stays readable.
+"""
+
+import asyncio
+import base64
+import logging
+import re
+import struct
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RTREC1\n"
+INBOUND = 0
+OUTBOUND = 1
+
+_RECORD_HEADER = struct.Struct("<dBII")
+_AUDIO_FIELD_RE = {
+    INBOUND: re.compile(r'"delta"\s*:\s*"'),
+    OUTBOUND: re.compile(r'"audio"\s*:\s*"'),
+}
+_AUDIO_EVENT_TYPES = {
+    INBOUND: '"response.audio.delta"',
+    OUTBOUND: '"input_audio_buffer.append"',
+}
+
+
+class SessionRecorder:
+    """
+    Writes the events of a session to a recording file.
+
+    Pass it to ``RealtimeClient(recorder=...)``; the client records every
+    event it receives and every event its writer actually sent, and closes
+    the recorder when it is closed. ``record`` only appends to a buffer; a
+    background task writes the buffer in a worker thread every
+    ``flush_interval`` seconds or once ``buffer_size`` bytes are pending.
+
+    Attributes:
+        path (str): Path of the recording.
+        buffer_size (int): Pending bytes that trigger a write.
+        flush_interval (float): Seconds between writes.
+        records (int): Number of events recorded.
+    """
+    def __init__(self, path: str, buffer_size: int = 1 << 16, flush_interval: float = 1.0):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._start = time.monotonic()
+
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def record(self, direction: int, message: str) -> None:
+        """Record a serialized event sent in ``direction``; starts the write task on first use."""
+        if self._file is None:
+            return
+        audio = b""
+        if _AUDIO_EVENT_TYPES[direction] in message:
+            match = _AUDIO_FIELD_RE[direction].search(message)
+            end = message.find('"', match.end()) if match else -1
+            if end > 0:
+                audio = base64.b64decode(message[match.end():end])
+                message = message[:match.end()] + message[end:]
+        data = message.encode()
+        header = _RECORD_HEADER.pack(time.monotonic() - self._start, direction, len(data), len(audio))
+        self._pending.extend((header, data, audio))
+        self._pending_bytes += len(header) + len(data) + len(audio)
+        self.records += 1
+        if self._pending_bytes >= self.buffer_size:
+            self._ready.set()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write the pending records now."""
+        self._ready.clear()
+        if not self._pending or self._file is None:
+            return
+        chunk = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        try:
+            await asyncio.to_thread(self._file.write, chunk)
+        except OSError:
+            logger.exception("Failed to write %d bytes to %s", len(chunk), self.path)
+
+    async def close(self) -> None:
+        """Stop the write task, letting a write in progress finish, and write the remaining records."""
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            self._ready.set()
+            await task
+        await self.flush()
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, int, str]]:
+    """Yield ``(t, direction, message)`` for each recorded event, with audio re-encoded as base64."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a session recording: {path}")
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            t, direction, json_len, audio_len = _RECORD_HEADER.unpack(header)
+            message = f.read(json_len).decode()
+            if audio_len:
+                audio = base64.b64encode(f.read(audio_len)).decode()
+                match = _AUDIO_FIELD_RE[direction].search(message)
+                message = message[:match.end()] + audio + message[match.end():]
+            yield t, direction, message
+
+
+async def _paced(records: Iterator[Tuple[float, int, str]], speed: float, direction: int):
+    """Yield the messages of one direction, at ``speed`` times real time (0 for no pacing)."""
+    start = time.monotonic()
+    first = None
+    for t, record_direction, message in records:
+        if record_direction != direction:
+            continue
+        if speed > 0:
+            if first is None:
+                first = t
+            delay = (t - first) / speed - (time.monotonic() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        yield message
+
+
+class ReplayWebSocket:
+    """
+    Stand-in for the Realtime API WebSocket that plays back a recording.
+
+    Iterating it yields the recorded inbound events; events sent to it are
+    counted and dropped. Assign it to ``RealtimeClient.ws`` (see
+    :func:`replay_session`).
+
+    Attributes:
+        sent_messages (int): Number of events the client sent.
+    """
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        self.sent_messages = 0
+        self.close_code: Optional[int] = None
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        async for message in _paced(read_recording(self.path), self.speed, INBOUND):
+            yield message
+        self.close_code = 1000
+
+    async def send(self, message: str) -> None:
+        self.sent_messages += 1
+
+    async def close(self) -> None:
+        self.close_code = 1000
+
+
+async def replay_session(client, path: str, speed: float = 1.0) -> Dict[str, float]:
+    """Feed a recording's inbound events through ``client.handle_messages``.
+
+    Args:
+        client: A RealtimeClient that is not connected. Its auto_reconnect is turned off,
+            so that the end of the recording ends the replay.
+        path: The recording.
+        speed: Playback speed relative to the recording; 0 replays as fast as possible.
+
+    Returns:
+        Dict[str, float]: Number of events replayed, wall time and events per second.
+    """
+    ws = ReplayWebSocket(path, speed)
+    client.auto_reconnect = False
+    client.ws = ws
+    writer = asyncio.create_task(client.send_queue.run(ws))
+    events = sum(1 for _, direction, _ in read_recording(path) if direction == INBOUND)
+    start = time.perf_counter()
+    try:
+        await client.handle_messages()
+    finally:
+        writer.cancel()
+    elapsed = time.perf_counter() - start
+    return {
+        "events": events,
+        "seconds": elapsed,
+        "events_per_second": events / elapsed if elapsed > 0 else 0.0,
+        "sent_messages": ws.sent_messages,
+    }
+
+
+async def serve_recording(path: str, host: str = "localhost", port: int = 8765, speed: float = 1.0) -> None:
+    """Serve a recording as a stand-in Realtime API until cancelled.
+
+    Each connection is sent the recorded inbound events at ``speed``; what
+    the client sends is read and ignored.
+    """
+    async def handler(ws):
+        async def drain():
+            async for _ in ws:
+                pass
+
+        reader = asyncio.create_task(drain())
+        try:
+            async for message in _paced(read_recording(path), speed, INBOUND):
+                await ws.send(message)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            reader.cancel()
+
+    async with websockets.serve(handler, host, port):
+        await asyncio.Future()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from collections import deque
+from enum import IntEnum
+from typing import Callable, Dict, Optional, Tuple
+
+from websockets.exceptions import ConnectionClosed
+
+from ..metrics import DROPPED_AUDIO_BYTES, SEND_QUEUE_DEPTH, WS_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+class SendPriority(IntEnum):
+    CONTROL = 0
+    TOOL = 1
+    AUDIO = 2
+
+
+_DEPTH = {priority: SEND_QUEUE_DEPTH.labels(priority.name.lower()) for priority in SendPriority}
+_DROPPED = DROPPED_AUDIO_BYTES.labels("upstream")
+_SENT_BYTES = WS_BYTES.labels("openai", "sent")
+
+
+class SendQueue:
+    """
+    Prioritized outgoing message queue drained by a single writer task.
+
+    Messages are sent strictly by priority class (control, then tool results,
+    then audio) and in order within a class, so a ``response.cancel`` never
+    waits behind a backlog of audio appends. Messages that must stay ordered
+    with each other, such as an audio commit and the response it triggers, go
+    in the same class.
+
+    The audio class is bounded by ``max_audio_bytes`` of audio; when it
+    overflows, the oldest audio is dropped. Messages without audio (size 0)
+    are never dropped, and neither is the newest message.
+
+    The queue outlives a connection: when the socket closes or the writer is
+    cancelled, the unsent message is kept and the next writer starts with it.
+    A message that fails to send for any other reason is logged and dropped.
+
+    Attributes:
+        max_audio_bytes (int): Maximum audio payload queued in the audio class.
+        sent_messages (int): Messages written to the socket.
+        dropped_audio_messages (int): Audio messages dropped by the bound.
+        dropped_audio_bytes (int): Audio bytes dropped by the bound.
+        max_depth (int): Highest number of queued messages seen.
+        on_sent (Callable[[str], None]): Optional hook called with each message once it was written.
+    """
+    def __init__(self, max_audio_bytes: int = 240000):
+        self.max_audio_bytes = max_audio_bytes
+        self.sent_messages = 0
+        self.dropped_audio_messages = 0
+        self.dropped_audio_bytes = 0
+        self.max_depth = 0
+        self.on_sent: Optional[Callable[[str], None]] = None
+
+        self._queues = {priority: deque() for priority in SendPriority}
+        self._audio_bytes = 0
+        self._ready = asyncio.Event()
+        # Set by the writer once everything queued was sent
+        self._empty = asyncio.Event()
+        self._empty.set()
+
+    def depth(self) -> Dict[str, int]:
+        """Number of queued messages per priority class."""
+        return {priority.name.lower(): len(queue) for priority, queue in self._queues.items()}
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def audio_bytes(self) -> int:
+        """Audio payload bytes queued."""
+        return self._audio_bytes
+
+    def put(self, message: str, priority: SendPriority = SendPriority.CONTROL, size: int = 0) -> None:
+        """Queue a serialized message; ``size`` is the audio it carries in bytes."""
+        self._queues[priority].append((message, size))
+        _DEPTH[priority].inc()
+        if priority == SendPriority.AUDIO:
+            self._audio_bytes += size
+            if self._audio_bytes > self.max_audio_bytes:
+                self._drop_audio()
+        self.max_depth = max(self.max_depth, len(self))
+        self._empty.clear()
+        self._ready.set()
+
+    def _drop_audio(self) -> None:
+        queue = self._queues[SendPriority.AUDIO]
+        i = 0
+        while self._audio_bytes > self.max_audio_bytes and i < len(queue) - 1:
+            size = queue[i][1]
+            if not size:
+                i += 1
+                continue
+            del queue[i]
+            self._audio_bytes -= size
+            self.dropped_audio_messages += 1
+            self.dropped_audio_bytes += size
+            _DEPTH[SendPriority.AUDIO].dec()
+            _DROPPED.inc(size)
+
+    def clear(self, keep_audio: bool = False) -> None:
+        """Discard queued messages, e.g. those meant for a session that is gone."""
+        for priority, queue in self._queues.items():
+            if priority == SendPriority.AUDIO and keep_audio:
+                continue
+            _DEPTH[priority].dec(len(queue))
+            queue.clear()
+        if not keep_audio:
+            self._audio_bytes = 0
+        if not len(self):
+            self._empty.set()
+
+    def clear_audio(self) -> None:
+        """Discard queued audio, keeping control and tool messages."""
+        queue = self._queues[SendPriority.AUDIO]
+        _DEPTH[SendPriority.AUDIO].dec(len(queue))
+        queue.clear()
+        self._audio_bytes = 0
+
+    async def flush(self, timeout: float) -> bool:
+        """Wait for the writer to send everything queued.
+
+        Returns:
+            bool: True if the queue emptied within ``timeout`` seconds.
+        """
+        try:
+            await asyncio.wait_for(self._empty.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _pop(self) -> Tuple[SendPriority, Tuple[str, int]]:
+        for priority, queue in self._queues.items():
+            if queue:
+                return priority, queue.popleft()
+        raise IndexError("pop from an empty SendQueue")
+
+    def _requeue(self, priority: SendPriority, entry: Tuple[str, int]) -> None:
+        self._queues[priority].appendleft(entry)
+        _DEPTH[priority].inc()
+        if priority == SendPriority.AUDIO:
+            self._audio_bytes += entry[1]
+
+    async def run(self, ws) -> None:
+        """Write queued messages to ``ws`` until it closes or the task is cancelled."""
+        while True:
+            if not len(self):
+                self._empty.set()
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            priority, entry = self._pop()
+            _DEPTH[priority].dec()
+            if priority == SendPriority.AUDIO:
+                self._audio_bytes -= entry[1]
+            try:
+                await ws.send(entry[0])
+            except ConnectionClosed:
+                # Keep it for the next connection
+                self._requeue(priority, entry)
+                return
+            except asyncio.CancelledError:
+                # Keep it for the next writer
+                self._requeue(priority, entry)
+                raise
+            except Exception:
+                logger.exception("Failed to send a %s message", priority.name.lower())
+                continue
+            self.sent_messages += 1
+            _SENT_BYTES.inc(len(entry[0]))
+            if self.on_sent is not None:
+                self.on_sent(entry[0])
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Set, Tuple
+
+from .realtime_client import RealtimeClient
+
+logger = logging.getLogger(__name__)
+
+
+class RealtimeSessionPool:
+    """
+    Pool of pre-connected, pre-configured RealtimeClient sessions.
+
+    Connecting to the Realtime API and sending ``session.update`` takes a TLS
+    handshake and a few round-trips. The pool keeps sessions connected ahead of
+    time so a new caller gets a ready session immediately; used sessions are
+    not returned to the pool since they carry conversation state.
+
+    The pool keeps ``min_size`` idle sessions ready. When a caller finds the
+    pool empty the target grows by one, up to ``max_size``, and it shrinks back
+    as idle sessions expire. Idle sessions are health-checked with WebSocket
+    pings and recycled after ``idle_ttl`` seconds.
+
+    Attributes:
+        factory (Callable[[], RealtimeClient]): Creates a new, unconnected client.
+        min_size (int): Minimum number of idle sessions to keep ready.
+        max_size (int): Maximum number of idle sessions to keep ready.
+        idle_ttl (float): Seconds an idle session is kept before being recycled.
+        health_check_interval (float): Seconds between health checks of idle sessions.
+        hits (int): Acquisitions served from the pool.
+        misses (int): Acquisitions that had to connect a new session.
+    """
+    def __init__(
+        self,
+        factory: Callable[[], RealtimeClient],
+        min_size: int = 2,
+        max_size: int = 10,
+        idle_ttl: float = 600.0,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+    ):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.idle_ttl = idle_ttl
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.hits = 0
+        self.misses = 0
+
+        self._target = min_size
+        self._idle: List[Tuple[float, RealtimeClient]] = []
+        self._connecting = 0
+        self._refill_event = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        # Closes of expired sessions found by acquire, awaited by close()
+        self._close_tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+    @property
+    def idle_count(self) -> int:
+        """Number of ready sessions."""
+        return len(self._idle)
+
+    async def start(self) -> None:
+        """Start filling the pool and health-checking idle sessions."""
+        self._tasks = [
+            asyncio.create_task(self._refill_loop()),
+            asyncio.create_task(self._health_loop()),
+        ]
+        self._refill_event.set()
+
+    async def acquire(self, **callbacks: Any) -> RealtimeClient:
+        """Return a connected session, connecting a new one if none is ready.
+
+        Keyword arguments are set as attributes on the client, e.g.
+        ``on_audio_delta=...``, since pooled clients are created before the
+        caller is known.
+
+        Raises:
+            RuntimeError: If a new session has to be connected and that fails.
+        """
+        client = None
+        while self._idle:
+            # Oldest first, so sessions are used before they expire
+            created, candidate = self._idle.pop(0)
+            if self._is_usable(candidate, created):
+                client = candidate
+                break
+            task = asyncio.create_task(candidate.close())
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_done)
+
+        if client is not None:
+            self.hits += 1
+            # Idle sessions are not counted as active until handed out
+            client._mark_active()
+        else:
+            self.misses += 1
+            self._target = min(self.max_size, self._target + 1)
+            client = self.factory()
+            await client.connect()
+        self._refill_event.set()
+
+        for name, value in callbacks.items():
+            if not hasattr(client, name):
+                raise AttributeError(f"RealtimeClient has no attribute {name!r}")
+            setattr(client, name, value)
+        return client
+
+    def _close_done(self, task: asyncio.Task) -> None:
+        self._close_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Failed to close an expired session: %r", task.exception())
+
+    def _is_usable(self, client: RealtimeClient, created: float) -> bool:
+        if time.monotonic() - created > self.idle_ttl:
+            return False
+        return client.ws is not None and client.ws.close_code is None
+
+    async def _connect_one(self) -> None:
+        client = self.factory()
+        try:
+            await client.connect(active=False)
+        except RuntimeError:
+            logger.warning("Failed to pre-connect a Realtime session")
+            await asyncio.sleep(1.0)
+            return
+        finally:
+            self._connecting -= 1
+        if self._closed:
+            await client.close()
+            return
+        self._idle.append((time.monotonic(), client))
+
+    async def _refill_loop(self) -> None:
+        while not self._closed:
+            await self._refill_event.wait()
+            self._refill_event.clear()
+            missing = self._target - len(self._idle) - self._connecting
+            if missing <= 0:
+                continue
+            self._connecting += missing
+            await asyncio.gather(*(self._connect_one() for _ in range(missing)))
+            # Retry until the target is reached
+            if len(self._idle) < self._target:
+                self._refill_event.set()
+
+    async def _health_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            sessions = list(self._idle)
+            results = await asyncio.gather(*(self._check(c, t) for t, c in sessions))
+            expired = 0
+            for session, healthy in zip(sessions, results):
+                # Sessions may have been acquired during the check
+                if healthy or session not in self._idle:
+                    continue
+                self._idle.remove(session)
+                expired += 1
+                await session[1].close()
+            if expired:
+                self._target = max(self.min_size, self._target - expired)
+                self._refill_event.set()
+
+    async def _check(self, client: RealtimeClient, created: float) -> bool:
+        if not self._is_usable(client, created):
+            return False
+        try:
+            pong = await client.ws.ping()
+            await asyncio.wait_for(pong, self.ping_timeout)
+        except Exception:
+            return False
+        return True
+
+    async def close(self) -> None:
+        """Stop maintenance and close all idle sessions."""
+        self._closed = True
+        for task in self._tasks:
+            task.cancel()
+        sessions, self._idle = self._idle, []
+        await asyncio.gather(*(client.close() for _, client in sessions))
+        if self._close_tasks:
+            await asyncio.wait(self._close_tasks)
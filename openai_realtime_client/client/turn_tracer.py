@@ -0,0 +1,161 @@
+import contextlib
+import logging
+import time
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+
+class TurnTracer:
+    """
+    Emits one OpenTelemetry trace per conversational turn of a RealtimeClient.
+
+    A turn starts when the user stops speaking (``speech_stopped``, or an
+    audio commit / text message in manual mode) and ends with the
+    ``response.done`` of the last response of the turn, i.e. after any tool
+    calls and the response that follows them. The root ``realtime.turn`` span
+    has child spans for each phase:
+
+    * ``realtime.transcription``: until ``input_audio_transcription.completed``
+    * ``realtime.first_audio``: until the first audio delta of the answer
+    * ``realtime.response``: from ``response.created`` to ``response.done``
+    * ``realtime.tool.<name>``: each tool call; spans created by the tool, such
+      as the LlamaIndex RAG spans, become its children
+
+    Spans carry the response and item ids, and the root span records each
+    event as a span event. Spans go to the global tracer provider, e.g. the
+    Phoenix exporter with sampling installed by ``rag.tracing.configure_tracing``.
+    Without ``opentelemetry`` installed, or when disabled, every method is a no-op.
+
+    Attributes:
+        enabled (bool): Whether spans are emitted.
+    """
+    def __init__(self, enabled: bool = True, tracer_name: str = "openai_realtime_client"):
+        self.enabled = enabled and trace is not None
+        if enabled and trace is None:
+            logger.warning("opentelemetry is not installed, turn tracing is disabled")
+        self._tracer = trace.get_tracer(tracer_name) if self.enabled else None
+        self._turn = None
+        self._turn_context = None
+        self._phases: Dict[str, Any] = {}
+        self._speech_started_at: Optional[float] = None
+
+    def _event(self, name: str, **attributes: Any) -> None:
+        if self._turn is not None:
+            self._turn.add_event(name, {k: v for k, v in attributes.items() if v is not None})
+
+    def _start_phase(self, name: str, **attributes: Any) -> None:
+        self._end_phase(name)
+        self._phases[name] = self._tracer.start_span(
+            f"realtime.{name}",
+            context=self._turn_context,
+            attributes={k: v for k, v in attributes.items() if v is not None},
+        )
+
+    def _end_phase(self, name: str, **attributes: Any) -> None:
+        span = self._phases.pop(name, None)
+        if span is None:
+            return
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value)
+        span.end()
+
+    def start_turn(self, trigger: str, item_id: Optional[str] = None) -> None:
+        """Start a turn, ending any turn still open."""
+        if not self.enabled:
+            return
+        self.end_turn("superseded")
+        attributes = {"realtime.trigger": trigger}
+        if item_id:
+            attributes["realtime.input_item_id"] = item_id
+        if self._speech_started_at is not None:
+            attributes["realtime.user_speech_ms"] = int((time.monotonic() - self._speech_started_at) * 1000)
+            self._speech_started_at = None
+        self._turn = self._tracer.start_span("realtime.turn", attributes=attributes)
+        self._turn_context = trace.set_span_in_context(self._turn)
+        if trigger != "text":
+            self._start_phase("transcription", **{"realtime.item_id": item_id})
+        self._start_phase("first_audio")
+
+    def end_turn(self, status: str = "completed") -> None:
+        """End the current turn and all of its open phases."""
+        if not self.enabled or self._turn is None:
+            return
+        for name in list(self._phases):
+            self._end_phase(name)
+        self._turn.set_attribute("realtime.status", status)
+        if status == "failed":
+            self._turn.set_status(Status(StatusCode.ERROR, "response failed"))
+        self._turn.end()
+        self._turn = None
+        self._turn_context = None
+
+    def speech_started(self) -> None:
+        if not self.enabled:
+            return
+        self._speech_started_at = time.monotonic()
+        if self._turn is not None:
+            # The user talks over the answer of the current turn
+            self._event("speech_started")
+
+    def transcription_completed(self, item_id: Optional[str], transcript: str) -> None:
+        if not self.enabled:
+            return
+        self._event("transcription_completed", item_id=item_id)
+        self._end_phase("transcription", **{"realtime.transcript_chars": len(transcript)})
+
+    def response_created(self, response_id: Optional[str]) -> None:
+        if not self.enabled or self._turn is None:
+            return
+        self._event("response_created", response_id=response_id)
+        self._turn.set_attribute("realtime.response_id", response_id or "")
+        self._start_phase("response", **{"realtime.response_id": response_id})
+
+    def first_audio(self, response_id: Optional[str]) -> None:
+        if not self.enabled or "first_audio" not in self._phases:
+            return
+        self._event("first_audio_delta", response_id=response_id)
+        self._end_phase("first_audio", **{"realtime.response_id": response_id})
+
+    def response_done(self, response: Dict[str, Any]) -> None:
+        if not self.enabled or self._turn is None:
+            return
+        status = response.get("status")
+        usage = response.get("usage") or {}
+        self._event("response_done", response_id=response.get("id"), status=status)
+        self._end_phase("response", **{
+            "realtime.status": status,
+            "realtime.input_tokens": usage.get("input_tokens"),
+            "realtime.output_tokens": usage.get("output_tokens"),
+        })
+        has_function_calls = any(
+            item.get("type") == "function_call" for item in response.get("output", [])
+        )
+        if status == "cancelled":
+            self.end_turn("interrupted")
+        elif status == "failed":
+            self.end_turn("failed")
+        elif not has_function_calls:
+            # Otherwise the turn continues with the tool calls and the next response
+            self.end_turn()
+
+    @contextlib.contextmanager
+    def tool_call(self, tool_name: str, call_id: Optional[str] = None) -> Iterator[None]:
+        """Trace a tool call as the current span, so spans created by the tool nest under it."""
+        if not self.enabled or self._turn is None:
+            yield
+            return
+        span = self._tracer.start_span(
+            f"realtime.tool.{tool_name}",
+            context=self._turn_context,
+            attributes={"realtime.tool": tool_name, "realtime.call_id": call_id or ""},
+        )
+        with trace.use_span(span, end_on_exit=True):
+            yield
@@ -0,0 +1,322 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from ..metrics import SESSION_TOKENS, TOKEN_COST, TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Token kinds of a response's usage, by direction and modality
+TOKEN_KINDS = (
+    "input_text",
+    "input_audio",
+    "cached_text",
+    "cached_audio",
+    "output_text",
+    "output_audio",
+)
+
+# USD per 1M tokens by model prefix, as published when this was written.
+# Pass ``prices`` to SessionUsage for other models or updated prices.
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4o-mini-realtime": {
+        "input_text": 0.60, "cached_text": 0.30, "output_text": 2.40,
+        "input_audio": 10.0, "cached_audio": 0.30, "output_audio": 20.0,
+    },
+    "gpt-4o-realtime": {
+        "input_text": 5.0, "cached_text": 2.50, "output_text": 20.0,
+        "input_audio": 40.0, "cached_audio": 2.50, "output_audio": 80.0,
+    },
+    "gpt-realtime": {
+        "input_text": 4.0, "cached_text": 0.40, "output_text": 16.0,
+        "input_audio": 32.0, "cached_audio": 0.40, "output_audio": 64.0,
+    },
+}
+
+
+def prices_for(model: Optional[str]) -> Dict[str, float]:
+    """Prices of the longest model prefix in MODEL_PRICES matching ``model``, or none."""
+    matches = [prefix for prefix in MODEL_PRICES if model and model.startswith(prefix)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else {}
+
+
+def usage_tokens(usage: Dict[str, Any]) -> Dict[str, int]:
+    """Split the ``usage`` of a ``response.done`` event into TOKEN_KINDS.
+
+    Cached input tokens are counted as ``cached_*`` only, not as ``input_*``.
+    Without a modality breakdown, tokens are counted as text.
+    """
+    input_details = usage.get("input_token_details") or {"text_tokens": usage.get("input_tokens", 0)}
+    cached_details = input_details.get("cached_tokens_details") or {}
+    output_details = usage.get("output_token_details") or {"text_tokens": usage.get("output_tokens", 0)}
+    cached_text = cached_details.get("text_tokens", 0)
+    cached_audio = cached_details.get("audio_tokens", 0)
+    return {
+        "input_text": input_details.get("text_tokens", 0) - cached_text,
+        "input_audio": input_details.get("audio_tokens", 0) - cached_audio,
+        "cached_text": cached_text,
+        "cached_audio": cached_audio,
+        "output_text": output_details.get("text_tokens", 0),
+        "output_audio": output_details.get("audio_tokens", 0),
+    }
+
+
+def _cost(tokens: Dict[str, int], prices: Dict[str, float]) -> float:
+    return sum(count * prices.get(kind, 0.0) for kind, count in tokens.items()) / 1_000_000
+
+
+class UsageSink:
+    """
+    Batches usage records and hands them to ``write`` off the hot path.
+
+    ``put`` only appends to a buffer; a background task passes the buffered
+    records to ``write`` every ``flush_interval`` seconds or once
+    ``batch_size`` records are pending. ``write`` takes a list of records and
+    may be a coroutine function; plain functions run in a worker thread. At
+    most ``max_pending`` records are buffered, older ones are dropped if
+    ``write`` falls behind.
+
+    Attributes:
+        batch_size (int): Pending records that trigger a flush.
+        flush_interval (float): Seconds between flushes.
+        max_pending (int): Maximum buffered records.
+        written (int): Records passed to ``write``.
+        dropped (int): Records dropped because the buffer was full.
+    """
+    def __init__(
+        self,
+        write: Callable[[List[Dict[str, Any]]], Union[None, Awaitable[None]]],
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+        max_pending: int = 10000,
+    ):
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+
+        self._pending: deque = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def put(self, record: Dict[str, Any]) -> None:
+        """Buffer a record; starts the flush task on first use."""
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size:
+            self._ready.set()
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write the pending records now."""
+        self._ready.clear()
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                if inspect.iscoroutinefunction(self.write):
+                    await self.write(batch)
+                else:
+                    await asyncio.to_thread(self.write, batch)
+                self.written += len(batch)
+            except Exception:
+                logger.exception("Failed to write %d usage records", len(batch))
+
+    async def close(self) -> None:
+        """Stop the flush task, letting a write in progress finish, and write the remaining records."""
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            self._ready.set()
+            await task
+            self._closing = False
+        await self.flush()
+
+
+def jsonl_writer(path: str) -> Callable[[List[Dict[str, Any]]], None]:
+    """Return a ``UsageSink`` writer appending records to a JSON Lines file."""
+    def write(records: List[Dict[str, Any]]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+    return write
+
+
+class UsageTotals:
+    """
+    Token and cost totals, e.g. of all sessions of the process.
+
+    Attributes:
+        responses (int): Responses counted.
+        tokens (Counter): Tokens by kind (see TOKEN_KINDS).
+        cost (float): Estimated cost in USD.
+    """
+    def __init__(self):
+        self.responses = 0
+        self.tokens: Counter = Counter()
+        self.cost = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens.values())
+
+    def add(self, tokens: Dict[str, int], cost: float) -> None:
+        self.responses += 1
+        self.tokens.update(tokens)
+        self.cost += cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "responses": self.responses,
+            "total_tokens": self.total_tokens,
+            "tokens": dict(self.tokens),
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+# Usage of all sessions in the process
+process_usage = UsageTotals()
+
+
+class SessionUsage:
+    """
+    Accounts the token usage and cost of one Realtime session.
+
+    Every ``response.done`` adds its usage to the session totals, to
+    ``process_usage`` and to the ``realtime_tokens_total`` and
+    ``realtime_token_cost_usd_total`` metrics, and is kept as a turn record:
+    what triggered the response (the user or tool outputs), its tokens by
+    kind and its estimated cost. A response that follows tool calls is
+    attributed to those tools, split evenly, together with the size of their
+    outputs, so that expensive tools (e.g. long RAG results) stand out.
+
+    With a ``sink``, each turn record and a summary record at the end of the
+    session are passed to it. With ``max_tokens``, ``exceeded`` turns True
+    once the session used more tokens, and RealtimeClient ends the session.
+
+    Attributes:
+        model (str): Model of the session, used for the default prices.
+        prices (Dict[str, float]): USD per 1M tokens by kind (see MODEL_PRICES).
+        max_tokens (int): Optional cap on the session's total tokens.
+        sink (UsageSink): Optional sink for turn and session records.
+        labels (Dict[str, Any]): Extra fields added to the records, e.g. a session or user id.
+        totals (UsageTotals): Tokens and cost of the session.
+        turns (deque): Most recent turn records, up to ``max_turns``.
+        tools (Dict[str, Dict[str, Any]]): Calls, output characters, tokens and cost by tool name.
+        exceeded (bool): Whether the session used more than ``max_tokens``.
+    """
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        prices: Optional[Dict[str, float]] = None,
+        max_tokens: Optional[int] = None,
+        sink: Optional[UsageSink] = None,
+        labels: Optional[Dict[str, Any]] = None,
+        max_turns: int = 200,
+    ):
+        self.model = model
+        self.prices = prices if prices is not None else prices_for(model)
+        self.max_tokens = max_tokens
+        self.sink = sink
+        self.labels = labels or {}
+        self.totals = UsageTotals()
+        self.turns: deque = deque(maxlen=max_turns)
+        self.tools: Dict[str, Dict[str, Any]] = {}
+        self.exceeded = False
+
+        self._started_at = time.time()
+        self._pending_tools: List[str] = []
+        self._closed = False
+
+    def tool_called(self, name: str, output_chars: int) -> None:
+        """Record a tool call; the next response is attributed to it."""
+        stats = self.tools.setdefault(name, {"calls": 0, "output_chars": 0, "tokens": 0, "cost_usd": 0.0})
+        stats["calls"] += 1
+        stats["output_chars"] += output_chars
+        self._pending_tools.append(name)
+
+    def response_done(self, response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Account the usage of a ``response.done`` event and return its turn record."""
+        usage = response.get("usage")
+        if not usage:
+            return None
+        tokens = usage_tokens(usage)
+        cost = _cost(tokens, self.prices)
+        model = self.model or "unknown"
+        self.totals.add(tokens, cost)
+        process_usage.add(tokens, cost)
+        for kind, count in tokens.items():
+            if count:
+                TOKENS.labels(model, kind).inc(count)
+        TOKEN_COST.labels(model).inc(cost)
+
+        tools, self._pending_tools = self._pending_tools, []
+        total = sum(tokens.values())
+        for name in tools:
+            self.tools[name]["tokens"] += total / len(tools)
+            self.tools[name]["cost_usd"] += cost / len(tools)
+
+        record = {
+            "type": "turn",
+            **self.labels,
+            "time": time.time(),
+            "model": model,
+            "response_id": response.get("id"),
+            "status": response.get("status"),
+            "trigger": "tool" if tools else "user",
+            "tools": tools,
+            "total_tokens": total,
+            "tokens": tokens,
+            "cost_usd": round(cost, 6),
+        }
+        self.turns.append(record)
+        if self.sink is not None:
+            self.sink.put(record)
+
+        if self.max_tokens and not self.exceeded and self.totals.total_tokens > self.max_tokens:
+            self.exceeded = True
+            logger.warning(
+                "Session used %d tokens, over its cap of %d", self.totals.total_tokens, self.max_tokens
+            )
+        return record
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals of the session, by token kind and by tool."""
+        return {
+            "type": "session",
+            **self.labels,
+            "time": time.time(),
+            "duration_s": round(time.time() - self._started_at, 3),
+            "model": self.model or "unknown",
+            **self.totals.to_dict(),
+            "tools": self.tools,
+            "exceeded": self.exceeded,
+        }
+
+    def close(self) -> None:
+        """Record the session's totals (once), e.g. when the session ends."""
+        if self._closed:
+            return
+        self._closed = True
+        if not self.totals.responses:
+            # e.g. a pooled session that was never used
+            return
+        SESSION_TOKENS.observe(self.totals.total_tokens)
+        if self.sink is not None:
+            self.sink.put(self.summary())
@@ -0,0 +1,153 @@
+"""Event-loop diagnostics: lag monitoring, stall stack samples and an on-demand sampling profiler.
+
+Everything the client does (audio in, audio out, transcripts, tool calls)
+runs on one event loop, so a single blocking call makes every session in the
+process stutter. :class:`LoopMonitor` measures how late the loop runs and
+logs where it was stuck when it stalls; :func:`profile_event_loop` samples
+the loop thread for a while and returns the stacks in the folded format of
+flame graph tools (``flamegraph.pl``, speedscope).
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from .metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and samples the stack of the loop while it is blocked.
+
+    A task on the loop wakes up every ``interval`` seconds and records how late
+    it ran (``realtime_event_loop_lag_seconds``). A watchdog thread checks that
+    the task keeps running; once the loop has been blocked for
+    ``stall_threshold`` seconds, it samples the loop thread's stack (up to
+    ``max_samples`` times per stall) and, when the loop runs again, logs a
+    warning with the stall duration and the distinct stacks. Blocking callbacks
+    and tool calls show up in these stacks.
+
+    Attributes:
+        interval (float): Seconds between lag measurements.
+        stall_threshold (float): Seconds the loop may be blocked before it counts as a stall.
+        max_samples (int): Stack samples kept per stall.
+        last_lag (float): Lag of the last measurement, in seconds.
+        max_lag (float): Highest lag measured, in seconds.
+        stalls (int): Stalls detected.
+    """
+    def __init__(self, interval: float = 0.05, stall_threshold: float = 0.1, max_samples: int = 5):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.max_samples = max_samples
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._thread_id: Optional[int] = None
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._stopped.set()
+        self._watchdog = None
+
+    async def _tick(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.last_lag = max(0.0, now - start - self.interval)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            EVENT_LOOP_LAG.observe(self.last_lag)
+
+    def _watch(self) -> None:
+        samples: List[str] = []
+        blocked_for = 0.0
+        poll = min(self.interval, self.stall_threshold / 2)
+        while not self._stopped.wait(poll):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked > self.stall_threshold:
+                blocked_for = blocked
+                if len(samples) < self.max_samples:
+                    stack = self._sample_stack()
+                    if stack and stack not in samples:
+                        samples.append(stack)
+            elif blocked_for:
+                self._report_stall(blocked_for, samples)
+                samples = []
+                blocked_for = 0.0
+
+    def _sample_stack(self) -> Optional[str]:
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return None
+        return "".join(traceback.format_stack(frame))
+
+    def _report_stall(self, blocked_for: float, samples: List[str]) -> None:
+        self.stalls += 1
+        EVENT_LOOP_STALLS.inc()
+        logger.warning(
+            "Event loop blocked for at least %.0f ms. Stack samples:\n%s",
+            blocked_for * 1000,
+            "\n---\n".join(samples) or "(none)",
+        )
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float = 0.005, max_depth: int = 64) -> Dict[str, int]:
+    """Sample the stack of a thread every ``interval`` seconds and count the collapsed stacks."""
+    counts: Dict[str, int] = collections.Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None and len(stack) < max_depth:
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+        if stack:
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+async def profile_event_loop(seconds: float = 10.0, interval: float = 0.005) -> str:
+    """Profile the thread of the running event loop for ``seconds``.
+
+    The sampling runs in a helper thread, so the loop keeps serving sessions
+    while it is profiled. Time the loop spends idle shows up as ``select``.
+
+    Returns:
+        str: One ``frame;frame;... count`` line per distinct stack, most frequent first.
+    """
+    counts = await asyncio.to_thread(sample_stacks, threading.get_ident(), seconds, interval)
+    ordered = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return "\n".join(f"{stack} {count}" for stack, count in ordered) + "\n"
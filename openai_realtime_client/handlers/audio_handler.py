@@ -1,12 +1,13 @@
 import asyncio
 import pyaudio
 import wave
-import queue
 import io
 from typing import Optional
 
 import threading
+import time
 
+from ..audio.jitter_buffer import JitterBuffer
 from ..client.realtime_client import RealtimeClient
 
 
@@ -16,7 +17,7 @@ class AudioHandler:
 
     Uses PyAudio for audio input and output, and runs a separate thread for recording and playing audio.
 
-    When playing audio, it uses a buffer to store audio data and plays it continuously to ensure smooth playback.
+    When playing audio, it uses a jitter buffer to store audio data and plays it continuously to ensure smooth playback.
 
     Attributes:
         format (int): The audio format (paInt16).
@@ -27,13 +28,18 @@ class AudioHandler:
         recording_stream (pyaudio.Stream): The stream for recording audio.
         recording_thread (threading.Thread): The thread for recording audio.
         recording (bool): Whether the audio is currently being recorded.
+        max_pending_chunks (int): Captured chunks buffered for upload before the oldest are dropped.
+        dropped_chunks (int): Number of captured chunks dropped because the upload fell behind.
+        input_overflows (int): Number of times the audio device reported an input overflow while streaming.
         streaming (bool): Whether the audio is currently being streamed.
         stream (pyaudio.Stream): The stream for streaming audio.
         playback_stream (pyaudio.Stream): The stream for playing audio.
-        playback_buffer (queue.Queue): The buffer for playing audio.
+        playback_buffer (JitterBuffer): The buffer for playing audio, with underrun/overrun metrics.
+        playback_write_bytes (int): Bytes written to the playback device at a time.
+        played_samples (int): Number of samples written to the playback device.
         stop_playback (bool): Whether the audio playback should be stopped.
     """
-    def __init__(self):
+    def __init__(self, target_latency_ms: int = 100, max_buffer_ms: int = 10000):
         # Audio parameters
         self.format = pyaudio.paInt16
         self.channels = 1
@@ -47,20 +53,45 @@ class AudioHandler:
         self.recording_thread = None
         self.recording = False
         self.frames = []
+        self.max_pending_chunks = 256
+        self.dropped_chunks = 0
+        self._record_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._record_queue: Optional[asyncio.Queue] = None
+        self._record_sender: Optional[asyncio.Task] = None
 
         # streaming params
         self.streaming = False
         self.stream = None
+        self.input_overflows = 0
+        self._stream_queue: Optional[asyncio.Queue] = None
 
         # Playback params
         self.playback_stream = None
-        self.playback_buffer = queue.Queue(maxsize=50)
+        sample_size = pyaudio.get_sample_size(self.format)
+        self.playback_buffer = JitterBuffer(
+            bytes_per_second=self.rate * self.channels * sample_size,
+            target_latency_ms=target_latency_ms,
+            max_latency_ms=max_buffer_ms,
+            frame_bytes=self.channels * sample_size,
+        )
+        # Bytes handed to the device per write (50 ms)
+        self.playback_write_bytes = self.rate * self.channels * sample_size // 20
+        self.played_samples = 0
+        # When audio was last written to the device, to tell how much of it is still queued there
+        self._last_write_at = 0.0
         self.playback_event = threading.Event()
         self.playback_thread = None
         self.stop_playback = False
 
-    def start_recording(self) -> bytes:
-        """Start recording audio from microphone and return bytes"""
+    def start_recording(self, client: Optional[RealtimeClient] = None) -> bytes:
+        """Start recording audio from microphone and return bytes
+
+        If ``client`` is given, chunks are appended to the input audio buffer as
+        they are captured instead of being kept in memory. Call
+        ``stop_recording`` and then ``flush_recording`` before committing the
+        buffer with ``client.commit_audio()``. Must be called from the event loop
+        in that case.
+        """
         if self.recording:
             return b''
         
@@ -76,6 +107,12 @@ class AudioHandler:
         print("\nRecording... Press 'space' to stop.")
         
         self.frames = []
+        if client is not None:
+            self._record_loop = asyncio.get_running_loop()
+            self._record_queue = asyncio.Queue(maxsize=self.max_pending_chunks)
+            self._record_sender = asyncio.create_task(
+                self._send_recorded(client, self._record_queue)
+            )
         self.recording_thread = threading.Thread(target=self._record)
         self.recording_thread.start()
         
@@ -84,12 +121,37 @@ class AudioHandler:
     def _record(self):
         while self.recording:
             try:
-                data = self.recording_stream.read(self.chunk)
-                self.frames.append(data)
+                data = self.recording_stream.read(self.chunk, exception_on_overflow=False)
+                if self._record_queue is not None:
+                    self._record_loop.call_soon_threadsafe(
+                        self._enqueue_chunk, self._record_queue, data
+                    )
+                else:
+                    self.frames.append(data)
             except Exception as e:
                 print(f"Error recording: {e}")
                 break
 
+    def _enqueue_chunk(self, chunk_queue: asyncio.Queue, data: Optional[bytes]):
+        """Queue a captured chunk, dropping the oldest one if the queue is full."""
+        try:
+            chunk_queue.put_nowait(data)
+        except asyncio.QueueFull:
+            chunk_queue.get_nowait()
+            chunk_queue.put_nowait(data)
+            self.dropped_chunks += 1
+
+    async def _send_recorded(self, client: RealtimeClient, chunk_queue: asyncio.Queue):
+        while True:
+            data = await chunk_queue.get()
+            if data is None:
+                break
+            try:
+                await client.stream_audio(data)
+            except Exception as e:
+                print(f"Error streaming recording: {e}")
+                break
+
     def stop_recording(self) -> bytes:
         """Stop recording and return the recorded audio as bytes"""
         if not self.recording:
@@ -104,6 +166,13 @@ class AudioHandler:
             self.recording_stream.stop_stream()
             self.recording_stream.close()
             self.recording_stream = None
+
+        if self._record_queue is not None:
+            # Chunks were already streamed; queue the end marker behind any
+            # chunks the recording thread has scheduled but not yet delivered.
+            self._record_loop.call_soon(self._enqueue_chunk, self._record_queue, None)
+            self._record_queue = None
+            return b''
         
         # Convert frames to WAV format in memory
         wav_buffer = io.BytesIO()
@@ -117,32 +186,58 @@ class AudioHandler:
         wav_buffer.seek(0)
         return wav_buffer.read()
 
+    async def flush_recording(self):
+        """Wait until a streamed recording has been fully appended to the input buffer."""
+        sender, self._record_sender = self._record_sender, None
+        if sender is not None:
+            await sender
+
     async def start_streaming(self, client: RealtimeClient):
-        """Start continuous audio streaming."""
+        """Start continuous audio streaming.
+
+        The microphone is read in PyAudio callback mode on PortAudio's thread,
+        which hands chunks to the event loop through a bounded queue, so the
+        loop never blocks on the audio device.
+        """
         if self.streaming:
             return
         
         self.streaming = True
+        loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending_chunks)
+        self._stream_queue = chunk_queue
+
+        def on_audio(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                self.input_overflows += 1
+            try:
+                loop.call_soon_threadsafe(self._enqueue_chunk, chunk_queue, in_data)
+            except RuntimeError:
+                # The event loop is closed
+                return (None, pyaudio.paComplete)
+            return (None, pyaudio.paContinue)
+
         self.stream = self.audio.open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
             input=True,
-            frames_per_buffer=self.chunk
+            frames_per_buffer=self.chunk,
+            stream_callback=on_audio
         )
         
         print("\nStreaming audio... Press 'q' to stop.")
         
         while self.streaming:
+            data = await chunk_queue.get()
+            if data is None:
+                break
             try:
-                # Read raw PCM data
-                data = self.stream.read(self.chunk, exception_on_overflow=False)
                 # Stream directly without trying to decode
                 await client.stream_audio(data)
             except Exception as e:
                 print(f"Error streaming: {e}")
                 break
-            await asyncio.sleep(0.01)
 
     def stop_streaming(self):
         """Stop audio streaming."""
@@ -151,15 +246,14 @@ class AudioHandler:
             self.stream.stop_stream()
             self.stream.close()
             self.stream = None
+        if self._stream_queue is not None:
+            # Wake up start_streaming if it is waiting for audio
+            self._enqueue_chunk(self._stream_queue, None)
+            self._stream_queue = None
 
     def play_audio(self, audio_data: bytes):
         """Add audio data to the buffer"""
-        try:
-            self.playback_buffer.put_nowait(audio_data)
-        except queue.Full:
-            # If the buffer is full, remove the oldest chunk and add the new one
-            self.playback_buffer.get_nowait()
-            self.playback_buffer.put_nowait(audio_data)
+        self.playback_buffer.write(audio_data)
         
         if not self.playback_thread or not self.playback_thread.is_alive():
             self.stop_playback = False
@@ -178,11 +272,9 @@ class AudioHandler:
         )
 
         while not self.stop_playback:
-            try:
-                audio_chunk = self.playback_buffer.get(timeout=0.1)
+            audio_chunk = self.playback_buffer.read(self.playback_write_bytes, timeout=0.1)
+            if audio_chunk:
                 self._play_audio_chunk(audio_chunk)
-            except queue.Empty:
-                continue
             
             if self.playback_event.is_set():
                 break
@@ -194,26 +286,45 @@ class AudioHandler:
 
     def _play_audio_chunk(self, audio_chunk: bytes):
         try:
-            chunk_size = 1024
-            for i in range(0, len(audio_chunk), chunk_size):
-                if self.playback_event.is_set():
-                    break
-                chunk = audio_chunk[i:i + chunk_size]
-                self.playback_stream.write(chunk)
+            self.playback_stream.write(audio_chunk)
+            self.played_samples += len(audio_chunk) // self.audio.get_sample_size(self.format)
+            self._last_write_at = time.monotonic()
         except Exception as e:
             print(f"Error playing audio chunk: {e}")
 
+    def playback_position_ms(self) -> float:
+        """Return how far into the received audio playback has progressed, in ms.
+
+        Counts played audio plus audio that was discarded without being played
+        (buffer overruns and interruptions), so the position lines up with the
+        audio passed to ``play_audio``. Audio still queued in the device is not
+        counted: up to the output latency, less the time since the last write
+        (the device plays on while the jitter buffer is empty). Can be passed
+        to ``RealtimeClient(playback_position=...)``.
+        """
+        sample_size = self.audio.get_sample_size(self.format)
+        samples = self.played_samples + self.playback_buffer.dropped_bytes // sample_size
+        position_ms = samples * 1000 / self.rate
+        stream = self.playback_stream
+        if stream is not None:
+            try:
+                latency_ms = stream.get_output_latency() * 1000
+            except Exception:
+                latency_ms = 0.0
+            since_write_ms = (time.monotonic() - self._last_write_at) * 1000
+            position_ms -= max(0.0, latency_ms - since_write_ms)
+        return max(0.0, position_ms)
+
     def stop_playback_immediately(self):
         """Stop audio playback immediately."""
-        self.stop_playback = True
-        self.playback_buffer.queue.clear()  # Clear any pending audio
-        self.playback_event.set()
+        self.playback_buffer.clear()  # Clear any pending audio
 
     def cleanup(self):
         """Clean up audio resources"""
         self.stop_playback_immediately()
 
         self.stop_playback = True
+        self.playback_event.set()
         if self.playback_thread:
             self.playback_thread.join()
 
@@ -221,6 +332,8 @@ class AudioHandler:
         if self.recording_stream:
             self.recording_stream.stop_stream()
             self.recording_stream.close()
+        if self._record_sender:
+            self._record_sender.cancel()
         
         if self.stream:
             self.stream.stop_stream()
@@ -1,17 +1,78 @@
 import asyncio
+import time
+from collections import deque
+from typing import Optional
+
 from fastapi import WebSocket
 
 from openai_realtime_client import RealtimeClient
+from openai_realtime_client.metrics import (
+    CLIENT_BACKLOG_BYTES,
+    DROPPED_AUDIO_BYTES,
+    SLOW_CONSUMER_DISCONNECTS,
+    WS_BYTES,
+)
 import base64
 import json
 from starlette.websockets import WebSocketState
 
+# Close code for clients that cannot keep up (policy violation)
+SLOW_CONSUMER_CLOSE_CODE = 1008
+
+_SENT_BYTES = WS_BYTES.labels("client", "sent")
+_RECEIVED_BYTES = WS_BYTES.labels("client", "received")
+
 class WsHandler:
-    def __init__(self, ws: WebSocket):
+    """
+    Bridges a browser/Unity WebSocket client and a RealtimeClient.
+
+    Messages to the client are queued and written in order by a single task.
+    The queued audio is bounded by ``max_backlog_bytes``: beyond it the oldest
+    audio is dropped, and a client whose backlog stays over the bound (or
+    whose socket blocks a single send) for ``slow_consumer_timeout`` seconds
+    is disconnected. ``send_clear_event`` drops all queued audio, since it
+    would be played after the interruption.
+
+    Attributes:
+        ws (WebSocket): The client WebSocket.
+        audio_format (str): Audio format exchanged with the client ("pcm16", "g711_ulaw" or
+            "g711_alaw"). Announced to the client in a ``config`` event when streaming starts.
+        streaming (bool): Whether audio is currently being streamed.
+        max_backlog_bytes (int): Maximum audio bytes queued for the client.
+        slow_consumer_timeout (float): Seconds a client may lag before it is disconnected.
+        sent_bytes (int): Audio bytes sent to the client.
+        dropped_bytes (int): Audio bytes dropped because of the bound or a clear event.
+        slow_consumer (bool): Whether the client was disconnected for lagging.
+    """
+    def __init__(
+        self,
+        ws: WebSocket,
+        audio_format: str = "pcm16",
+        max_backlog_bytes: int = 480000,
+        slow_consumer_timeout: float = 5.0,
+    ):
         self.ws = ws
+        self.audio_format = audio_format
         # streaming params
         self.streaming = False
 
+        # downstream queue: (message, audio bytes), drained by _sender
+        self.max_backlog_bytes = max_backlog_bytes
+        self.slow_consumer_timeout = slow_consumer_timeout
+        self.sent_bytes = 0
+        self.dropped_bytes = 0
+        self.slow_consumer = False
+        self._queue = deque()
+        self._backlog_bytes = 0
+        self._over_since: Optional[float] = None
+        self._ready = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    @property
+    def backlog_bytes(self) -> int:
+        """Audio bytes queued for the client."""
+        return self._backlog_bytes
 
     async def start_streaming(self, client: RealtimeClient):
         """Start continuous audio streaming."""
@@ -19,12 +80,14 @@ class WsHandler:
             return
 
         self.streaming = True
+        await self.send_config()
         print("\nStreaming audio...")
 
         while self.streaming:
             try:
                 # Read raw PCM data
                 async for data in self.ws.iter_bytes():
+                    _RECEIVED_BYTES.inc(len(data))
                     # Stream directly without trying to decode
                     await client.stream_audio(data)
             except Exception as e:
@@ -36,18 +99,133 @@ class WsHandler:
     async def stop_streaming(self):
         """Stop audio streaming."""
         self.streaming = False
+        if self._sender is not None:
+            self._sender.cancel()
+            self._sender = None
+        CLIENT_BACKLOG_BYTES.dec(self._backlog_bytes)
+        self._queue.clear()
+        self._backlog_bytes = 0
         if self.ws and self.ws.application_state == WebSocketState.CONNECTED:
-            await self.ws.close()
+            try:
+                await self.ws.close()
+            except Exception:
+                # The client already disconnected
+                pass
 
-    async def send_audio(self, audio: bytes) -> None:
-        """Send base64 encoded audio over the websocket."""
+    def _enqueue(self, message: str, size: int = 0) -> None:
+        if self.slow_consumer or self.ws.application_state != WebSocketState.CONNECTED:
+            return
+        self._queue.append((message, size))
+        self._backlog_bytes += size
+        CLIENT_BACKLOG_BYTES.inc(size)
+        lagging = self._lagging_too_long()
+        if self._backlog_bytes > self.max_backlog_bytes:
+            self._drop_oldest_audio()
+        if lagging:
+            self._disconnect_slow_consumer()
+            return
+
+        if self._sender is None or self._sender.done():
+            # Started on first use, restarted if a send failed
+            self._sender = asyncio.create_task(self._send_loop())
+        self._ready.set()
+
+    def _lagging_too_long(self) -> bool:
+        """Track how long the backlog has been over the bound; True once that exceeds slow_consumer_timeout."""
+        now = time.monotonic()
+        if self._backlog_bytes > self.max_backlog_bytes:
+            if self._over_since is None:
+                self._over_since = now
+        elif self._backlog_bytes < self.max_backlog_bytes // 2:
+            # Caught up (with some hysteresis, the bound is hit again right after a drop)
+            self._over_since = None
+        return self._over_since is not None and now - self._over_since > self.slow_consumer_timeout
+
+    def _drop_oldest_audio(self) -> None:
+        kept = deque()
+        # Keep control messages and the newest audio
+        while self._queue and self._backlog_bytes > self.max_backlog_bytes and len(self._queue) > 1:
+            message, size = self._queue.popleft()
+            if size:
+                self._backlog_bytes -= size
+                self.dropped_bytes += size
+                CLIENT_BACKLOG_BYTES.dec(size)
+                DROPPED_AUDIO_BYTES.labels("client").inc(size)
+            else:
+                kept.append((message, size))
+        kept.extend(self._queue)
+        self._queue = kept
+
+    async def _send_loop(self) -> None:
+        while True:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            message, size = self._queue.popleft()
+            self._backlog_bytes -= size
+            CLIENT_BACKLOG_BYTES.dec(size)
+            if self.ws.application_state != WebSocketState.CONNECTED:
+                return
+            try:
+                await asyncio.wait_for(self.ws.send_text(message), self.slow_consumer_timeout)
+            except asyncio.TimeoutError:
+                self._disconnect_slow_consumer()
+                return
+            except Exception as e:
+                print(f"Error sending to client: {e}")
+                return
+            self.sent_bytes += size
+            _SENT_BYTES.inc(len(message))
+            # Also checked here, as a stalled client may get nothing new to enqueue
+            if self._lagging_too_long():
+                self._disconnect_slow_consumer()
+                return
+
+    def _disconnect_slow_consumer(self) -> None:
+        if self.slow_consumer:
+            return
+        self.slow_consumer = True
+        print(f"\nClient too slow ({self._backlog_bytes} bytes queued), disconnecting")
+        SLOW_CONSUMER_DISCONNECTS.inc()
+        CLIENT_BACKLOG_BYTES.dec(self._backlog_bytes)
+        DROPPED_AUDIO_BYTES.labels("client").inc(self._backlog_bytes)
+        self.dropped_bytes += self._backlog_bytes
+        self._queue.clear()
+        self._backlog_bytes = 0
+        self.streaming = False
+        self._closer = asyncio.create_task(self._close_slow_consumer())
+
+    async def _close_slow_consumer(self) -> None:
         if self.ws.application_state == WebSocketState.CONNECTED:
-            payload = {
-                "audio": base64.b64encode(audio).decode()
-            }
-            await self.ws.send_text(json.dumps(payload))
+            try:
+                await self.ws.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Client too slow")
+            except Exception:
+                pass
+
+    async def send_audio(self, audio: bytes) -> None:
+        """Queue base64 encoded audio for the websocket."""
+        payload = {
+            "audio": base64.b64encode(audio).decode()
+        }
+        self._enqueue(json.dumps(payload), len(audio))
+
+    async def send_config(self) -> None:
+        """Tell the client which audio format to send and expect."""
+        self._enqueue(json.dumps({"event": "config", "audio_format": self.audio_format}))
 
     async def send_clear_event(self) -> None:
-        """Notify the client to stop audio playback."""
-        if self.ws.application_state == WebSocketState.CONNECTED:
-            await self.ws.send_text(json.dumps({"event": "clear"}))
+        """Notify the client to stop audio playback, dropping audio not sent yet."""
+        kept = deque()
+        for message, size in self._queue:
+            if size:
+                self.dropped_bytes += size
+            else:
+                kept.append((message, size))
+        self._queue = kept
+        CLIENT_BACKLOG_BYTES.dec(self._backlog_bytes)
+        DROPPED_AUDIO_BYTES.labels("interrupted").inc(self._backlog_bytes)
+        self._backlog_bytes = 0
+        self._over_since = None
+        self._enqueue(json.dumps({"event": "clear"}))
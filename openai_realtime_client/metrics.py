@@ -0,0 +1,190 @@
+"""Prometheus metrics for the Realtime client, the WebSocket bridge and the RAG tool.
+
+``prometheus_client`` is optional: without it every metric is a no-op and
+:func:`render_metrics` returns an empty body. Metrics are process-wide and
+aggregate over all sessions in the process. With several worker processes,
+set ``PROMETHEUS_MULTIPROC_DIR`` to an empty directory shared by the workers
+(``examples/serve.py`` does) so that every scrape reports all of them.
+"""
+
+import os
+from typing import Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+    class _NoopMetric:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def inc(self, amount=1):
+            pass
+
+        def dec(self, amount=1):
+            pass
+
+        def set(self, value):
+            pass
+
+        def observe(self, amount):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+    def generate_latest(registry=None) -> bytes:
+        return b""
+
+# Latency buckets in seconds, from a fast first audio delta to a slow RAG query
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+# Buckets in seconds for work done on the event loop, from an audio delta to a stall
+LOOP_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+ACTIVE_SESSIONS = Gauge(
+    "realtime_active_sessions",
+    "Connected Realtime API sessions in use; idle pooled sessions are not counted.",
+    multiprocess_mode="livesum",
+)
+EVENTS = Counter(
+    "realtime_events_total",
+    "Events received from the Realtime API.",
+    ["type"],
+)
+WS_BYTES = Counter(
+    "realtime_ws_bytes_total",
+    "WebSocket payload bytes, to and from the Realtime API (openai) and the browser/Unity clients (client).",
+    ["peer", "direction"],
+)
+FIRST_AUDIO_LATENCY = Histogram(
+    "realtime_first_audio_latency_seconds",
+    "Time from the end of user speech (speech_stopped, or the audio commit in manual mode) to the first audio delta.",
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_CALL_DURATION = Histogram(
+    "realtime_tool_call_duration_seconds",
+    "Duration of tool calls.",
+    ["tool"],
+    buckets=LATENCY_BUCKETS,
+)
+RAG_QUERY_LATENCY = Histogram(
+    "rag_query_latency_seconds",
+    "Duration of RAG queries (engine setup, retrieval, postprocessing and synthesis), failed ones included.",
+    buckets=LATENCY_BUCKETS,
+)
+SEND_QUEUE_DEPTH = Gauge(
+    "realtime_send_queue_depth",
+    "Messages queued for the Realtime API, by priority class.",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+CLIENT_BACKLOG_BYTES = Gauge(
+    "realtime_client_backlog_bytes",
+    "Audio bytes queued for the browser/Unity clients.",
+    multiprocess_mode="livesum",
+)
+DROPPED_AUDIO_BYTES = Counter(
+    "realtime_dropped_audio_bytes_total",
+    "Audio bytes dropped: send queue overflow (upstream), client backlog overflow or disconnect (client), "
+    "unsent audio discarded by an interruption (interrupted).",
+    ["reason"],
+)
+SLOW_CONSUMER_DISCONNECTS = Counter(
+    "realtime_slow_consumer_disconnects_total",
+    "Browser/Unity clients disconnected for not keeping up.",
+)
+EVENT_LOOP_LAG = Histogram(
+    "realtime_event_loop_lag_seconds",
+    "How late the event loop ran a periodic timer.",
+    buckets=LOOP_BUCKETS,
+)
+EVENT_LOOP_STALLS = Counter(
+    "realtime_event_loop_stalls_total",
+    "Times the event loop was blocked longer than the stall threshold.",
+)
+HANDLER_DURATION = Histogram(
+    "realtime_handler_duration_seconds",
+    "Time to handle an event from the Realtime API, callbacks included.",
+    ["type"],
+    buckets=LOOP_BUCKETS,
+)
+CALLBACK_DURATION = Histogram(
+    "realtime_callback_duration_seconds",
+    "Duration of user callbacks and extra event handlers.",
+    ["callback"],
+    buckets=LOOP_BUCKETS,
+)
+ADMITTED_SESSIONS = Gauge(
+    "realtime_admitted_sessions",
+    "WebSocket sessions admitted by admission control and still running.",
+    multiprocess_mode="livesum",
+)
+QUEUED_SESSIONS = Gauge(
+    "realtime_queued_sessions",
+    "WebSocket sessions waiting for admission.",
+    multiprocess_mode="livesum",
+)
+REJECTED_SESSIONS = Counter(
+    "realtime_rejected_sessions_total",
+    "WebSocket sessions rejected by admission control: worker full (full), queue wait too long (timeout), "
+    "worker shutting down (draining), Realtime API rate limits low (rate_limited).",
+    ["reason"],
+)
+RATE_LIMIT_REMAINING = Gauge(
+    "realtime_rate_limit_remaining",
+    "Remaining Realtime API budget from the last rate_limits.updated event, by limit (requests, tokens).",
+    ["limit"],
+    multiprocess_mode="mostrecent",
+)
+DEFERRED_RESPONSES = Counter(
+    "realtime_deferred_responses_total",
+    "response.create events held back because a rate limit was low.",
+)
+TRIMMED_TOOL_OUTPUTS = Counter(
+    "realtime_trimmed_tool_outputs_total",
+    "Tool outputs shortened because the token rate limit was low.",
+)
+TOKENS = Counter(
+    "realtime_tokens_total",
+    "Tokens used by Realtime API responses, by model and kind (input_text, input_audio, cached_text, "
+    "cached_audio, output_text, output_audio).",
+    ["model", "kind"],
+)
+TOKEN_COST = Counter(
+    "realtime_token_cost_usd_total",
+    "Estimated cost of Realtime API responses in USD, by model.",
+    ["model"],
+)
+SESSION_TOKENS = Histogram(
+    "realtime_session_tokens",
+    "Total tokens used per session.",
+    buckets=(1000, 5000, 10000, 25000, 50000, 100000, 250000, 500000, 1000000),
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the body and content type of a Prometheus scrape response."""
+    if PROMETHEUS_AVAILABLE and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_stopped() -> None:
+    """Drop the live gauges of this worker from multiprocess metrics when it exits."""
+    if PROMETHEUS_AVAILABLE and os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
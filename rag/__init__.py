@@ -6,10 +6,9 @@ import os
 from typing import Optional
 
 from dotenv import load_dotenv
-from llama_index.callbacks.openinference import OpenInferenceCallbackHandler
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext
-from llama_index.core.callbacks import LlamaDebugHandler
 from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient, AsyncQdrantClient
@@ -19,10 +18,9 @@ from qdrant_client.models import (
     SparseVectorParams,
     SparseIndexParams,
 )
-from openinference.instrumentation.llama_index import LlamaIndexInstrumentor
-from phoenix.otel import register
 
 from rag.ParagraphSplitter import ParagraphSplitter
+from rag.tracing import configure_tracing
 
 load_dotenv()
 
@@ -39,13 +37,20 @@ FASTEMBED_SPARSE_MODEL = os.getenv("FASTEMBED_SPARSE_MODEL")
 RAG_ENABLE_HYBRID = os.getenv("RAG_ENABLE_HYBRID", "false").lower() == "true"
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAG_DOCS_DIR = os.path.join(BASE_DIR, os.getenv("RAG_DOCS_DIR"))
+# Build the index on import. Disable to build it later, e.g. with another
+# embedding model in the benchmarks.
+RAG_AUTOLOAD = os.getenv("RAG_AUTOLOAD", "true").lower() == "true"
 
 print("RAG_DOCS_DIR: ", RAG_DOCS_DIR)
 
 _index: Optional[VectorStoreIndex] = None
 
-def get_index() -> VectorStoreIndex:
-    """Load or create the RAG index."""
+def get_index(embed_model: Optional[BaseEmbedding] = None) -> VectorStoreIndex:
+    """Load or create the RAG index.
+
+    ``embed_model`` embeds the documents and queries of a new index; it
+    defaults to the OpenAI embedding model and is ignored once the index exists.
+    """
     global _index
     if _index is not None:
         return _index
@@ -93,16 +98,11 @@ def get_index() -> VectorStoreIndex:
         )
     vector_store = QdrantVectorStore(**vector_store_kwargs)
     storage = StorageContext.from_defaults(vector_store=vector_store)
-    embed_model = OpenAIEmbedding(model=OPENAI_EMBEDDING_MODEL,
-                                  dimensions=OPENAI_EMBEDDING_SIZE)
-    # Callback handlers
-    llama_debug = LlamaDebugHandler(print_trace_on_end=True)
-    inference_handler = OpenInferenceCallbackHandler()
-    Settings.callback_manager.set_handlers([llama_debug, inference_handler])
-
-    # Arize Phoenix Instrumentor
-    tracer_provider = register()
-    LlamaIndexInstrumentor().instrument(tracer_provider=tracer_provider)
+    if embed_model is None:
+        embed_model = OpenAIEmbedding(model=OPENAI_EMBEDDING_MODEL,
+                                      dimensions=OPENAI_EMBEDDING_SIZE)
+    # Callback handlers and Arize Phoenix instrumentation (see RAG_TRACING)
+    Settings.callback_manager.set_handlers(configure_tracing())
 
     _index = VectorStoreIndex(nodes,
                               storage_context=storage,
@@ -112,4 +112,5 @@ def get_index() -> VectorStoreIndex:
     return _index
 
 # Autoload index when the module is imported
-get_index()
+if RAG_AUTOLOAD:
+    get_index()
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from typing import Any
 import os
+import time
 
 from dotenv import load_dotenv
 from llama_index.core.postprocessor import SimilarityPostprocessor
@@ -13,6 +14,8 @@ from llama_index.core.prompts import PromptTemplate
 from llama_index.core.vector_stores.types import VectorStoreQueryMode
 from llama_index.llms.openai import OpenAI
 
+from openai_realtime_client.metrics import RAG_QUERY_LATENCY
+
 from . import get_index
 
 # Load environment variables
@@ -106,12 +109,16 @@ def query_rag(query: str, top_k: int = 10, top_n: int = 3) -> Any:
     """
     response = None
 
+    start = time.monotonic()
     try:
         engine = _build_query_engine(top_k, top_n)
-        return engine.query(query)
+        response = engine.query(query)
+        return response
     except Exception as e:
         print(f"query_rag exception: {e}")
         return None
+    finally:
+        RAG_QUERY_LATENCY.observe(time.monotonic() - start)
 
 
 async def aquery_rag(query: str, top_k: int = 10, top_n: int = 3) -> Any:
@@ -124,9 +131,13 @@ async def aquery_rag(query: str, top_k: int = 10, top_n: int = 3) -> Any:
     :return: The response generated by the engine.
     """
 
+    start = time.monotonic()
     try:
         engine = _build_query_engine(top_k, top_n)
-        return await engine.aquery(query)
+        response = await engine.aquery(query)
+        return response
     except Exception as e:
         print(f"query_rag exception: {e}")
         return None
+    finally:
+        RAG_QUERY_LATENCY.observe(time.monotonic() - start)
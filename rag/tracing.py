@@ -0,0 +1,234 @@
+"""Tracing configuration for the RAG path.
+
+Tracing is controlled with the ``RAG_TRACING`` environment variable:
+
+* ``off``: no callback handlers and no OpenTelemetry instrumentation.
+* ``sampled`` (default): head sampling (``RAG_TRACE_SAMPLE_RATIO``) capped by a
+  rate limit (``RAG_TRACE_MAX_PER_SECOND``). Unsampled queries are not
+  recorded. Optionally, ``RAG_TRACE_SLOW_MS`` records every query and exports
+  those slower than it even when not head-sampled, at the cost of recording
+  all traces.
+* ``full``: every trace is exported.
+* ``debug``: like ``full`` plus LlamaIndex's debug handler printing every trace.
+
+Spans are exported asynchronously in batches to the Phoenix collector.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_ON,
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+)
+from opentelemetry.trace import Link, SpanKind, get_current_span
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+RAG_TRACING = os.getenv("RAG_TRACING", "sampled").lower()
+RAG_TRACE_SAMPLE_RATIO = float(os.getenv("RAG_TRACE_SAMPLE_RATIO", "0.1"))
+RAG_TRACE_MAX_PER_SECOND = float(os.getenv("RAG_TRACE_MAX_PER_SECOND", "5"))
+# Latency threshold above which a query is always traced. Enabling it records
+# every trace (only the export is sampled); 0 (default) disables it, in which
+# case unsampled queries are not recorded at all.
+RAG_TRACE_SLOW_MS = float(os.getenv("RAG_TRACE_SLOW_MS", "0"))
+
+TRACING_MODES = ("off", "sampled", "full", "debug")
+
+# Trace state key marking traces that are recorded but only exported if slow.
+_DEFERRED_KEY = "ragtail"
+_DEFERRED_VALUE = "1"
+
+_configured = False
+
+
+class RateLimitedRatioSampler(Sampler):
+    """Head sampler combining a ratio with a token-bucket rate limit.
+
+    Traces that lose the head-sampling draw are dropped, or recorded with a
+    ``deferred`` marker when ``record_deferred`` is set so that
+    :class:`SlowTraceSpanProcessor` can still export them if they turn out
+    to be slow.
+    """
+
+    def __init__(
+        self,
+        ratio: float,
+        max_per_second: float,
+        record_deferred: bool = False,
+    ):
+        self.ratio = max(0.0, min(1.0, ratio))
+        self.max_per_second = max_per_second
+        self.record_deferred = record_deferred
+        self._tokens = max(1.0, max_per_second)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take_token(self) -> bool:
+        if self.max_per_second <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(1.0, self.max_per_second)
+            self._tokens = min(
+                capacity,
+                self._tokens + (now - self._last_refill) * self.max_per_second,
+            )
+            self._last_refill = now
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state: Optional[TraceState] = None,
+    ) -> SamplingResult:
+        parent_state = get_current_span(parent_context).get_span_context().trace_state
+        if random.random() < self.ratio and self._take_token():
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, parent_state)
+        if self.record_deferred:
+            # Marked as sampled so the whole trace is recorded; the span
+            # processor decides at the end whether it is exported.
+            state = (parent_state or TraceState()).add(_DEFERRED_KEY, _DEFERRED_VALUE)
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, state)
+        return SamplingResult(Decision.DROP, None, parent_state)
+
+    def get_description(self) -> str:
+        return (
+            f"RateLimitedRatioSampler{{ratio={self.ratio},"
+            f"max_per_second={self.max_per_second}}}"
+        )
+
+
+class SlowTraceSpanProcessor(SpanProcessor):
+    """Forward spans to ``delegate``, holding deferred traces until their root ends.
+
+    Deferred traces (see :class:`RateLimitedRatioSampler`) are buffered and only
+    forwarded when the root span lasted at least ``slow_ms``. At most
+    ``max_pending_traces`` deferred traces are buffered; the oldest is
+    discarded first. Spans that end after their root follow the decision
+    made for the root: forwarded if the trace was exported, dropped otherwise.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        slow_ms: float,
+        max_pending_traces: int = 256,
+    ):
+        self.delegate = delegate
+        self.slow_ms = slow_ms
+        self.max_pending_traces = max_pending_traces
+        self._pending: "OrderedDict[int, List[ReadableSpan]]" = OrderedDict()
+        # trace id -> whether it was exported, for spans ending after the root
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        if not _is_deferred(span):
+            self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if not _is_deferred(span):
+            self.delegate.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            exported = self._decided.get(trace_id)
+            if exported is not None:
+                spans = [span] if exported else []
+            else:
+                spans = self._pending.pop(trace_id, [])
+                spans.append(span)
+                if not is_root:
+                    self._pending[trace_id] = spans
+                    while len(self._pending) > self.max_pending_traces:
+                        self._pending.popitem(last=False)
+                    return
+                exported = (span.end_time - span.start_time) / 1e6 >= self.slow_ms
+                if not exported:
+                    spans = []
+                self._decided[trace_id] = exported
+                while len(self._decided) > self.max_pending_traces:
+                    self._decided.popitem(last=False)
+
+        for buffered in spans:
+            self.delegate.on_end(buffered)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._decided.clear()
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
+
+
+def _is_deferred(span: ReadableSpan) -> bool:
+    return span.context.trace_state.get(_DEFERRED_KEY) == _DEFERRED_VALUE
+
+
+def configure_tracing(mode: str = RAG_TRACING) -> List[object]:
+    """Install tracing for LlamaIndex according to ``mode``.
+
+    Returns the LlamaIndex callback handlers to register, which are only
+    non-empty in ``debug`` mode.
+    """
+    if mode not in TRACING_MODES:
+        raise ValueError(f"Invalid RAG_TRACING mode: {mode}. Valid values: {TRACING_MODES}")
+    global _configured
+    if mode == "off" or _configured:
+        return []
+    _configured = True
+
+    from openinference.instrumentation.llama_index import LlamaIndexInstrumentor
+    from phoenix.otel import BatchSpanProcessor, TracerProvider
+
+    if mode == "sampled":
+        sampler = ParentBased(
+            root=RateLimitedRatioSampler(
+                RAG_TRACE_SAMPLE_RATIO,
+                RAG_TRACE_MAX_PER_SECOND,
+                record_deferred=RAG_TRACE_SLOW_MS > 0,
+            )
+        )
+    else:
+        sampler = ALWAYS_ON
+
+    tracer_provider = TracerProvider(sampler=sampler, verbose=False)
+    processor: SpanProcessor = BatchSpanProcessor()
+    if mode == "sampled" and RAG_TRACE_SLOW_MS > 0:
+        processor = SlowTraceSpanProcessor(processor, RAG_TRACE_SLOW_MS)
+    tracer_provider.add_span_processor(processor)
+    trace.set_tracer_provider(tracer_provider)
+    LlamaIndexInstrumentor().instrument(tracer_provider=tracer_provider)
+
+    if mode != "debug":
+        return []
+
+    from llama_index.callbacks.openinference import OpenInferenceCallbackHandler
+    from llama_index.core.callbacks import LlamaDebugHandler
+
+    return [LlamaDebugHandler(print_trace_on_end=True), OpenInferenceCallbackHandler()]